@@ -16,10 +16,11 @@ def create_app():
     app = Flask(__name__)
     
     # 2. Configure CORS for both the app and Socket.IO
-    CORS(app, resources={r"/api/*": {"origins": "*"}})
+    CORS(app, resources={r"/api/*": {"origins": "*"}}, expose_headers=["X-Total-Count"])
     
     # 3. Initialize SocketIO with the app and Redis message queue
-    socketio.init_app(app, message_queue=config.REDIS_URL, cors_allowed_origins="*")
+    socketio.init_app(app, message_queue=config.REDIS_URL, cors_allowed_origins="*",
+                      transports=config.SOCKETIO_TRANSPORTS)
 
     # Register the API blueprint
     from .api import api_bp
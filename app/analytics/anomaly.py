@@ -0,0 +1,213 @@
+"""
+Sentiment Anomaly Detection
+
+Keeps per-subreddit exponentially weighted baselines so sudden swings can be
+flagged as items are ingested, without re-querying the database:
+
+- sentiment: EWMA mean/variance of `sentiment_score`, updated per item in O(1).
+  When a time bucket closes, its mean is compared with the baseline as it
+  stood when the bucket opened, scaled by the standard error of both.
+- volume: EWMA mean/variance of items per bucket. Empty buckets count as zero,
+  so a burst after a quiet spell stands out.
+
+Items are bucketed by `created_utc` (naive UTC, like `window_start`), not by when their batch was flushed. A
+bucket closes once the clock passes its end plus `allowed_lateness`; items
+that arrive after their bucket closed still feed the sentiment baseline but
+no longer count towards a bucket. Subreddits idle for `MAX_GAP_BUCKETS`
+buckets are forgotten, so a flush only touches subreddits with open buckets.
+
+State lives in the collector process, so each collector watches the
+subreddits it ingests.
+"""
+import math
+import heapq
+import time
+import logging
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+from app import config
+from app.models import RedditItem, SentimentAlert, utc_datetime, utc_timestamp
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MAX_GAP_BUCKETS = 100  # Empty buckets folded into the volume baseline after a silence
+MIN_SCORE_VARIANCE = 1e-4
+MIN_VOLUME_VARIANCE = 1.0
+
+
+class _SubredditState:
+    __slots__ = ('bucket_start', 'count', 'score_sum', 'score_mean', 'score_var',
+                 'base_mean', 'base_var', 'volume_mean', 'volume_var', 'buckets_seen')
+
+    def __init__(self, bucket_start: float):
+        self.bucket_start = bucket_start
+        self.count = 0
+        self.score_sum = 0.0
+        self.score_mean: Optional[float] = None
+        self.score_var = 0.0
+        self.base_mean: Optional[float] = None
+        self.base_var = 0.0
+        self.volume_mean: Optional[float] = None
+        self.volume_var = 0.0
+        self.buckets_seen = 0
+
+
+class AnomalyDetector:
+    def __init__(self, alpha: float = config.ALERT_EWMA_ALPHA,
+                 volume_alpha: float = config.ALERT_VOLUME_ALPHA,
+                 z_threshold: float = config.ALERT_Z_THRESHOLD,
+                 bucket_seconds: int = config.ALERT_BUCKET_SECONDS,
+                 warmup_buckets: int = config.ALERT_WARMUP_BUCKETS,
+                 min_items: int = config.ALERT_MIN_ITEMS,
+                 cooldown_seconds: int = config.ALERT_COOLDOWN_SECONDS,
+                 allowed_lateness: int = config.ALERT_ALLOWED_LATENESS_SECONDS,
+                 clock: Callable[[], float] = time.time):
+        """
+        alpha:            EWMA weight of each new item in the sentiment baseline.
+        volume_alpha:     EWMA weight of each closed bucket in the volume baseline.
+        warmup_buckets:   buckets a subreddit must have been watched before it can alert.
+        min_items:        smallest bucket whose mean sentiment is tested.
+        allowed_lateness: seconds a bucket stays open past its end for late items.
+        """
+        self.alpha = alpha
+        self.volume_alpha = volume_alpha
+        self.z_threshold = z_threshold
+        self.bucket_seconds = bucket_seconds
+        self.warmup_buckets = warmup_buckets
+        self.min_items = min_items
+        self.cooldown_seconds = cooldown_seconds
+        self.allowed_lateness = allowed_lateness
+        self.clock = clock
+        self.states: Dict[str, _SubredditState] = {}
+        self.last_alert: Dict[Tuple[str, str], float] = {}
+        # (bucket end, subreddit) for every bucket holding items; stale entries are skipped
+        self._open: List[Tuple[float, str]] = []
+        # Subreddits by last item seen, oldest first
+        self._last_seen: "OrderedDict[str, float]" = OrderedDict()
+
+    def _bucket(self, now: float) -> float:
+        return now - (now % self.bucket_seconds)
+
+    def observe(self, items: List[RedditItem]) -> List[SentimentAlert]:
+        """Folds a batch of scored items into the baselines and returns any alerts
+        raised by buckets that closed in the meantime."""
+        now = self.clock()
+        alerts: List[SentimentAlert] = []
+
+        scored = [(self._timestamp(item, now), item) for item in items if item.sentiment_score is not None]
+        scored.sort(key=lambda pair: pair[0])
+        for created, item in scored:
+            bucket = self._bucket(created)
+            state = self.states.get(item.subreddit)
+            if state is None:
+                state = self.states[item.subreddit] = _SubredditState(bucket)
+            if bucket > state.bucket_start:
+                alerts.extend(self._roll(item.subreddit, state, bucket, now))
+            if bucket == state.bucket_start:
+                state.count += 1
+                state.score_sum += item.sentiment_score
+                if state.count == 1:
+                    heapq.heappush(self._open, (bucket + self.bucket_seconds, item.subreddit))
+            self._update_baseline(state, item.sentiment_score)
+            self._last_seen[item.subreddit] = now
+            self._last_seen.move_to_end(item.subreddit)
+
+        # Close the buckets of subreddits that went quiet as well
+        watermark = now - self.allowed_lateness
+        while self._open and self._open[0][0] <= watermark:
+            end, subreddit = heapq.heappop(self._open)
+            state = self.states.get(subreddit)
+            if state is None or state.bucket_start + self.bucket_seconds != end:
+                continue
+            alerts.extend(self._roll(subreddit, state, self._bucket(watermark), now))
+
+        self._expire(now)
+
+        for alert in alerts:
+            logger.info(f"Sentiment alert: r/{alert.subreddit} {alert.kind} z={alert.z_score:.2f}")
+        return alerts
+
+    @staticmethod
+    def _timestamp(item: RedditItem, now: float) -> float:
+        # Items from the future are clock skew
+        if item.created_utc is None:
+            return now
+        return min(utc_timestamp(item.created_utc), now)
+
+    def _expire(self, now: float):
+        cutoff = now - MAX_GAP_BUCKETS * self.bucket_seconds - self.allowed_lateness
+        while self._last_seen:
+            subreddit, seen = next(iter(self._last_seen.items()))
+            if seen >= cutoff:
+                break
+            del self._last_seen[subreddit]
+            self.states.pop(subreddit, None)
+            for kind in ('sentiment', 'volume'):
+                self.last_alert.pop((subreddit, kind), None)
+
+    def _update_baseline(self, state: _SubredditState, score: float):
+        if state.score_mean is None:
+            state.score_mean = score
+            return
+        delta = score - state.score_mean
+        state.score_mean += self.alpha * delta
+        state.score_var = (1 - self.alpha) * (state.score_var + self.alpha * delta * delta)
+
+    def _roll(self, subreddit: str, state: _SubredditState, current: float, now: float) -> List[SentimentAlert]:
+        if current <= state.bucket_start:
+            return []
+
+        alerts = self._evaluate(subreddit, state, now)
+        self._update_volume(state, state.count)
+        gap = int((current - state.bucket_start) // self.bucket_seconds) - 1
+        for _ in range(min(gap, MAX_GAP_BUCKETS)):
+            self._update_volume(state, 0)
+
+        state.bucket_start = current
+        state.count = 0
+        state.score_sum = 0.0
+        state.base_mean, state.base_var = state.score_mean, state.score_var
+        return alerts
+
+    def _update_volume(self, state: _SubredditState, count: int):
+        state.buckets_seen += 1
+        if state.volume_mean is None:
+            state.volume_mean = float(count)
+            return
+        delta = count - state.volume_mean
+        state.volume_mean += self.volume_alpha * delta
+        state.volume_var = (1 - self.volume_alpha) * (state.volume_var + self.volume_alpha * delta * delta)
+
+    def _evaluate(self, subreddit: str, state: _SubredditState, now: float) -> List[SentimentAlert]:
+        if state.buckets_seen < self.warmup_buckets or not state.count:
+            return []
+
+        window_start = utc_datetime(state.bucket_start)
+        alerts = []
+
+        if state.count >= self.min_items and state.base_mean is not None:
+            bucket_mean = state.score_sum / state.count
+            # The baseline is itself noisy: an EWMA mean has variance var * alpha / (2 - alpha)
+            std_error = math.sqrt(max(state.base_var, MIN_SCORE_VARIANCE)
+                                  * (1.0 / state.count + self.alpha / (2 - self.alpha)))
+            z = (bucket_mean - state.base_mean) / std_error
+            if abs(z) >= self.z_threshold:
+                alerts.append(SentimentAlert(subreddit, 'sentiment', z, bucket_mean, state.base_mean,
+                                             state.count, window_start))
+
+        if state.volume_mean is not None:
+            z = (state.count - state.volume_mean) / math.sqrt(max(state.volume_var, MIN_VOLUME_VARIANCE))
+            # Only bursts: a drop shows up late (at the next item) and is rarely actionable
+            if z >= self.z_threshold:
+                alerts.append(SentimentAlert(subreddit, 'volume', z, float(state.count), state.volume_mean,
+                                             state.count, window_start))
+
+        return [alert for alert in alerts if self._cooled_down(alert, now)]
+
+    def _cooled_down(self, alert: SentimentAlert, now: float) -> bool:
+        key = (alert.subreddit, alert.kind)
+        if now - self.last_alert.get(key, float('-inf')) < self.cooldown_seconds:
+            return False
+        self.last_alert[key] = now
+        return True
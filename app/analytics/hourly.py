@@ -0,0 +1,65 @@
+"""
+Hourly Sketch Buckets
+
+Shared bookkeeping for trackers that keep one set of sketches per
+(subreddit, hour of `created_utc`) and write them to `analytics_sketches`.
+Each in-memory bucket owns its own row (source id `<host:pid>:<n>`), so
+rows from several collector processes, or from a bucket dropped from
+memory and started again, sit side by side and are merged on read.
+"""
+import os
+import time
+import socket
+import datetime
+import itertools
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+from app.models import RedditItem, utc_datetime
+
+RETAIN_HOURS = 2  # In-memory buckets older than this are dropped once persisted
+
+BucketKey = Tuple[str, datetime.datetime]
+
+
+class HourlySketchTracker(ABC):
+    def __init__(self, source: Optional[str] = None, clock: Callable[[], float] = time.time):
+        """source: prefix of the row ids this process writes; defaults to host:pid."""
+        self.source = source or f"{socket.gethostname()[:32]}:{os.getpid()}"
+        self.clock = clock
+        self._sequence = itertools.count(int(clock()))
+        self.buckets: Dict[BucketKey, Tuple[str, Dict[str, Any]]] = {}
+        self.dirty: Set[BucketKey] = set()
+
+    @abstractmethod
+    def new_sketches(self) -> Dict[str, Any]:
+        """Returns {kind: empty sketch} for a new bucket."""
+
+    @abstractmethod
+    def update(self, sketches: Dict[str, Any], item: RedditItem):
+        """Adds one item to its bucket's sketches."""
+
+    def observe(self, items: List[RedditItem]):
+        for item in items:
+            if not item.created_utc:
+                continue
+            key = (item.subreddit, item.created_utc.replace(minute=0, second=0, microsecond=0))
+            entry = self.buckets.get(key)
+            if entry is None:
+                entry = self.buckets[key] = (f"{self.source}:{next(self._sequence)}", self.new_sketches())
+            self.update(entry[1], item)
+            self.dirty.add(key)
+
+    def persist(self, db_manager: Any):
+        if not self.dirty:
+            return
+        rows = []
+        for key in self.dirty:
+            source, sketches = self.buckets[key]
+            for kind, sketch in sketches.items():
+                rows.append((kind, key[0], key[1], source, sketch.to_bytes()))
+        db_manager.upsert_sketches(rows)
+        self.dirty.clear()
+
+        cutoff = utc_datetime(self.clock()) - datetime.timedelta(hours=RETAIN_HOURS)
+        for key in [key for key in self.buckets if key[1] < cutoff]:
+            del self.buckets[key]
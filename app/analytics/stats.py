@@ -0,0 +1,63 @@
+"""
+KPI Sketches
+
+Per subreddit and hour, a `HyperLogLog` of authors and a `Histogram` of
+`sentiment_score`. `/api/stats` merges the stored rows for its filters to get
+`unique_authors` and sentiment percentiles without scanning `reddit_data`.
+
+Near-duplicates (`duplicate_of` set) go into their own `*_duplicate` kinds.
+Both sketch types merge losslessly, so the full figures are the union of the
+two and `exclude_duplicates` simply leaves the duplicate rows out.
+"""
+from typing import Any, Dict, List
+from app.models import RedditItem
+from app.analytics.hourly import HourlySketchTracker
+from app.analytics.sketches import HyperLogLog, Histogram
+
+AUTHORS_KIND = 'authors'
+SENTIMENT_KIND = 'sentiment'
+DUPLICATE_AUTHORS_KIND = 'authors_duplicate'
+DUPLICATE_SENTIMENT_KIND = 'sentiment_duplicate'
+PERCENTILES = (('sentiment_p10', 0.10), ('sentiment_median', 0.50), ('sentiment_p90', 0.90))
+
+IGNORED_AUTHORS = frozenset(('[deleted]', 'None', ''))
+
+
+class StatsTracker(HourlySketchTracker):
+    def new_sketches(self) -> Dict[str, Any]:
+        # Duplicate kinds are added on first use, so buckets without duplicates write two rows
+        return {AUTHORS_KIND: HyperLogLog(), SENTIMENT_KIND: Histogram()}
+
+    def update(self, sketches: Dict[str, Any], item: RedditItem):
+        authors_kind, sentiment_kind = AUTHORS_KIND, SENTIMENT_KIND
+        if item.duplicate_of:
+            authors_kind, sentiment_kind = DUPLICATE_AUTHORS_KIND, DUPLICATE_SENTIMENT_KIND
+            if authors_kind not in sketches:
+                sketches[authors_kind], sketches[sentiment_kind] = HyperLogLog(), Histogram()
+        if item.author not in IGNORED_AUTHORS:
+            sketches[authors_kind].add(item.author)
+        if item.sentiment_score is not None:
+            sketches[sentiment_kind].add(item.sentiment_score)
+
+
+def kinds(exclude_duplicates: bool = False) -> List[str]:
+    """The sketch kinds `summarize` needs for the given filter."""
+    if exclude_duplicates:
+        return [AUTHORS_KIND, SENTIMENT_KIND]
+    return [AUTHORS_KIND, SENTIMENT_KIND, DUPLICATE_AUTHORS_KIND, DUPLICATE_SENTIMENT_KIND]
+
+
+def summarize(payloads: Dict[str, List[bytes]], exclude_duplicates: bool = False) -> Dict[str, Any]:
+    """Merges stored sketches ({kind: [payload, ...]}) into the /api/stats fields."""
+    authors = list(payloads.get(AUTHORS_KIND, []))
+    sentiment = list(payloads.get(SENTIMENT_KIND, []))
+    if not exclude_duplicates:
+        authors += payloads.get(DUPLICATE_AUTHORS_KIND, [])
+        sentiment += payloads.get(DUPLICATE_SENTIMENT_KIND, [])
+
+    merged_authors = HyperLogLog.merge_payloads(authors)
+    summary: Dict[str, Any] = {"unique_authors": merged_authors.count() if merged_authors else 0}
+    histogram = Histogram.merge_payloads(sentiment) or Histogram()
+    for name, q in PERCENTILES:
+        summary[name] = histogram.quantile(q)
+    return summary
@@ -0,0 +1,64 @@
+"""
+Trending Terms
+
+Counts, per subreddit and hour of `created_utc`, the terms of each ingested
+item in a `SpaceSaving` sketch. Each term is counted once per item. After
+every flush the sketches that changed are written to `analytics_sketches`
+under this process's source id. `/api/trending` merges the rows of the
+requested subreddits and hours, across every process that wrote them.
+"""
+import re
+import time
+import logging
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+from app import config
+from app.models import RedditItem
+from app.analytics.hourly import HourlySketchTracker
+from app.analytics.sketches import SpaceSaving
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SKETCH_KIND = 'terms'
+
+TERM_PATTERN = re.compile(r"[a-z][a-z0-9+#'-]{2,}")
+STOPWORDS = frozenset("""
+a about above after again against all also am an and any are aren't as at be because been before being
+below between both but by can can't cannot could couldn't did didn't do does doesn't doing don't down
+during each even every few for from further get got had hadn't has hasn't have haven't having he her
+here hers herself him himself his how i if in into is isn't it it's its itself just know like make many
+me more most much must my myself need no nor not now of off on once one only or other our ours
+ourselves out over own people really same say see she should shouldn't so some still such than that
+that's the their theirs them themselves then there there's these they they're thing things think this
+those though through time to too under until up us use very want was wasn't way we well were weren't
+what when where which while who whom why will with without won't would wouldn't yeah yes yet you
+you're your yours yourself yourselves deleted removed
+""".split())
+
+
+class TrendingTracker(HourlySketchTracker):
+    def __init__(self, clean_text: Callable[[str], str], capacity: int = config.TRENDING_CAPACITY,
+                 source: Optional[str] = None, clock: Callable[[], float] = time.time):
+        """clean_text: the analyzer's text cleaner (strips URLs and user/subreddit mentions)."""
+        super().__init__(source, clock)
+        self.clean_text = clean_text
+        self.capacity = capacity
+
+    def terms(self, text: str) -> Set[str]:
+        return {term for term in TERM_PATTERN.findall(self.clean_text(text or "").lower())
+                if term not in STOPWORDS}
+
+    def new_sketches(self) -> Dict[str, Any]:
+        return {SKETCH_KIND: SpaceSaving(self.capacity)}
+
+    def update(self, sketches: Dict[str, Any], item: RedditItem):
+        sketch = sketches[SKETCH_KIND]
+        sentiment = item.sentiment_score or 0.0
+        for term in self.terms(item.content):
+            sketch.add(term, sentiment)
+
+
+def top_terms(payloads: Iterable[bytes], limit: int = 20,
+              capacity: int = config.TRENDING_CAPACITY) -> List[Dict[str, Any]]:
+    """Merges stored `terms` sketches and returns the `limit` most frequent terms."""
+    return SpaceSaving.merge_all((SpaceSaving.from_bytes(p) for p in payloads), capacity).top(limit)
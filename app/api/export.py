@@ -0,0 +1,104 @@
+"""
+Bulk Export Writers
+
+Turn the row batches produced by `DatabaseManager.iter_sentiment_data` into
+CSV, NDJSON or Parquet without ever holding more than one batch in memory.
+CSV and NDJSON are produced as a stream of chunks (optionally gzip-compressed
+on the fly); Parquet needs its footer written last, so it is assembled row
+group by row group in a temp file on disk and streamed from there.
+"""
+import csv
+import io
+import os
+import json
+import zlib
+import tempfile
+import datetime
+from typing import Any, Dict, Iterable, Iterator, List
+
+CHUNK_SIZE = 64 * 1024
+
+
+class ExportTooLarge(Exception):
+    pass
+
+
+def _jsonable(value: Any) -> Any:
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    return value
+
+
+def csv_chunks(batches: Iterable[List[Dict[str, Any]]], columns: List[str]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for rows in batches:
+        for row in rows:
+            writer.writerow([_jsonable(row.get(c)) for c in columns])
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate(0)
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def ndjson_chunks(batches: Iterable[List[Dict[str, Any]]], columns: List[str]) -> Iterator[bytes]:
+    for rows in batches:
+        lines = [json.dumps({c: _jsonable(row.get(c)) for c in columns}, ensure_ascii=False) for row in rows]
+        yield ("\n".join(lines) + "\n").encode('utf-8')
+
+
+def gzip_chunks(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits=31 -> gzip container
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def write_parquet(batches: Iterable[List[Dict[str, Any]]], columns: List[str],
+                  max_bytes: int, compression: str = 'zstd') -> str:
+    """Writes each batch as one Parquet row group into a temp file and returns its path.
+
+    Raises ExportTooLarge (after removing the file) once the file grows past `max_bytes`.
+    Requires the optional `pyarrow` package.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    types = {
+        'created_utc': pa.timestamp('s'),
+        'sentiment_score': pa.float64(),
+        'score': pa.int64(),
+        'num_comments': pa.int64(),
+    }
+    schema = pa.schema([(c, types.get(c, pa.string())) for c in columns])
+
+    handle, path = tempfile.mkstemp(prefix='reddit_export_', suffix='.parquet')
+    os.close(handle)
+    try:
+        with pq.ParquetWriter(path, schema, compression=compression) as writer:
+            for rows in batches:
+                table = pa.Table.from_pydict({c: [row.get(c) for row in rows] for c in columns}, schema=schema)
+                writer.write_table(table)
+                if os.path.getsize(path) > max_bytes:
+                    raise ExportTooLarge(f"Export exceeds {max_bytes} bytes; narrow the filters")
+        return path
+    except BaseException:
+        os.remove(path)
+        raise
+
+
+def file_chunks(path: str, remove: bool = True) -> Iterator[bytes]:
+    try:
+        with open(path, 'rb') as f:
+            while True:
+                chunk = f.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+    finally:
+        if remove:
+            os.remove(path)
@@ -1,8 +1,15 @@
-from flask import Flask, jsonify, request
-from . import api_bp
+import os
+from flask import Flask, Response, jsonify, request
+from . import api_bp, export, serialization
 from app.database.db_manager import db_manager
+from app.database.hot_window import HotWindow
 from app.nlp.analyzer import analyzer
 from app.data_collection.collector import RedditCollector
+from app.jobs.queue import JobQueue, create_backend
+from app.utils import downsample
+from app.analytics import trending
+from app.analytics import stats as kpi_sketches
+from app import config, socketio
 import logging
 
 logging.basicConfig(level=logging.INFO)
@@ -10,13 +17,30 @@ logger = logging.getLogger(__name__)
 
 collector_service = RedditCollector(db_manager, analyzer)
 
-@api_bp.route('/status', methods=['GET'])
-def get_status():
-    return jsonify({"status": "ok", "service": "Reddit Sentiment API"})
+job_queue = JobQueue(
+    create_backend(config.JOB_BACKEND, config.REDIS_URL, max_workers=config.JOB_WORKERS),
+    notify=lambda job: socketio.emit('job_progress', job)
+)
+job_queue.register('fetch_subreddit', collector_service.fetch_subreddit_posts)
+job_queue.register('fetch_random', collector_service.fetch_random_posts)
+job_queue.start()
 
-@api_bp.route('/data', methods=['GET'])
-def get_data():
-   
+if config.HOT_WINDOW_ENABLED:
+    import redis
+    hot_window = HotWindow()
+    db_manager.attach_hot_window(hot_window)
+    hot_window.start(db_manager, redis.Redis.from_url(config.REDIS_URL))
+
+def _job_response(job, created):
+    return jsonify({
+        "status": "queued" if created else "coalesced",
+        "job_id": job.id,
+        "job": job.to_dict(),
+        "message": f"Job {job.id} {'queued' if created else 'already in progress'}"
+    }), 202
+
+def _parse_filters():
+    """Reads the filter query parameters shared by /data, /stats and /export."""
     subreddit = request.args.get('subreddit', None)
     
     subreddits_arg = request.args.get('subreddits', None)
@@ -24,40 +48,154 @@ def get_data():
     if subreddits_arg:
         subreddits = [s.strip() for s in subreddits_arg.split(',') if s.strip()]
 
+    # Comma-separated; each matches whole words of the text (all words of a phrase)
+    # or part of the subreddit name
     keywords = request.args.get('keywords', None)
 
     try:
         timeframe = int(request.args.get('timeframe', 24 * 7))
     except ValueError:
         timeframe = 24 * 7
-        
-    data = db_manager.query_sentiment_data(
-        subreddit=subreddit,
-        subreddits=subreddits,
-        keywords=keywords,
-        timeframe_hours=timeframe
-    )
-    for item in data:
-        if item.get('created_utc'):
-            item['created_utc'] = item['created_utc'].isoformat()
-        
-    return jsonify(data)
+
+    # Near-duplicates (bot spam, copypasta) are stored but can be left out
+    exclude_duplicates = request.args.get('exclude_duplicates', '').lower() in ('1', 'true', 'yes')
+
+    return {
+        "subreddit": subreddit,
+        "subreddits": subreddits,
+        "keywords": keywords,
+        "timeframe_hours": timeframe,
+        "exclude_duplicates": exclude_duplicates
+    }
+
+@api_bp.route('/status', methods=['GET'])
+def get_status():
+    return jsonify({"status": "ok", "service": "Reddit Sentiment API"})
+
+MAX_PAGE_SIZE = 1000
+
+@api_bp.route('/data', methods=['GET'])
+def get_data():
+    filters = _parse_filters()
+    # q: free-text search over the full content (the table's search box)
+    search = request.args.get('q') or None
+
+    try:
+        max_points = int(request.args['max_points']) if 'max_points' in request.args else None
+        limit = min(int(request.args['limit']), MAX_PAGE_SIZE) if 'limit' in request.args else None
+        offset = max(int(request.args.get('offset', 0)), 0)
+    except ValueError:
+        return jsonify({"status": "error", "message": "'max_points', 'limit' and 'offset' must be integers"}), 400
+
+    # max_points: shape-preserving downsampling for charts; every returned row then
+    # carries a `weight` (how many original rows it stands for)
+    downsample_mode = request.args.get('downsample', 'scatter')
+    if max_points and max_points > 0 and downsample_mode != 'timeseries':
+        # Sampled where the rows live (MySQL or the hot window); only the kept rows come back
+        data, total = db_manager.sample_sentiment_data(max_points, **filters)
+        return serialization.respond(data, headers={'X-Total-Count': str(total)})
+
+    # limit/offset: one page of the table, ordered by `sort` (prefix '-' for descending)
+    sort = request.args.get('sort', '-created_utc')
+    data = db_manager.query_sentiment_data(**filters, search=search, limit=limit, offset=offset,
+                                           sort=sort.lstrip('-'), descending=sort.startswith('-'))
+    total = db_manager.count_sentiment_data(**filters, search=search) if limit is not None else len(data)
+
+    if max_points and max_points > 0:
+        # LTTB needs every point in the range; run it on a worker thread, off the hub
+        data = db_manager._blocking(downsample.lttb, data, max_points)
+
+    return serialization.respond(data, headers={'X-Total-Count': str(total)})
 
 @api_bp.route('/subreddits', methods=['GET'])
 def get_subreddits():
-    subreddits = db_manager.get_distinct_subreddits()
-    return jsonify(subreddits)
+    prefix = request.args.get('q', None)
+    sort = request.args.get('sort', 'name')
+
+    try:
+        limit = int(request.args['limit']) if 'limit' in request.args else None
+    except ValueError:
+        limit = None
+
+    subreddits = db_manager.get_distinct_subreddits(prefix=prefix, sort=sort, limit=limit)
+    return serialization.respond(subreddits)
+
+MAX_ITEMS_PER_REQUEST = 200
+
+@api_bp.route('/items', methods=['GET'])
+def get_items():
+    """Full content and url for the rows of /data, which only carry a snippet."""
+    ids = [i.strip() for i in request.args.get('ids', '').split(',') if i.strip()]
+    if not ids:
+        return jsonify({"status": "error", "message": "Missing 'ids' query parameter"}), 400
+    if len(ids) > MAX_ITEMS_PER_REQUEST:
+        return jsonify({"status": "error", "message": f"At most {MAX_ITEMS_PER_REQUEST} ids per request"}), 400
+    return serialization.respond(db_manager.get_items(list(dict.fromkeys(ids))))
+
+@api_bp.route('/items/<item_id>', methods=['GET'])
+def get_item(item_id):
+    items = db_manager.get_items([item_id])
+    if not items:
+        return jsonify({"status": "error", "message": f"Item '{item_id}' not found"}), 404
+    return serialization.respond(items[0])
+
+@api_bp.route('/alerts', methods=['GET'])
+def get_alerts():
+    subreddit = request.args.get('subreddit', None)
+    try:
+        hours = int(request.args['hours']) if 'hours' in request.args else None
+        limit = min(int(request.args.get('limit', 100)), 1000)
+    except ValueError:
+        return jsonify({"status": "error", "message": "'hours' and 'limit' must be integers"}), 400
+
+    return serialization.respond(db_manager.get_alerts(subreddit=subreddit, hours=hours, limit=limit))
+
+@api_bp.route('/trending', methods=['GET'])
+def get_trending():
+    filters = _parse_filters()
+    subreddits = filters['subreddits'] or ([filters['subreddit']] if filters['subreddit'] else None)
+    try:
+        hours = min(int(request.args.get('hours', 24)), 24 * 30)
+        limit = min(int(request.args.get('limit', 20)), 200)
+    except ValueError:
+        return jsonify({"status": "error", "message": "'hours' and 'limit' must be integers"}), 400
+
+    payloads = db_manager.get_sketches([trending.SKETCH_KIND], subreddits=subreddits, hours=hours)
+    # Merging up to 720 hourly sketches per subreddit is pure Python: keep it off the hub
+    terms = db_manager._blocking(trending.top_terms, payloads[trending.SKETCH_KIND], limit=limit)
+    return serialization.respond(terms)
 
 @api_bp.route('/groups', methods=['GET'])
 def get_groups():
-    groups = {
-        "Tech": ["technology", "programming", "hardware", "software", "gadgets"],
-        "News": ["news", "worldnews", "politics", "science"],
-        "Crypto": ["bitcoin", "cryptocurrency", "ethereum", "dogecoin"],
-        "Finance": ["finance", "investing", "wallstreetbets", "stocks"],
-        "Entertainment": ["movies", "music", "gaming", "books", "television"]
-    }
-    return jsonify(groups)
+    return jsonify(db_manager.get_groups())
+
+@api_bp.route('/groups/stats', methods=['GET'])
+def get_group_stats():
+    filters = _parse_filters()
+    groups_arg = request.args.get('groups', None)
+    groups = [g.strip() for g in groups_arg.split(',') if g.strip()] if groups_arg else None
+    return serialization.respond(db_manager.get_group_stats(groups=groups,
+                                                            timeframe_hours=filters['timeframe_hours'],
+                                                            exclude_duplicates=filters['exclude_duplicates']))
+
+@api_bp.route('/groups/<name>', methods=['PUT'])
+def save_group(name):
+    data = request.get_json(silent=True) or {}
+    subreddits = data.get('subreddits')
+    if not isinstance(subreddits, list) or not subreddits or not all(isinstance(s, str) and s.strip() for s in subreddits):
+        return jsonify({"status": "error", "message": "'subreddits' must be a non-empty list of names"}), 400
+    if len(name) > 64:
+        return jsonify({"status": "error", "message": "Group names are limited to 64 characters"}), 400
+
+    if not db_manager.save_group(name, [s.strip() for s in subreddits]):
+        return jsonify({"status": "error", "message": f"Could not save group '{name}'"}), 500
+    return jsonify({"status": "ok", "group": name, "subreddits": [s.strip().lower() for s in subreddits]})
+
+@api_bp.route('/groups/<name>', methods=['DELETE'])
+def delete_group(name):
+    if not db_manager.delete_group(name):
+        return jsonify({"status": "error", "message": f"Group '{name}' not found"}), 404
+    return jsonify({"status": "ok"})
 
 @api_bp.route('/fetch/subreddit', methods=['POST'])
 def fetch_subreddit():
@@ -65,41 +203,85 @@ def fetch_subreddit():
     if not data or 'subreddit' not in data:
         return jsonify({"status": "error", "message": "Missing 'subreddit' in JSON body"}), 400
         
-    subreddit_name = data['subreddit']
-    result = collector_service.fetch_subreddit_posts(subreddit_name)
-    
-    if result['status'] == 'error':
-        return jsonify(result), 500
-    return jsonify(result)
+    subreddit_name = str(data['subreddit']).strip().lower()
+    if not subreddit_name:
+        return jsonify({"status": "error", "message": "Missing 'subreddit' in JSON body"}), 400
+
+    job, created = job_queue.enqueue(
+        'fetch_subreddit',
+        {'subreddit_name': subreddit_name},
+        key=f"subreddit:{subreddit_name}"
+    )
+    return _job_response(job, created)
 
 @api_bp.route('/fetch/random', methods=['POST'])
 def fetch_random():
-    result = collector_service.fetch_random_posts()
-    
-    if result['status'] == 'error':
-        return jsonify(result), 500
-    return jsonify(result)
+    job, created = job_queue.enqueue('fetch_random', {}, key="random")
+    return _job_response(job, created)
+
+@api_bp.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    job = job_queue.get(job_id)
+    if not job:
+        return jsonify({"status": "error", "message": f"Job '{job_id}' not found"}), 404
+    return jsonify(job.to_dict())
+
+@api_bp.route('/ratelimit', methods=['GET'])
+def get_ratelimit():
+    return jsonify(collector_service.scheduler.snapshot())
 
 @api_bp.route('/stats', methods=['GET'])
 def get_stats():
-    subreddit = request.args.get('subreddit', None)
-    
-    subreddits_arg = request.args.get('subreddits', None)
-    subreddits = None
-    if subreddits_arg:
-        subreddits = [s.strip() for s in subreddits_arg.split(',') if s.strip()]
+    filters = _parse_filters()
+    stats = db_manager.get_kpi_stats(**filters)
 
-    keywords = request.args.get('keywords', None)
+    # Sketches are kept per subreddit, so a keyword filter cannot be answered from them
+    if stats and not filters['keywords']:
+        subreddits = filters['subreddits'] or ([filters['subreddit']] if filters['subreddit'] else None)
+        exclude_duplicates = filters['exclude_duplicates']
+        payloads = db_manager.get_sketches(kpi_sketches.kinds(exclude_duplicates),
+                                           subreddits=subreddits, hours=filters['timeframe_hours'])
+        # Decompressing and merging thousands of blobs is CPU work; keep it off the hub
+        stats.update(db_manager._blocking(kpi_sketches.summarize, payloads, exclude_duplicates=exclude_duplicates))
+    return serialization.respond(stats)
 
-    try:
-        timeframe = int(request.args.get('timeframe', 24 * 7))
-    except ValueError:
-        timeframe = 24 * 7
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
 
-    stats = db_manager.get_kpi_stats(
-        subreddit=subreddit,
-        subreddits=subreddits,
-        keywords=keywords,
-        timeframe_hours=timeframe
-    )
-    return jsonify(stats)
\ No newline at end of file
+@api_bp.route('/export', methods=['GET'])
+def export_data():
+    export_format = request.args.get('format', 'csv').lower()
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({"status": "error", "message": f"Unsupported format '{export_format}'"}), 400
+
+    mimetype, extension = EXPORT_FORMATS[export_format]
+    columns = db_manager.EXPORT_COLUMNS
+    batches = db_manager.iter_sentiment_data(**_parse_filters(), batch_size=config.EXPORT_BATCH_SIZE)
+    headers = {
+        "Content-Disposition": f"attachment; filename=reddit_export.{extension}",
+        "Vary": "Accept-Encoding"
+    }
+
+    if export_format == 'parquet':
+        # Parquet pages are already compressed (zstd); no transfer encoding on top
+        try:
+            path = export.write_parquet(batches, columns, max_bytes=config.EXPORT_MAX_TEMP_BYTES)
+        except ImportError:
+            batches.close()
+            return jsonify({"status": "error", "message": "Parquet export requires the 'pyarrow' package"}), 501
+        except export.ExportTooLarge as e:
+            batches.close()
+            return jsonify({"status": "error", "message": str(e)}), 413
+        headers["Content-Length"] = str(os.path.getsize(path))
+        return Response(export.file_chunks(path), mimetype=mimetype, headers=headers)
+
+    writer = export.csv_chunks if export_format == 'csv' else export.ndjson_chunks
+    chunks = writer(batches, columns)
+    encoding = serialization.negotiate_encoding(request.headers.get('Accept-Encoding'))
+    if encoding:
+        chunks = serialization.compress_chunks(chunks, encoding)
+        headers["Content-Encoding"] = encoding
+    return Response(chunks, mimetype=mimetype, headers=headers)
\ No newline at end of file
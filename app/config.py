@@ -23,13 +23,68 @@ DB_PORT = int(os.getenv('DB_PORT', 3306))
 DB_USER = os.getenv('DB_USER')
 DB_PASSWORD = os.getenv('DB_PASSWORD')
 DB_NAME = os.getenv('DB_NAME')
+# Connections per process; under eventlet also the number of OS threads DB calls run on
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 10))
+DB_OFFLOAD = os.getenv('DB_OFFLOAD', 'True').lower() == 'true'
 
 REDIS_HOST = os.getenv('REDIS_HOST', 'localhost')
 REDIS_PORT = int(os.getenv('REDIS_PORT', 6379))
 REDIS_URL = os.getenv('REDIS_URL', f'redis://{REDIS_HOST}:{REDIS_PORT}/0')
+# Comma-separated Socket.IO transports; 'websocket' lets several API workers run without sticky sessions
+SOCKETIO_TRANSPORTS = [t.strip() for t in os.getenv('SOCKETIO_TRANSPORTS', 'polling,websocket').split(',') if t.strip()]
 
-if not all([REDDIT_CLIENT_ID, REDDIT_CLIENT_SECRET, REDDIT_USER_AGENT]):
-    raise ValueError("Reddit API credentials (CLIENT_ID, CLIENT_SECRET, USER_AGENT) not found in .env file.")
+# In-memory copy of the last HOT_WINDOW_HOURS of items that serves /api/data and /api/stats without MySQL
+HOT_WINDOW_ENABLED = os.getenv('HOT_WINDOW_ENABLED', 'True').lower() == 'true'
+HOT_WINDOW_HOURS = int(os.getenv('HOT_WINDOW_HOURS', 168))
+HOT_WINDOW_MAX_ITEMS = int(os.getenv('HOT_WINDOW_MAX_ITEMS', 500000))
+
+# 'local' (in-process) or 'redis' (shared by all API processes)
+JOB_BACKEND = os.getenv('JOB_BACKEND', 'local').lower()
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', 4))
+
+# Reddit request budget: 'local' (per process) or 'redis' (one bucket shared by the API and all collectors)
+RATE_LIMIT_BACKEND = os.getenv('RATE_LIMIT_BACKEND', 'local').lower()
+
+# Sentiment scoring: 'full' scores whole texts; 'chunked' bounds work per item
+SENTIMENT_POLICY = os.getenv('SENTIMENT_POLICY', 'chunked').lower()
+SENTIMENT_MAX_TOKENS = int(os.getenv('SENTIMENT_MAX_TOKENS', 512))
+SENTIMENT_CHUNK_TOKENS = int(os.getenv('SENTIMENT_CHUNK_TOKENS', 64))
+SENTIMENT_TITLE_WEIGHT = float(os.getenv('SENTIMENT_TITLE_WEIGHT', 0.3))
+
+# Sentiment backend: 'vader' (default) or 'onnx' (CPU transformer, needs onnxruntime + tokenizers)
+SENTIMENT_BACKEND = os.getenv('SENTIMENT_BACKEND', 'vader').lower()
+SENTIMENT_MODEL_PATH = os.getenv('SENTIMENT_MODEL_PATH', 'models/sentiment/model.onnx')
+SENTIMENT_TOKENIZER_PATH = os.getenv('SENTIMENT_TOKENIZER_PATH', 'models/sentiment/tokenizer.json')
+SENTIMENT_MODEL_LABELS = os.getenv('SENTIMENT_MODEL_LABELS', 'negative,neutral,positive')
+SENTIMENT_BATCH_SIZE = int(os.getenv('SENTIMENT_BATCH_SIZE', 32))
+SENTIMENT_BATCH_WAIT_MS = float(os.getenv('SENTIMENT_BATCH_WAIT_MS', 10))
+
+EXPORT_BATCH_SIZE = int(os.getenv('EXPORT_BATCH_SIZE', 5000))
+EXPORT_MAX_TEMP_BYTES = int(os.getenv('EXPORT_MAX_TEMP_BYTES', 2 * 1024 ** 3))
+
+# Streaming anomaly alerts (per-subreddit EWMA baselines in the collector)
+ALERT_EWMA_ALPHA = float(os.getenv('ALERT_EWMA_ALPHA', 0.02))
+ALERT_VOLUME_ALPHA = float(os.getenv('ALERT_VOLUME_ALPHA', 0.1))
+ALERT_Z_THRESHOLD = float(os.getenv('ALERT_Z_THRESHOLD', 4.0))
+ALERT_BUCKET_SECONDS = int(os.getenv('ALERT_BUCKET_SECONDS', 300))
+ALERT_WARMUP_BUCKETS = int(os.getenv('ALERT_WARMUP_BUCKETS', 12))
+ALERT_MIN_ITEMS = int(os.getenv('ALERT_MIN_ITEMS', 10))
+ALERT_COOLDOWN_SECONDS = int(os.getenv('ALERT_COOLDOWN_SECONDS', 1800))
+ALERT_ALLOWED_LATENESS_SECONDS = int(os.getenv('ALERT_ALLOWED_LATENESS_SECONDS', 120))
+
+# Trending terms: counters kept per (subreddit, hour) Space-Saving sketch
+TRENDING_CAPACITY = int(os.getenv('TRENDING_CAPACITY', 256))
+
+# Near-duplicate detection at ingest (MinHash LSH over recent items)
+DEDUP_THRESHOLD = float(os.getenv('DEDUP_THRESHOLD', 0.8))
+DEDUP_TTL_SECONDS = int(os.getenv('DEDUP_TTL_SECONDS', 6 * 3600))
+DEDUP_MAX_ITEMS = int(os.getenv('DEDUP_MAX_ITEMS', 50000))
+DEDUP_MIN_TOKENS = int(os.getenv('DEDUP_MIN_TOKENS', 8))
+
+def require_reddit_credentials():
+    """Checked when a PRAW client is built, so offline modes (replay) run without them."""
+    if not all([REDDIT_CLIENT_ID, REDDIT_CLIENT_SECRET, REDDIT_USER_AGENT]):
+        raise ValueError("Reddit API credentials (CLIENT_ID, CLIENT_SECRET, USER_AGENT) not found in .env file.")
 
 if not all([DB_USER, DB_PASSWORD, DB_NAME]):
     raise ValueError("Database credentials (DB_USER, DB_PASSWORD, DB_NAME) not found in .env file.")
\ No newline at end of file
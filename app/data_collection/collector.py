@@ -1,14 +1,26 @@
+import re
 import praw
 import time
+import threading
 import datetime
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Iterable, Iterator, Callable, Tuple
 from prawcore.exceptions import PrawcoreException
 from flask_socketio import SocketIO
 import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from app import config
-from app.models import RedditItem
+from app.models import RedditItem, utc_datetime
 from app.database.db_manager import DatabaseManager
 from app.nlp.analyzer import SentimentAnalyzer
+from app.analytics.anomaly import AnomalyDetector
+from app.analytics.trending import TrendingTracker
+from app.analytics.stats import StatsTracker
+from app.analytics.dedup import NearDuplicateIndex, Signature
+from app.data_collection.scheduler import (
+    RateLimitScheduler, MeteredRequestor, scheduler as default_scheduler,
+    PRIORITY_INTERACTIVE, PRIORITY_NORMAL, PRIORITY_BACKGROUND
+)
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -16,19 +28,57 @@ logger = logging.getLogger(__name__)
 logger.info("Initializing Collector's SocketIO client...")
 external_socketio = SocketIO(message_queue=config.REDIS_URL)
 
+# (min_age_hours, max_age_hours, refresh_every_minutes): young items move fast,
+# so they are refreshed often; older ones settle and are revisited rarely.
+REFRESH_TIERS = [
+    (0, 2, 15),
+    (2, 24, 60),
+    (24, 72, 360),
+    (72, 168, 1440),
+]
+INFO_BATCH_SIZE = 100  # Max fullnames per /api/info request
+KEYWORDS_PER_QUERY = 5  # Keywords OR-ed into one search; more keywords means more concurrent shards
+
 class RedditCollector:
-    def __init__(self, db_manager: DatabaseManager, analyzer: SentimentAnalyzer):
+    def __init__(self, db_manager: DatabaseManager, analyzer: SentimentAnalyzer,
+                 scheduler: Optional[RateLimitScheduler] = None,
+                 detector: Optional[AnomalyDetector] = None,
+                 trending: Optional[TrendingTracker] = None,
+                 stats_sketches: Optional[StatsTracker] = None,
+                 dedup: Optional[NearDuplicateIndex] = None,
+                 emitter: Optional[Any] = None,
+                 connect: bool = True):
+        """connect: build and verify the PRAW client now; otherwise only on first use of `reddit`."""
         self.db_manager = db_manager
         self.analyzer = analyzer
-        self.reddit = self._get_reddit_instance()
+        self.scheduler = scheduler or default_scheduler
+        self.detector = detector or AnomalyDetector()
+        self.trending = trending or TrendingTracker(analyzer.clean_text)
+        self.stats_sketches = stats_sketches or StatsTracker()
+        self.dedup = dedup or NearDuplicateIndex()
+        self.emitter = emitter or external_socketio
+        self._reddit = self._get_reddit_instance() if connect else None
+        self._local = threading.local()
+
+    @property
+    def reddit(self) -> praw.Reddit:
+        if self._reddit is None:
+            self._reddit = self._get_reddit_instance()
+        return self._reddit
 
-    def _get_reddit_instance(self) -> praw.Reddit:
+    def _get_reddit_instance(self, verify: bool = True) -> praw.Reddit:
         try:
+            config.require_reddit_credentials()
             reddit = praw.Reddit(
                 client_id=config.REDDIT_CLIENT_ID,
                 client_secret=config.REDDIT_CLIENT_SECRET,
                 user_agent=config.REDDIT_USER_AGENT,
+                # Every HTTP request takes a scheduler token, whatever code path issues it
+                requestor_class=MeteredRequestor,
+                requestor_kwargs={'scheduler': self.scheduler},
             )
+            if not verify:
+                return reddit
             logger.info(f"PRAW instance created. Read-only: {reddit.read_only}")
             _ = reddit.user.me()
             logger.info("Reddit API connection successful.")
@@ -38,42 +88,103 @@ class RedditCollector:
             logger.error("Please check your REDDIT_ environment variables in .env")
             raise
 
-    def _format_data(self, item: Any, item_type: str) -> Optional[RedditItem]:
+    def _thread_reddit(self) -> praw.Reddit:
+        """PRAW is not thread-safe, so each worker thread lazily gets its own instance."""
+        reddit = getattr(self._local, 'reddit', None)
+        if reddit is None:
+            reddit = self._local.reddit = self._get_reddit_instance(verify=False)
+        return reddit
+
+    def _throttled(self, listing: Iterable, task: str, priority: int = PRIORITY_NORMAL) -> Iterator[Any]:
+        """Yields from a lazy PRAW listing; whatever requests it makes are metered under `task`.
+
+        The task is set only around each `next()`, since other code runs on this
+        thread while the generator is suspended.
+        """
+        iterator = iter(listing)
+        while True:
+            with self.scheduler.metered(task, priority):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def _format_batch(self, entries: List[Tuple[Any, str]]) -> List[RedditItem]:
+        """Formats (item, item_type) pairs, scoring every item that is not a near-duplicate
+        in one analyzer call so a batching backend runs one pass per batch."""
+        prepared = []
+        # (position, signature) of the batch's unmatched items, so copies within a batch are scored once
+        leaders: List[Tuple[int, Signature]] = []
+        for item, item_type in entries:
+            try:
+                if item_type == 'post':
+                    content = f"{item.title} {item.selftext}"
+                elif item_type == 'comment':
+                    content = item.body
+                else:
+                    continue
+                # Near-duplicates of a recent item (bots, copypasta, crossposts) reuse its score
+                signature = self.dedup.signature(content)
+                match = self.dedup.lookup(signature, exclude_id=item.id) if signature else None
+                leader = None
+                if not match and signature:
+                    leader = next((position for position, other in leaders
+                                   if self.dedup.similarity(signature, other) >= self.dedup.threshold), None)
+                    if leader is None:
+                        leaders.append((len(prepared), signature))
+                prepared.append((item, item_type, content, signature, match, leader))
+            except Exception as e:
+                logger.error(f"Error formatting item {getattr(item, 'id', 'N/A')}: {e}")
+
+        pending = [(item.title, item.selftext) if item_type == 'post' else (None, content)
+                   for item, item_type, content, _, match, leader in prepared if not match and leader is None]
         try:
-            content = ""
-            url = ""
-            if item_type == 'post':
-                content = f"{item.title} {item.selftext}"
-                url = f"https://www.reddit.com{item.permalink}"
-            elif item_type == 'comment':
-                content = item.body
-                url = f"https://www.reddit.com{item.permalink}"
-            else:
-                return None
-
-            sentiment = self.analyzer.analyze_sentiment(content)
-            
-            return RedditItem(
-                id=item.id,
-                item_type=item_type,
-                subreddit=str(item.subreddit).lower(),
-                author=str(item.author) if item.author else "[deleted]",
-                content=content,
-                url=url,
-                created_utc=datetime.datetime.fromtimestamp(item.created_utc),
-                sentiment_label=sentiment['label'],
-                sentiment_score=sentiment['score'],
-                score=getattr(item, 'score', 0),
-                num_comments=getattr(item, 'num_comments', 0)
-            )
+            scores = iter(self.analyzer.analyze_batch(pending) if pending else [])
         except Exception as e:
-            logger.error(f"Error formatting item {getattr(item, 'id', 'N/A')}: {e}")
-            return None
+            logger.error(f"Error scoring a batch of {len(pending)} items: {e}")
+            scores = None
+
+        formatted = []
+        sentiments: Dict[int, Dict[str, Any]] = {}
+        for position, (item, item_type, content, signature, match, leader) in enumerate(prepared):
+            try:
+                if match:
+                    sentiment, duplicate_of = match.sentiment, match.id
+                elif scores is None:
+                    continue
+                elif leader is not None:
+                    sentiment, duplicate_of = sentiments[leader], prepared[leader][0].id
+                else:
+                    sentiment, duplicate_of = next(scores), None
+                    sentiments[position] = sentiment
+                    if signature:
+                        self.dedup.add(item.id, signature, sentiment)
 
-    def process_stream(self, subreddit_name: str, item_type: str = 'comment', batch_size: int = 50):
+                formatted.append(RedditItem(
+                    id=item.id,
+                    item_type=item_type,
+                    subreddit=str(item.subreddit).lower(),
+                    author=str(item.author) if item.author else "[deleted]",
+                    content=content,
+                    url=f"https://www.reddit.com{item.permalink}",
+                    created_utc=utc_datetime(item.created_utc),
+                    sentiment_label=sentiment['label'],
+                    sentiment_score=sentiment['score'],
+                    sentiment_policy=sentiment.get('policy'),
+                    score=getattr(item, 'score', 0),
+                    num_comments=getattr(item, 'num_comments', 0),
+                    duplicate_of=duplicate_of
+                ))
+            except Exception as e:
+                logger.error(f"Error formatting item {getattr(item, 'id', 'N/A')}: {e}")
+        return formatted
+
+    def process_stream(self, subreddit_name: str, item_type: str = 'comment', batch_size: int = 50,
+                       checkpoint: Optional[Any] = None):
         logger.info(f"Starting {item_type} stream for r/{subreddit_name}...")
         subreddit = self.reddit.subreddit(subreddit_name)
-        data_batch = []
+        pending = []
         
         stream_func = None
         if item_type == 'comment':
@@ -83,96 +194,215 @@ class RedditCollector:
         else:
             raise ValueError("item_type must be 'comment' or 'post'")
 
+        task = f"stream:{subreddit_name}:{item_type}"
+        # With a checkpoint (worker mode) we replay the stream's backlog and skip only
+        # what the previous owner already stored, so a hand-off loses nothing.
+        recent_ids = deque(checkpoint.load() if checkpoint else [], maxlen=1000)
         while True:
             try:
-                for item in stream_func(skip_existing=True):
+                skip_ids = set(recent_ids)
+                for item in self._throttled(stream_func(skip_existing=not skip_ids), task):
                     try:
-                        formatted_item = self._format_data(item, item_type)
-                        if formatted_item:
-                            data_batch.append(formatted_item)
+                        if item.id in skip_ids:
+                            continue
+                        pending.append((item, item_type))
                         
-                        if len(data_batch) >= batch_size:
+                        if len(pending) >= batch_size:
+                            # Scored here, once per batch, rather than item by item
+                            data_batch = self._format_batch(pending)
                             logger.info(f"[{datetime.datetime.now()}] Inserting batch of {len(data_batch)} {item_type}s...")
-                            self.db_manager.insert_batch_data(data_batch)
-                            
-                            logger.info(f"Emitting {len(data_batch)} new items via WebSocket...")
-                            external_socketio.emit('new_data_batch', [item.to_dict() for item in data_batch])
+                            if data_batch:
+                                self._flush_batch(data_batch)
+                            recent_ids.extend(raw.id for raw, _ in pending)
+                            if checkpoint:
+                                checkpoint.save(list(recent_ids))
 
-                            data_batch = []
+                            pending = []
                             
                     except Exception as e:
                         logger.error(f"Error processing item {getattr(item, 'id', 'N/A')}: {e}")
 
             except PrawcoreException as e:
                 logger.error(f"PRAW API Error (RateLimit, ServerError, etc.): {e}")
-                logger.info("Sleeping for 60 seconds before retrying...")
-                time.sleep(60)
+                self.scheduler.backoff(task)
             except Exception as e:
                 logger.error(f"An unexpected error occurred in the stream: {e}")
                 logger.info("Restarting stream in 30 seconds...")
                 time.sleep(30)
 
     def poll_keywords(self, keywords: List[str], subreddits: List[str] = ['all'], 
-                      poll_interval: int = 300, batch_size: int = 50):
-        query = " OR ".join(keywords)
+                      poll_interval: int = 300, batch_size: int = 50,
+                      shard_size: int = KEYWORDS_PER_QUERY, max_items: int = 1000,
+                      checkpoint: Optional[Any] = None):
+        shards = [keywords[i:i + shard_size] for i in range(0, len(keywords), shard_size)]
         subreddit_str = "+".join(subreddits)
-        logger.info(f"Starting keyword polling for '{query}' in r/{subreddit_str}...")
-        
-        processed_ids = set()
+        logger.info(f"Starting keyword polling for {len(keywords)} keywords in {len(shards)} "
+                    f"shard(s) in r/{subreddit_str}...")
+
+        # Per-shard insertion-ordered "set" of seen IDs; pagination stops at the first hit
+        initial_ids = checkpoint.load() if checkpoint else []
+        seen_ids: Dict[str, Dict[str, None]] = {" OR ".join(shard): dict.fromkeys(initial_ids) for shard in shards}
+
+        with ThreadPoolExecutor(max_workers=len(shards)) as pool:
+            while True:
+                try:
+                    logger.info(f"[{datetime.datetime.now()}] Polling {len(shards)} keyword shard(s)...")
+                    futures = [
+                        pool.submit(self._search_shard, shard, subreddit_str, seen_ids[" OR ".join(shard)], max_items)
+                        for shard in shards
+                    ]
+
+                    # The same post can come back from several shards; merge its tags
+                    matches: Dict[str, tuple] = {}
+                    for future in futures:
+                        for post, matched in future.result():
+                            if post.id in matches:
+                                matches[post.id][1].update(matched)
+                            else:
+                                matches[post.id] = (post, set(matched))
+
+                    data_batch = self._format_batch([(post, 'post') for post, _ in matches.values()])
+                    for formatted_post in data_batch:
+                        formatted_post.keywords = sorted(matches[formatted_post.id][1])
+
+                    if data_batch:
+                        logger.info(f"Found {len(data_batch)} new posts. Inserting into DB...")
+                        for start in range(0, len(data_batch), batch_size):
+                            self._flush_batch(data_batch[start:start + batch_size])
+                    else:
+                        logger.info("No new posts found in this poll.")
+
+                    if checkpoint:
+                        checkpoint.save(list(dict.fromkeys(
+                            post_id for shard_seen in seen_ids.values() for post_id in list(shard_seen)[-1000:]
+                        )))
+
+                    for shard_seen in seen_ids.values():
+                        if len(shard_seen) > 10000:
+                            logger.info("Pruning processed_ids cache...")
+                            for stale_id in list(shard_seen)[:-5000]:
+                                del shard_seen[stale_id]
+                    
+                    logger.info(f"Sleeping for {poll_interval} seconds...")
+                    time.sleep(poll_interval)
+
+                except PrawcoreException as e:
+                    logger.error(f"PRAW API Error during polling: {e}")
+                    self.scheduler.backoff(f"poll:{subreddit_str}")
+                except Exception as e:
+                    logger.error(f"An unexpected error occurred during polling: {e}")
+                    logger.info(f"Retrying in {poll_interval} seconds...")
+                    time.sleep(poll_interval)
+
+    def _search_shard(self, shard: List[str], subreddit_str: str, shard_seen: Dict[str, None],
+                      max_items: int) -> List[tuple]:
+        """Pages through newest search results for one keyword shard until it reaches
+        a post this shard has already seen. Returns (post, matched_keywords) pairs.
+
+        Runs on a pool thread and only touches that thread's own PRAW instance."""
+        query = " OR ".join(shard)
+        subreddit = self._thread_reddit().subreddit(subreddit_str)
+        results = []
+        new_ids = []
+        listing = subreddit.search(query, sort='new', time_filter='hour', limit=max_items)
+        for post in self._throttled(listing, f"poll:{query}"):
+            if post.id in shard_seen:
+                break
+            new_ids.append(post.id)
+            results.append((post, self._match_keywords(post, shard)))
+
+        for post_id in reversed(new_ids):
+            shard_seen[post_id] = None
+        return results
+
+    def _match_keywords(self, post: Any, shard: List[str]) -> List[str]:
+        """Keywords that occur as whole words in the title or body ("ai" does not match "said").
+
+        Reddit search also matches stems and fields we do not see; such posts stay
+        untagged rather than being tagged with every keyword of the shard.
+        """
+        text = f"{getattr(post, 'title', '')} {getattr(post, 'selftext', '')}".lower()
+        return [k.lower() for k in shard
+                if re.search(rf"(?<!\w){re.escape(k.lower())}(?!\w)", text)]
+
+    def _flush_batch(self, data_batch: List[RedditItem]):
+        self.db_manager.insert_batch_data(data_batch)
+        logger.info(f"Emitting {len(data_batch)} new items via WebSocket...")
+        self.emitter.emit('new_data_batch', [item.to_dict() for item in data_batch])
+
+        for tracker in (self.trending, self.stats_sketches):
+            tracker.observe(data_batch)
+            tracker.persist(self.db_manager)
+
+        alerts = self.detector.observe(data_batch)
+        if alerts:
+            self.db_manager.insert_alerts(alerts)
+            for alert in alerts:
+                self.emitter.emit('sentiment_alert', alert.to_dict())
+
+    def refresh_engagement(self, tiers: List[tuple] = REFRESH_TIERS, interval: int = 300,
+                           limit_per_tier: int = 1000):
+        logger.info(f"Starting engagement refresher with {len(tiers)} age tiers...")
 
         while True:
             try:
-                logger.info(f"[{datetime.datetime.now()}] Polling for keywords: '{query}'")
-                subreddit = self.reddit.subreddit(subreddit_str)
-                data_batch = []
-                
-                for post in subreddit.search(query, sort='new', time_filter='hour', limit=100):
-                    if post.id not in processed_ids:
-                        try:
-                            formatted_post = self._format_data(post, 'post')
-                            if formatted_post:
-                                data_batch.append(formatted_post)
-                                processed_ids.add(post.id)
-                        except Exception as e:
-                            logger.error(f"Error processing post {post.id}: {e}")
-
-                if data_batch:
-                    logger.info(f"Found {len(data_batch)} new posts. Inserting into DB...")
-                    self.db_manager.insert_batch_data(data_batch)
-                    logger.info(f"Emitting {len(data_batch)} new items via WebSocket...")
-                    external_socketio.emit('new_data_batch', [item.to_dict() for item in data_batch])
-                else:
-                    logger.info("No new posts found in this poll.")
+                refreshed = 0
+                for min_age, max_age, stale_minutes in tiers:
+                    candidates = self.db_manager.get_engagement_refresh_candidates(
+                        min_age, max_age, stale_minutes, limit_per_tier
+                    )
+                    if candidates:
+                        refreshed += self._refresh_items(candidates)
 
-                if len(processed_ids) > 10000:
-                    logger.info("Pruning processed_ids cache...")
-                    processed_ids = set(list(processed_ids)[-5000:])
-                
-                logger.info(f"Sleeping for {poll_interval} seconds...")
-                time.sleep(poll_interval)
+                logger.info(f"[{datetime.datetime.now()}] Refreshed engagement for {refreshed} items. "
+                            f"Sleeping for {interval} seconds...")
+                time.sleep(interval)
 
             except PrawcoreException as e:
-                logger.error(f"PRAW API Error during polling: {e}")
-                logger.info("Sleeping for 60 seconds before retrying...")
-                time.sleep(60)
+                logger.error(f"PRAW API Error during refresh: {e}")
+                self.scheduler.backoff("refresh")
             except Exception as e:
-                logger.error(f"An unexpected error occurred during polling: {e}")
-                logger.info(f"Retrying in {poll_interval} seconds...")
-                time.sleep(poll_interval)
+                logger.error(f"An unexpected error occurred during refresh: {e}")
+                logger.info(f"Retrying in {interval} seconds...")
+                time.sleep(interval)
+
+    def _refresh_items(self, candidates: List[Dict[str, Any]]) -> int:
+        """Resolves items through batched info() lookups and writes back engagement only."""
+        refreshed = 0
+        for start in range(0, len(candidates), INFO_BATCH_SIZE):
+            chunk = candidates[start:start + INFO_BATCH_SIZE]
+            fullnames = [f"{'t3' if c['item_type'] == 'post' else 't1'}_{c['id']}" for c in chunk]
+
+            updates = []
+            for thing in self._throttled(self.reddit.info(fullnames=fullnames), "refresh", PRIORITY_BACKGROUND):
+                updates.append({
+                    "id": thing.id,
+                    "score": getattr(thing, 'score', 0),
+                    "num_comments": getattr(thing, 'num_comments', None)
+                })
+
+            self.db_manager.update_engagement(updates, ids=[c['id'] for c in chunk])
+            refreshed += len(updates)
+        return refreshed
 
-    def fetch_subreddit_posts(self, subreddit_name: str, limit: int = 50) -> Dict[str, Any]:
+    def fetch_subreddit_posts(self, subreddit_name: str, limit: int = 50,
+                              priority: int = PRIORITY_INTERACTIVE,
+                              progress: Optional[Callable[..., None]] = None) -> Dict[str, Any]:
         logger.info(f"Starting on-demand fetch for r/{subreddit_name}...")
+        task = f"fetch:{subreddit_name}"
         try:
             subreddit = self.reddit.subreddit(subreddit_name)
-            data_batch = []
-            for post in subreddit.hot(limit=limit):
+            posts = []
+            for seen, post in enumerate(self._throttled(subreddit.hot(limit=limit), task, priority), start=1):
                 if not post.stickied: 
-                    formatted_post = self._format_data(post, 'post')
-                    if formatted_post:
-                        data_batch.append(formatted_post)
+                    posts.append((post, 'post'))
+                if progress:
+                    progress(seen, limit, f"Fetched {len(posts)} posts from r/{subreddit_name}")
+            data_batch = self._format_batch(posts)
             
             if data_batch:
-                self.db_manager.insert_batch_data(data_batch)
+                # Same path as streams: the hot window, trackers and detector see fetched posts too
+                self._flush_batch(data_batch)
                 
             logger.info(f"On-demand fetch complete. Added {len(data_batch)} posts.")
             return {
@@ -184,25 +414,31 @@ class RedditCollector:
             logger.error(f"Error during on-demand fetch: {e}")
             return {"status": "error", "message": str(e)}
 
-    def fetch_random_posts(self, limit_per_sub: int = 10, num_subs: int = 10) -> Dict[str, Any]:
+    def fetch_random_posts(self, limit_per_sub: int = 10, num_subs: int = 10,
+                           priority: int = PRIORITY_INTERACTIVE,
+                           progress: Optional[Callable[..., None]] = None) -> Dict[str, Any]:
         logger.info("Starting on-demand fetch for random subreddits...")
+        task = "fetch:random"
         try:
-            data_batch = []
-            random_subs = [sub.display_name for sub in self.reddit.subreddits.random_n(num_subs)]
+            posts = []
+            random_subs = [sub.display_name for sub in self._throttled(self.reddit.subreddits.random_n(num_subs),
+                                                                          task, priority)]
             
-            for sub_name in random_subs:
+            for done, sub_name in enumerate(random_subs, start=1):
                 try:
                     subreddit = self.reddit.subreddit(sub_name)
-                    for post in subreddit.hot(limit=limit_per_sub):
+                    for post in self._throttled(subreddit.hot(limit=limit_per_sub), task, priority):
                         if not post.stickied:
-                            formatted_post = self._format_data(post, 'post')
-                            if formatted_post:
-                                data_batch.append(formatted_post)
+                            posts.append((post, 'post'))
                 except Exception:
                     continue 
+                finally:
+                    if progress:
+                        progress(done, len(random_subs), f"Fetched r/{sub_name}")
+            data_batch = self._format_batch(posts)
             
             if data_batch:
-                self.db_manager.insert_batch_data(data_batch)
+                self._flush_batch(data_batch)
                 
             logger.info(f"Random fetch complete. Added {len(data_batch)} posts.")
             return {
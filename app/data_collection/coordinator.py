@@ -0,0 +1,191 @@
+"""
+Collector Worker Coordination
+
+Lets several `run_collector.py worker` processes split a shared list of
+collection tasks through Redis:
+
+- every worker heartbeats into a sorted set; members that stop heartbeating
+  drop out after one lease TTL,
+- each task is owned through a time-limited lease key (SET NX PX) that its
+  owner renews on every tick,
+- each worker aims for ceil(tasks / live workers) leases, shedding extras
+  when a worker joins and picking up expired leases when one disappears,
+- dedupe checkpoints live in Redis, so the next owner of a task resumes
+  where the previous one stopped instead of re-collecting or skipping items.
+
+Task specs:
+    stream:<subreddit>[:comment|post]
+    poll:<kw1>,<kw2>,...[@<sub1>+<sub2>]
+    refresh
+"""
+import json
+import math
+import time
+import uuid
+import socket
+import logging
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'collector'
+
+
+def parse_task(spec: str) -> Tuple[str, Dict[str, Any]]:
+    """Turns a task spec into a collector mode and its keyword arguments."""
+    kind, _, rest = spec.partition(':')
+    if kind == 'stream' and rest:
+        subreddit, _, item_type = rest.partition(':')
+        return 'stream', {'subreddit_name': subreddit, 'item_type': item_type or 'comment'}
+    if kind == 'poll' and rest:
+        keywords, _, subreddits = rest.partition('@')
+        return 'poll', {
+            'keywords': [k for k in keywords.split(',') if k],
+            'subreddits': [s for s in subreddits.split('+') if s] or ['all'],
+        }
+    if kind == 'refresh':
+        return 'refresh', {}
+    raise ValueError(f"Invalid task spec '{spec}'")
+
+
+class RedisCheckpoint:
+    """Recently processed item IDs for one task, shared across worker hand-offs."""
+
+    def __init__(self, redis_client, task: str, max_ids: int = 1000):
+        self.redis = redis_client
+        self.key = f"{KEY_PREFIX}:checkpoint:{task}"
+        self.max_ids = max_ids
+
+    def load(self) -> List[str]:
+        raw = self.redis.get(self.key)
+        return json.loads(raw) if raw else []
+
+    def save(self, ids: List[str]):
+        self.redis.set(self.key, json.dumps(list(ids)[-self.max_ids:]))
+
+
+class WorkCoordinator:
+    def __init__(self, redis_client, worker_id: Optional[str] = None, lease_ttl: float = 30.0,
+                 clock: Callable[[], float] = time.time):
+        self.redis = redis_client
+        self.worker_id = worker_id or f"{socket.gethostname()}:{uuid.uuid4().hex[:8]}"
+        self.lease_ttl = lease_ttl
+        self.clock = clock
+        self.workers_key = f"{KEY_PREFIX}:workers"
+
+    @property
+    def heartbeat_interval(self) -> float:
+        # Renew well before expiry so one slow tick does not lose a lease
+        return self.lease_ttl / 3.0
+
+    def _lease_key(self, task: str) -> str:
+        return f"{KEY_PREFIX}:lease:{task}"
+
+    def _holder(self, task: str) -> Optional[str]:
+        holder = self.redis.get(self._lease_key(task))
+        return holder.decode() if isinstance(holder, bytes) else holder
+
+    def heartbeat(self):
+        now = self.clock()
+        self.redis.zadd(self.workers_key, {self.worker_id: now})
+        self.redis.zremrangebyscore(self.workers_key, '-inf', now - self.lease_ttl)
+
+    def live_workers(self) -> List[str]:
+        members = self.redis.zrangebyscore(self.workers_key, self.clock() - self.lease_ttl, '+inf')
+        # Sorted by ID rather than heartbeat time, so every worker sees the same order
+        return sorted(m.decode() if isinstance(m, bytes) else m for m in members)
+
+    def checkpoint(self, task: str) -> RedisCheckpoint:
+        return RedisCheckpoint(self.redis, task)
+
+    def rebalance(self, tasks: List[str]) -> List[str]:
+        """Renews, sheds and acquires leases; returns the tasks this worker now owns."""
+        self.heartbeat()
+        workers = self.live_workers()
+        share = math.ceil(len(tasks) / max(len(workers), 1))
+        ttl_ms = int(self.lease_ttl * 1000)
+
+        owned = []
+        for task in tasks:
+            if self._holder(task) == self.worker_id:
+                # Not atomic with the check above; if the lease lapsed in between we merely
+                # extend the new owner's lease and notice the loss on the next tick.
+                self.redis.pexpire(self._lease_key(task), ttl_ms)
+                owned.append(task)
+
+        while len(owned) > share:
+            task = owned.pop()
+            self.release(task)
+            logger.info(f"Worker {self.worker_id} handing off '{task}' ({len(workers)} workers live)")
+
+        if len(owned) < share:
+            # Start at a different offset per worker so they do not all race for the same lease
+            offset = workers.index(self.worker_id) * share if self.worker_id in workers else 0
+            offset %= max(len(tasks), 1)
+            for task in tasks[offset:] + tasks[:offset]:
+                if len(owned) >= share:
+                    break
+                if task not in owned and self.redis.set(self._lease_key(task), self.worker_id, nx=True, px=ttl_ms):
+                    owned.append(task)
+                    logger.info(f"Worker {self.worker_id} acquired '{task}'")
+
+        return [task for task in tasks if task in owned]
+
+    def release(self, task: str):
+        if self._holder(task) == self.worker_id:
+            self.redis.delete(self._lease_key(task))
+
+    def leave(self, tasks: List[str]):
+        for task in tasks:
+            self.release(task)
+        self.redis.zrem(self.workers_key, self.worker_id)
+
+
+class CollectorWorker:
+    """Runs whichever tasks the coordinator assigns, each in its own greenthread."""
+
+    def __init__(self, collector, coordinator: WorkCoordinator, tasks: List[str]):
+        for spec in tasks:
+            parse_task(spec)  # Fail fast on typos
+        self.collector = collector
+        self.coordinator = coordinator
+        self.tasks = tasks
+
+    def _run_task(self, spec: str):
+        mode, kwargs = parse_task(spec)
+        checkpoint = self.coordinator.checkpoint(spec)
+        if mode == 'stream':
+            self.collector.process_stream(checkpoint=checkpoint, **kwargs)
+        elif mode == 'poll':
+            self.collector.poll_keywords(checkpoint=checkpoint, **kwargs)
+        elif mode == 'refresh':
+            self.collector.refresh_engagement()
+
+    def run(self):
+        import eventlet
+
+        running: Dict[str, Any] = {}
+        logger.info(f"Worker {self.coordinator.worker_id} joining with {len(self.tasks)} task(s)...")
+        try:
+            while True:
+                owned = self.coordinator.rebalance(self.tasks)
+
+                for spec in list(running):
+                    if spec not in owned:
+                        logger.info(f"Stopping '{spec}' (lease moved to another worker)")
+                        running.pop(spec).kill()
+                    elif running[spec].dead:
+                        logger.warning(f"Task '{spec}' exited; restarting")
+                        del running[spec]
+
+                for spec in owned:
+                    if spec not in running:
+                        running[spec] = eventlet.spawn(self._run_task, spec)
+
+                eventlet.sleep(self.coordinator.heartbeat_interval)
+        finally:
+            for thread in running.values():
+                thread.kill()
+            self.coordinator.leave(self.tasks)
+            logger.info(f"Worker {self.coordinator.worker_id} left.")
@@ -0,0 +1,186 @@
+"""
+Record / Replay
+
+`record_stream` captures the raw fields `RedditCollector._format_batch` reads
+from live stream items into gzip-compressed NDJSON, one item per line, with
+the time each item arrived.
+
+`ReplayRunner` feeds such a recording through the real pipeline (dedup,
+analyzer, trackers, anomaly detector) without talking to Reddit. It replays
+at the recorded pace (`speed=1`), N times faster, or as fast as possible
+(`speed=0`), and reports throughput and per-item latency: the time from an
+item's scheduled arrival until its batch has been flushed.
+
+Replays are meant to run with `SinkDatabaseManager` and `NullEmitter` in place
+of the real database and Socket.IO queue, so benchmark rows never reach the
+dashboard; `run_collector.py replay --write_db` opts back into both.
+"""
+import gzip
+import json
+import time
+import random
+import string
+import logging
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+RECORD_FIELDS = ('id', 'title', 'selftext', 'body', 'permalink', 'subreddit', 'author',
+                 'created_utc', 'score', 'num_comments')
+FIELD_DEFAULTS = {'score': 0, 'num_comments': 0}
+
+
+class RecordedItem:
+    """Stand-in for a PRAW Submission/Comment exposing only the recorded fields."""
+
+    def __init__(self, fields: Dict[str, Any]):
+        for name in RECORD_FIELDS:
+            setattr(self, name, fields.get(name, FIELD_DEFAULTS.get(name)))
+
+
+class SinkDatabaseManager:
+    """Accepts the writes a collector flush makes and only counts them."""
+
+    def __init__(self):
+        self.items = 0
+        self.alerts = 0
+        self.sketches = 0
+
+    def insert_batch_data(self, data_list: List[Any]):
+        self.items += len(data_list)
+
+    def insert_alerts(self, alerts: List[Any]):
+        self.alerts += len(alerts)
+
+    def upsert_sketches(self, rows: List[tuple]):
+        self.sketches += len(rows)
+
+
+class NullEmitter:
+    """Socket.IO stand-in that drops every event."""
+
+    def emit(self, event: str, *args: Any, **kwargs: Any):
+        pass
+
+
+def _capture(item: Any) -> Dict[str, Any]:
+    fields = {}
+    for name in RECORD_FIELDS:
+        value = getattr(item, name, None)
+        if value is None:
+            continue
+        # Subreddit/Redditor objects are recorded by name
+        fields[name] = value if isinstance(value, (str, int, float)) else str(value)
+    return fields
+
+
+def record_stream(collector: Any, subreddit_name: str, item_type: str, path: str,
+                  limit: Optional[int] = None, duration: Optional[float] = None) -> int:
+    """Writes live stream items to `path` until `limit` items or `duration` seconds. Returns the count."""
+    subreddit = collector.reddit.subreddit(subreddit_name)
+    stream_func = subreddit.stream.comments if item_type == 'comment' else subreddit.stream.submissions
+    task = f"record:{subreddit_name}:{item_type}"
+
+    count = 0
+    started = time.time()
+    with gzip.open(path, 'wt', encoding='utf-8') as f:
+        for item in collector._throttled(stream_func(skip_existing=True), task):
+            record = {"t": round(time.time() - started, 3), "type": item_type, "item": _capture(item)}
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            count += 1
+            if (limit and count >= limit) or (duration and time.time() - started >= duration):
+                break
+    logger.info(f"Recorded {count} {item_type}s from r/{subreddit_name} to {path}")
+    return count
+
+
+def iter_recording(path: str) -> Iterator[Tuple[float, str, Dict[str, Any]]]:
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                yield record["t"], record["type"], record["item"]
+
+
+def _percentile(ordered: List[float], q: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+class ReplayRunner:
+    def __init__(self, collector: Any, speed: float = 1.0, batch_size: int = 50,
+                 unique_ids: bool = False, shift_time: bool = False):
+        """
+        speed:      1 replays at the recorded pace, N is N times faster, 0 is unthrottled.
+        unique_ids: suffix ids per run so repeated replays insert new rows instead of upserting.
+        shift_time: move `created_utc` so the recording ends "now" (keeps dashboards' windows populated).
+        """
+        self.collector = collector
+        self.speed = speed
+        self.batch_size = batch_size
+        self.run_tag = ''.join(random.choices(string.ascii_lowercase + string.digits, k=4)) if unique_ids else None
+        self.shift_time = shift_time
+
+    def _prepare(self, fields: Dict[str, Any], time_offset: float) -> RecordedItem:
+        fields = dict(fields)
+        if self.run_tag:
+            fields['id'] = f"{fields['id']}_{self.run_tag}"
+        if time_offset and 'created_utc' in fields:
+            fields['created_utc'] = fields['created_utc'] + time_offset
+        return RecordedItem(fields)
+
+    def run(self, path: str) -> Dict[str, Any]:
+        time_offset = 0.0
+        if self.shift_time:
+            last_created = max((fields.get('created_utc', 0) for _, _, fields in iter_recording(path)), default=0)
+            time_offset = time.time() - last_created if last_created else 0.0
+
+        latencies: List[float] = []
+        batch: List[Tuple[RecordedItem, str]] = []
+        arrivals: List[float] = []
+        start = time.monotonic()
+
+        def flush():
+            formatted = self.collector._format_batch(batch)
+            if formatted:
+                self.collector._flush_batch(formatted)
+            done = time.monotonic()
+            latencies.extend(done - arrived for arrived in arrivals)
+            batch.clear()
+            arrivals.clear()
+
+        records = 0
+        for offset, item_type, fields in iter_recording(path):
+            records += 1
+            scheduled = start + (offset / self.speed if self.speed else 0.0)
+            delay = scheduled - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            arrived = scheduled if self.speed else time.monotonic()
+
+            batch.append((self._prepare(fields, time_offset), item_type))
+            arrivals.append(arrived)
+            if len(batch) >= self.batch_size:
+                flush()
+        if batch:
+            flush()
+
+        elapsed = time.monotonic() - start
+        latencies.sort()
+        report = {
+            "items": len(latencies),
+            "records": records,
+            "seconds": round(elapsed, 3),
+            "items_per_second": round(len(latencies) / elapsed, 1) if elapsed > 0 else None,
+            "speed": self.speed,
+            "latency_ms": {
+                "p50": round(_percentile(latencies, 0.50) * 1000, 1),
+                "p95": round(_percentile(latencies, 0.95) * 1000, 1),
+                "p99": round(_percentile(latencies, 0.99) * 1000, 1),
+                "max": round(latencies[-1] * 1000, 1) if latencies else 0.0,
+            }
+        }
+        logger.info(f"Replay finished: {report}")
+        return report
@@ -0,0 +1,382 @@
+"""
+Rate Limit Scheduler
+
+All Reddit API calls made by one process go through a single token bucket.
+The bucket is re-synchronised from Reddit's X-Ratelimit-* headers on every
+response, so several processes sharing one OAuth client converge on the same
+budget instead of each assuming they have all of it.
+
+Waiters are served by priority class first, then by how few grants their task
+has received, so a busy poller cannot starve a stream, and an interactive
+on-demand fetch always jumps ahead of background collection.
+
+Tokens are taken per HTTP request: `MeteredRequestor` is installed as PRAW's
+requestor and acquires a token for the task set with `metered()` before each
+request, then re-syncs the bucket from that response's headers.
+
+With a Redis client the bucket itself (tokens, rate, block, grant counts)
+lives in Redis and is updated by Lua scripts, so the API process and every
+collector draw from one budget: collectors never dip into the interactive
+reserve anywhere, and `/api/ratelimit` reports all processes. Waiter ordering
+stays per process.
+"""
+import threading
+import time
+import itertools
+import logging
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Tuple
+import prawcore
+from app import config
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_NORMAL = 1
+PRIORITY_BACKGROUND = 2
+
+PRIORITY_NAMES = {
+    PRIORITY_INTERACTIVE: 'interactive',
+    PRIORITY_NORMAL: 'normal',
+    PRIORITY_BACKGROUND: 'background',
+}
+
+UNATTRIBUTED_TASK = 'other'  # Requests made outside any metered() block
+MAX_TRACKED_TASKS = 100  # Per-task grant counters kept; further tasks count under OTHER_TASKS
+OTHER_TASKS = 'other'
+BUCKET_KEY = 'ratelimit:bucket'
+GRANTS_KEY = 'ratelimit:grants'
+BUCKET_TTL = 3600
+
+# KEYS: bucket, grants. ARGV: now, floor, capacity, default_rate, task, max_tasks, ttl.
+# Returns the seconds to wait as a string ("0" = token taken); Lua numbers would be truncated.
+TAKE_SCRIPT = """
+local b = redis.call('HMGET', KEYS[1], 'tokens', 'ts', 'rate', 'blocked_until', 'reset_ts')
+local now, floor, capacity, default_rate = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3]), tonumber(ARGV[4])
+local tokens, ts, rate = tonumber(b[1]) or capacity, tonumber(b[2]) or now, tonumber(b[3]) or default_rate
+local blocked, reset = tonumber(b[4]) or 0, tonumber(b[5])
+if reset and now >= reset then
+    rate = default_rate
+    redis.call('HDEL', KEYS[1], 'reset_ts')
+end
+tokens = math.min(capacity, tokens + math.max(now - ts, 0) * rate)
+local wait = 0
+if blocked > now then
+    wait = blocked - now
+elseif tokens >= floor then
+    tokens = tokens - 1
+    local task = ARGV[5]
+    if redis.call('HEXISTS', KEYS[2], task) == 0 and redis.call('HLEN', KEYS[2]) >= tonumber(ARGV[6]) then
+        task = 'other'
+    end
+    redis.call('HINCRBY', KEYS[2], task, 1)
+    redis.call('EXPIRE', KEYS[2], 86400)
+elseif rate > 0 then
+    wait = math.max((floor - tokens) / rate, 0.05)
+else
+    wait = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now), 'rate', tostring(rate))
+redis.call('EXPIRE', KEYS[1], tonumber(ARGV[7]))
+return tostring(wait)
+"""
+
+# KEYS: bucket. ARGV: now, remaining, reset_ts ('' if unknown), capacity, default_rate, ttl, used.
+SYNC_SCRIPT = """
+local b = redis.call('HMGET', KEYS[1], 'tokens', 'ts', 'rate', 'blocked_until')
+local now, remaining, capacity, default_rate = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[4]), tonumber(ARGV[5])
+local reset = tonumber(ARGV[3])
+local tokens, ts, rate = tonumber(b[1]) or capacity, tonumber(b[2]) or now, tonumber(b[3]) or default_rate
+local blocked = tonumber(b[4]) or 0
+tokens = math.min(capacity, tokens + math.max(now - ts, 0) * rate)
+if remaining <= 0 and reset then
+    blocked = math.max(blocked, reset)
+    rate = default_rate
+    tokens = 0
+elseif reset then
+    rate = remaining / math.max(reset - now, 1)
+    tokens = math.min(tokens, remaining)
+else
+    rate = default_rate
+    tokens = math.min(tokens, remaining)
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now), 'rate', tostring(rate),
+           'blocked_until', tostring(blocked), 'remaining', ARGV[2], 'used', ARGV[7])
+if reset then redis.call('HSET', KEYS[1], 'reset_ts', ARGV[3]) else redis.call('HDEL', KEYS[1], 'reset_ts') end
+redis.call('EXPIRE', KEYS[1], tonumber(ARGV[6]))
+return 1
+"""
+
+# KEYS: bucket. ARGV: until, ttl.
+BLOCK_SCRIPT = """
+local blocked = tonumber(redis.call('HGET', KEYS[1], 'blocked_until')) or 0
+redis.call('HSET', KEYS[1], 'blocked_until', tostring(math.max(blocked, tonumber(ARGV[1]))), 'tokens', '0')
+redis.call('EXPIRE', KEYS[1], tonumber(ARGV[2]))
+return 1
+"""
+
+
+def limits_from_headers(headers: Any) -> Optional[Dict[str, Any]]:
+    """Reads Reddit's X-Ratelimit-* response headers into the shape of `reddit.auth.limits`."""
+    remaining = headers.get('x-ratelimit-remaining')
+    if remaining is None:
+        return None
+    reset = headers.get('x-ratelimit-reset')
+    used = headers.get('x-ratelimit-used')
+    return {
+        'remaining': float(remaining),
+        'used': int(used) if used is not None else None,
+        'reset_timestamp': time.time() + float(reset) if reset is not None else None,
+    }
+
+
+class MeteredRequestor(prawcore.Requestor):
+    """PRAW requestor that takes one scheduler token per HTTP request.
+
+    Install with `praw.Reddit(..., requestor_class=MeteredRequestor,
+    requestor_kwargs={'scheduler': scheduler})`.
+    """
+
+    def __init__(self, *args: Any, scheduler: "RateLimitScheduler", **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.scheduler = scheduler
+
+    def request(self, *args: Any, **kwargs: Any):
+        task, priority = self.scheduler.current_task()
+        self.scheduler.acquire(task, priority)
+        response = super().request(*args, **kwargs)
+        self.scheduler.update(limits_from_headers(response.headers), task)
+        return response
+
+
+class RateLimitScheduler:
+    def __init__(self, requests_per_minute: float = 100.0, burst: int = 10,
+                 interactive_reserve: int = 5, max_backoff: float = 300.0,
+                 redis_client: Optional[Any] = None, max_tracked_tasks: int = MAX_TRACKED_TASKS):
+        """redis_client: share the bucket with every process using the same Redis."""
+        self.capacity = float(burst)
+        self.rate = requests_per_minute / 60.0
+        self.default_rate = self.rate
+        self.tokens = self.capacity
+        self.interactive_reserve = interactive_reserve
+        self.max_backoff = max_backoff
+        self.max_tracked_tasks = max_tracked_tasks
+
+        self.remaining: Optional[float] = None
+        self.used: Optional[int] = None
+        self.reset_timestamp: Optional[float] = None
+        self.blocked_until = 0.0
+
+        self.grants: Dict[str, int] = defaultdict(int)
+        self._recent_grants: Dict[str, float] = defaultdict(float)
+        self._last_decay = time.monotonic()
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.throttle_events = 0
+
+        self._waiters: Dict[int, tuple] = {}
+        self._seq = itertools.count()
+        self._last_refill = time.monotonic()
+        self._cond = threading.Condition()
+        self._context = threading.local()
+
+        self.redis = redis_client
+        if redis_client is not None:
+            self._take_script = redis_client.register_script(TAKE_SCRIPT)
+            self._sync_script = redis_client.register_script(SYNC_SCRIPT)
+            self._block_script = redis_client.register_script(BLOCK_SCRIPT)
+
+    @contextmanager
+    def metered(self, task: str, priority: int = PRIORITY_NORMAL) -> Iterator[None]:
+        """Attributes the requests made by this thread inside the block to `task`."""
+        previous = getattr(self._context, 'task', None)
+        self._context.task = (task, priority)
+        try:
+            yield
+        finally:
+            self._context.task = previous
+
+    def current_task(self) -> Tuple[str, int]:
+        return getattr(self._context, 'task', None) or (UNATTRIBUTED_TASK, PRIORITY_NORMAL)
+
+    def _count_grant(self, task: str):
+        if task not in self.grants and len(self.grants) >= self.max_tracked_tasks:
+            task = OTHER_TASKS
+        self.grants[task] += 1
+
+    def _refill(self):
+        now = time.monotonic()
+        if self.reset_timestamp and time.time() >= self.reset_timestamp:
+            # A new window started; go back to the nominal rate until headers say otherwise
+            self.rate = self.default_rate
+            self.reset_timestamp = None
+        self.tokens = min(self.capacity, self.tokens + (now - self._last_refill) * self.rate)
+        self._last_refill = now
+        if now - self._last_decay >= 60:
+            # Fairness looks at recent usage only, so a newly added task does not
+            # monopolise the budget while it "catches up" with long-running ones
+            for task in list(self._recent_grants):
+                self._recent_grants[task] *= 0.5
+                if self._recent_grants[task] < 0.01:
+                    del self._recent_grants[task]  # Idle task; forget it
+            self._last_decay = now
+
+    def _next_waiter(self) -> Optional[int]:
+        if not self._waiters:
+            return None
+        # Priority class first, then least-served task, then arrival order
+        return min(self._waiters, key=lambda t: (self._waiters[t][0], self._recent_grants[self._waiters[t][1]], t))
+
+    def acquire(self, task: str, priority: int = PRIORITY_NORMAL):
+        """Blocks until `task` may issue one API request."""
+        with self._cond:
+            ticket = next(self._seq)
+            self._waiters[ticket] = (priority, task)
+            try:
+                while True:
+                    self._refill()
+                    floor = 1.0 if priority == PRIORITY_INTERACTIVE else 1.0 + self.interactive_reserve
+                    if self._next_waiter() == ticket:
+                        wait = self._take(task, floor)
+                        if wait <= 0:
+                            self._recent_grants[task] += 1
+                            return
+                    else:
+                        wait = 0.05
+                    self._cond.wait(timeout=min(wait, 5.0))
+            finally:
+                del self._waiters[ticket]
+                self._cond.notify_all()
+
+    def _take(self, task: str, floor: float) -> float:
+        """Takes a token if at least `floor` are available; returns 0 or the seconds to wait."""
+        if self.redis is not None:
+            return float(self._take_script(
+                keys=[BUCKET_KEY, GRANTS_KEY],
+                args=[time.time(), floor, self.capacity, self.default_rate, task, self.max_tracked_tasks, BUCKET_TTL]
+            ))
+        wait = self.blocked_until - time.time()
+        if wait > 0:
+            return wait
+        if self.tokens >= floor:
+            self.tokens -= 1.0
+            self._count_grant(task)
+            return 0.0
+        return max((floor - self.tokens) / self.rate, 0.05) if self.rate > 0 else 1.0
+
+    def update(self, limits: Optional[Dict[str, Any]], task: Optional[str] = None):
+        """Re-synchronises the bucket from the latest rate-limit headers."""
+        with self._cond:
+            if task:
+                self.errors.pop(task, None)
+            if not limits or limits.get('remaining') is None:
+                return
+
+            self.remaining = float(limits['remaining'])
+            self.used = limits.get('used')
+            self.reset_timestamp = limits.get('reset_timestamp')
+
+            if self.redis is not None:
+                self._sync_script(keys=[BUCKET_KEY], args=[
+                    time.time(), self.remaining, self.reset_timestamp or '', self.capacity, self.default_rate,
+                    BUCKET_TTL, self.used if self.used is not None else ''
+                ])
+                self._cond.notify_all()
+                return
+
+            self._refill()
+            if self.remaining <= 0 and self.reset_timestamp:
+                # Budget exhausted: nothing may go out until the window resets
+                self.blocked_until = max(self.blocked_until, self.reset_timestamp)
+                self.rate = self.default_rate
+                self.tokens = 0.0
+            elif self.reset_timestamp:
+                seconds_left = max(self.reset_timestamp - time.time(), 1.0)
+                # Spread what is left of the window evenly until it resets
+                self.rate = self.remaining / seconds_left
+                self.tokens = min(self.tokens, self.remaining)
+            else:
+                self.rate = self.default_rate
+                self.tokens = min(self.tokens, self.remaining)
+            self._cond.notify_all()
+
+    def backoff(self, task: str) -> float:
+        """Records a throttling/server error for `task` and sleeps for as long as
+        the headers (or, failing that, an exponential backoff) say we should."""
+        with self._cond:
+            self.throttle_events += 1
+            self.errors[task] += 1
+            now = time.time()
+            if self.remaining is not None and self.remaining <= 0 and self.reset_timestamp:
+                delay = self.reset_timestamp - now
+            else:
+                delay = 5.0 * (2 ** (self.errors[task] - 1))
+            delay = min(max(delay, 1.0), self.max_backoff)
+            self.blocked_until = max(self.blocked_until, now + delay)
+            self.tokens = 0.0
+            if self.redis is not None:
+                # Every process sharing the budget backs off together
+                self._block_script(keys=[BUCKET_KEY], args=[self.blocked_until, BUCKET_TTL])
+
+        logger.info(f"Rate limiter backing off task '{task}' for {delay:.0f} seconds...")
+        time.sleep(delay)
+        return delay
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._cond:
+            self._refill()
+            waiting = defaultdict(int)
+            for priority, _ in self._waiters.values():
+                waiting[PRIORITY_NAMES.get(priority, str(priority))] += 1
+            if self.redis is not None:
+                return self._shared_snapshot(dict(waiting))
+            return {
+                "tokens": round(self.tokens, 2),
+                "capacity": self.capacity,
+                "refill_per_second": round(self.rate, 4),
+                "remaining": self.remaining,
+                "used": self.used,
+                "reset_in_seconds": round(self.reset_timestamp - time.time(), 1) if self.reset_timestamp else None,
+                "blocked_for_seconds": round(max(self.blocked_until - time.time(), 0.0), 1),
+                "waiting": dict(waiting),
+                "grants": dict(self.grants),
+                "throttle_events": self.throttle_events,
+            }
+
+    def _shared_snapshot(self, waiting: Dict[str, int]) -> Dict[str, Any]:
+        """State of the Redis bucket (all processes); `waiting` covers this process only."""
+        def _decode(value: Any) -> str:
+            return value.decode() if isinstance(value, bytes) else value
+
+        bucket = {_decode(k): _decode(v) for k, v in self.redis.hgetall(BUCKET_KEY).items()}
+        grants = {_decode(k): int(v) for k, v in self.redis.hgetall(GRANTS_KEY).items()}
+        now = time.time()
+        rate = float(bucket.get('rate', self.default_rate))
+        tokens = min(self.capacity, float(bucket.get('tokens', self.capacity))
+                     + max(now - float(bucket.get('ts', now)), 0.0) * rate)
+        reset = float(bucket['reset_ts']) if bucket.get('reset_ts') else None
+        return {
+            "tokens": round(tokens, 2),
+            "capacity": self.capacity,
+            "refill_per_second": round(rate, 4),
+            "remaining": float(bucket['remaining']) if bucket.get('remaining') else None,
+            "used": int(bucket['used']) if bucket.get('used') else None,
+            "reset_in_seconds": round(reset - now, 1) if reset else None,
+            "blocked_for_seconds": round(max(float(bucket.get('blocked_until', 0)) - now, 0.0), 1),
+            "waiting": waiting,
+            "grants": grants,
+            "throttle_events": self.throttle_events,
+        }
+
+
+def create_scheduler(backend: str, redis_url: str) -> RateLimitScheduler:
+    if backend == 'redis':
+        import redis
+        return RateLimitScheduler(redis_client=redis.Redis.from_url(redis_url))
+    if backend == 'local':
+        return RateLimitScheduler()
+    raise ValueError(f"Unknown RATE_LIMIT_BACKEND '{backend}' (expected 'local' or 'redis')")
+
+
+scheduler = create_scheduler(config.RATE_LIMIT_BACKEND, config.REDIS_URL)
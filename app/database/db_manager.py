@@ -1,60 +1,92 @@
+import functools
 import mysql.connector
 from mysql.connector import Error, pooling
 from contextlib import contextmanager
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple, Iterator
 import logging
 from app import config
-from app.models import RedditItem
+from app.models import RedditItem, SentimentAlert, keyword_terms
+from app.database import migrations
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def _offload_enabled() -> bool:
+    """True when eventlet has patched threading (run_api.py, run_collector.py, gunicorn's eventlet worker)."""
+    if not config.DB_OFFLOAD:
+        return False
+    try:
+        from eventlet import patcher
+    except ImportError:
+        return False
+    return patcher.is_monkey_patched('thread')
+
+def _escape_like(text: str) -> str:
+    return text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+def offloaded(method):
+    """Runs a DatabaseManager method on a real OS thread (eventlet tpool) when offloading
+    is on, so a slow query blocks only that thread instead of the whole hub."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        return self._blocking(method, self, *args, **kwargs)
+    return wrapper
+
 class DatabaseManager:
     def __init__(self):
-        self.pool = self._create_pool()
-        self._ensure_schema_updates()
+        self.offload = _offload_enabled()
+        if self.offload:
+            from eventlet import patcher, tpool
+            # One tpool thread per connection: each thread keeps its own connection, so
+            # no pool lock (a green lock after monkey-patching) is shared between OS threads
+            tpool.set_num_threads(config.DB_POOL_SIZE)
+            self._local = patcher.original('threading').local()
+            self.pool = None
+            logger.info(f"DB calls offloaded to {config.DB_POOL_SIZE} OS threads.")
+        else:
+            self.pool = self._create_pool()
+        self.hot_window = None
+        self._check_schema_version()
+
+    def attach_hot_window(self, window):
+        """Serves covered `query_sentiment_data`/`get_kpi_stats` calls from an in-memory HotWindow."""
+        self.hot_window = window
 
-    def _ensure_schema_updates(self):
-        """Checks for missing columns and updates schema if needed."""
+    def _blocking(self, fn, *args, **kwargs):
+        if self.offload:
+            from eventlet import tpool
+            return tpool.execute(fn, *args, **kwargs)
+        return fn(*args, **kwargs)
+
+    def _check_schema_version(self):
+        """Compares the database's migration version with the one this code expects.
+
+        Schema changes are applied by `scripts/migrate.py`, never at startup.
+        """
+        self.schema_version = 0
         try:
             with self.get_connection() as conn:
                 if conn:
                     with conn.cursor() as cursor:
-                        cursor.execute("SHOW COLUMNS FROM reddit_data LIKE 'score';")
-                        if not cursor.fetchone():
-                            logger.info("Column 'score' missing in reddit_data. Adding it...")
-                            try:
-                                cursor.execute("ALTER TABLE reddit_data ADD COLUMN score INT DEFAULT 0;")
-                                conn.commit()
-                                logger.info("Column 'score' added successfully.")
-                            except Error as e:
-                                if e.errno == 1060:
-                                    logger.warning("Race condition detected: 'score' column already exists. Skipping.")
-                                else:
-                                    raise e
-                        
-                        cursor.execute("SHOW COLUMNS FROM reddit_data LIKE 'num_comments';")
-                        if not cursor.fetchone():
-                            logger.info("Column 'num_comments' missing in reddit_data. Adding it...")
-                            try:
-                                cursor.execute("ALTER TABLE reddit_data ADD COLUMN num_comments INT DEFAULT 0;")
-                                conn.commit()
-                                logger.info("Column 'num_comments' added successfully.")
-                            except Error as e:
-                                if e.errno == 1060:
-                                    logger.warning("Race condition detected: 'num_comments' column already exists. Skipping.")
-                                else:
-                                    raise e
-                                    
-                        logger.info("Schema check passed.")
+                        self.schema_version = migrations.current_version(cursor)
         except Error as e:
-            logger.error(f"Error during schema update check: {e}")
+            logger.error(f"Error reading schema version: {e}")
+            return
+
+        if self.schema_version < migrations.LATEST_VERSION:
+            logger.error(f"Database schema is at version {self.schema_version}, this code needs "
+                         f"{migrations.LATEST_VERSION}. Run 'python scripts/migrate.py'.")
+        elif self.schema_version > migrations.LATEST_VERSION:
+            logger.warning(f"Database schema version {self.schema_version} is newer than this code "
+                           f"({migrations.LATEST_VERSION}).")
+        else:
+            logger.info(f"Schema version {self.schema_version} is current.")
 
     def _create_pool(self) -> pooling.MySQLConnectionPool:
         try:
             pool = pooling.MySQLConnectionPool(
                 pool_name="reddit_pool",
-                pool_size=5,
+                pool_size=config.DB_POOL_SIZE,
                 pool_reset_session=True,
                 host=config.DB_HOST,
                 port=config.DB_PORT,
@@ -68,8 +100,35 @@ class DatabaseManager:
             logger.error(f"Error while creating MySQL connection pool: {e}")
             raise
 
+    def _thread_connection(self):
+        connection = getattr(self._local, 'connection', None)
+        try:
+            if connection is None or not connection.is_connected():
+                connection = mysql.connector.connect(
+                    host=config.DB_HOST,
+                    port=config.DB_PORT,
+                    user=config.DB_USER,
+                    password=config.DB_PASSWORD,
+                    database=config.DB_NAME
+                )
+                self._local.connection = connection
+            return connection
+        except Error as e:
+            logger.error(f"Error opening MySQL connection: {e}")
+            return None
+
     @contextmanager
     def get_connection(self):
+        if self.offload:
+            connection = self._thread_connection()
+            try:
+                yield connection
+            finally:
+                # Reads open a transaction too; end it so the next call sees fresh data
+                if connection and connection.in_transaction:
+                    connection.rollback()
+            return
+
         connection = None
         try:
             connection = self.pool.get_connection()
@@ -81,82 +140,277 @@ class DatabaseManager:
             if connection and connection.is_connected():
                 connection.close()
 
+    @offloaded
     def insert_batch_data(self, data_list: List[RedditItem]):
         if not data_list:
             return
 
         query = """
         INSERT INTO reddit_data 
-        (id, item_type, subreddit, author, content, url, created_utc, 
-         sentiment_label, sentiment_score, score, num_comments)
+        (id, item_type, subreddit, author, snippet, created_utc, 
+         sentiment_label, sentiment_score, sentiment_policy, score, num_comments, duplicate_of)
         VALUES 
-        (%(id)s, %(item_type)s, %(subreddit)s, %(author)s, %(content)s, %(url)s, 
-         %(created_utc)s, %(sentiment_label)s, %(sentiment_score)s, %(score)s, %(num_comments)s)
+        (%(id)s, %(item_type)s, %(subreddit)s, %(author)s, %(snippet)s, 
+         %(created_utc)s, %(sentiment_label)s, %(sentiment_score)s, %(sentiment_policy)s,
+         %(score)s, %(num_comments)s, %(duplicate_of)s)
         ON DUPLICATE KEY UPDATE
-            content = VALUES(content),
+            snippet = VALUES(snippet),
             sentiment_label = VALUES(sentiment_label),
             sentiment_score = VALUES(sentiment_score),
+            sentiment_policy = VALUES(sentiment_policy),
+            duplicate_of = VALUES(duplicate_of),
             score = VALUES(score),
             num_comments = VALUES(num_comments),
             processed_at = CURRENT_TIMESTAMP
         """
         
-        batch_params = [item.to_dict() for item in data_list]
+        content_query = """
+        INSERT INTO reddit_content (id, content, url)
+        VALUES (%(id)s, %(content)s, %(url)s)
+        ON DUPLICATE KEY UPDATE content = VALUES(content), url = VALUES(url)
+        """
+
+        keyword_query = "INSERT IGNORE INTO reddit_keywords (keyword, item_id) VALUES (%s, %s)"
+
+        # avg_sentiment is assigned before item_count so it still sees the old count
+        subreddit_query = """
+        INSERT INTO subreddits (name, item_count, avg_sentiment, first_seen, last_seen)
+        VALUES (%s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE
+            avg_sentiment = (avg_sentiment * item_count + VALUES(avg_sentiment) * VALUES(item_count))
+                            / (item_count + VALUES(item_count)),
+            item_count = item_count + VALUES(item_count),
+            first_seen = LEAST(COALESCE(first_seen, VALUES(first_seen)), VALUES(first_seen)),
+            last_seen = GREATEST(COALESCE(last_seen, VALUES(last_seen)), VALUES(last_seen))
+        """
+
+        batch_params = []
+        keyword_params = []
+        for item in data_list:
+            params = item.to_dict()
+            # Poll matches (possibly multi-word) plus every word of the text, on every ingest path
+            terms = {keyword.lower() for keyword in params.pop('keywords')} | keyword_terms(item.content)
+            keyword_params.extend((term, item.id) for term in terms)
+            batch_params.append(params)
 
         try:
             with self.get_connection() as conn:
                 if conn:
                     with conn.cursor() as cursor:
+                        # Only items not stored before count towards the subreddit totals
+                        placeholders = ', '.join(['%s'] * len(data_list))
+                        cursor.execute(f"SELECT id FROM reddit_data WHERE id IN ({placeholders})",
+                                       tuple(item.id for item in data_list))
+                        existing_ids = {row[0] for row in cursor.fetchall()}
+
                         cursor.executemany(query, batch_params)
+                        cursor.executemany(content_query, batch_params)
+                        if keyword_params:
+                            cursor.executemany(keyword_query, keyword_params)
+
+                        subreddit_params = self._aggregate_subreddits(
+                            [item for item in data_list if item.id not in existing_ids]
+                        )
+                        if subreddit_params:
+                            cursor.executemany(subreddit_query, subreddit_params)
                         conn.commit()
         except Error as e:
             logger.error(f"Error during batch insert: {e}")
 
-    def query_sentiment_data(self, subreddit: Optional[str] = None,
-                             subreddits: Optional[List[str]] = None,
-                             keywords: Optional[str] = None,
-                             timeframe_hours: int = 24) -> List[Dict[str, Any]]:
-        base_query = """
-        SELECT 
-            id, 
-            item_type, 
-            subreddit, 
-            created_utc, 
-            sentiment_label, 
-            sentiment_score,
-            score,
-            num_comments,
-            content, 
-            url
-        FROM 
-            reddit_data
-        WHERE 
-            created_utc >= NOW() - INTERVAL %s HOUR
-        """
-        
-        params = [timeframe_hours]
+    def _aggregate_subreddits(self, new_items: List[RedditItem]) -> List[tuple]:
+        totals: Dict[str, Dict[str, Any]] = {}
+        for item in new_items:
+            entry = totals.setdefault(item.subreddit, {
+                "count": 0, "sentiment_sum": 0.0, "first": item.created_utc, "last": item.created_utc
+            })
+            entry["count"] += 1
+            entry["sentiment_sum"] += item.sentiment_score or 0.0
+            entry["first"] = min(entry["first"], item.created_utc)
+            entry["last"] = max(entry["last"], item.created_utc)
+
+        return [
+            (name, e["count"], e["sentiment_sum"] / e["count"], e["first"], e["last"])
+            for name, e in totals.items()
+        ]
+
+    def _build_filters(self, subreddit: Optional[str] = None,
+                       subreddits: Optional[List[str]] = None,
+                       keywords: Optional[str] = None,
+                       timeframe_hours: int = 24,
+                       exclude_duplicates: bool = False,
+                       search: Optional[str] = None) -> Tuple[str, List[Any]]:
+        """Builds the WHERE clause shared by the data and stats queries."""
+        where_clauses = ["created_utc >= UTC_TIMESTAMP() - INTERVAL %s HOUR"]
+        params: List[Any] = [timeframe_hours]
 
         if subreddit:
-            base_query += " AND subreddit = %s"
+            where_clauses.append("subreddit = %s")
             params.append(subreddit)
-        
+
         if subreddits and len(subreddits) > 0:
             placeholders = ', '.join(['%s'] * len(subreddits))
-            base_query += f" AND subreddit IN ({placeholders})"
+            where_clauses.append(f"subreddit IN ({placeholders})")
             params.extend(subreddits)
 
         if keywords:
-            keyword_list = [k.strip() for k in keywords.split(',') if k.strip()]
+            keyword_list = [k.strip().lower() for k in keywords.split(',') if k.strip()]
             if keyword_list:
-                keyword_conditions = []
-                for k in keyword_list:
-                    keyword_conditions.append("(content LIKE %s OR subreddit LIKE %s)")
-                    params.extend([f"%{k}%", f"%{k}%"])
-                
-                if keyword_conditions:
-                    base_query += " AND (" + " OR ".join(keyword_conditions) + ")"
-            
-        base_query += " ORDER BY created_utc DESC;"
+                # Keywords match whole words of the text through the reddit_keywords index
+                # (a multi-word keyword needs all of its words), or part of the subreddit name.
+                matches = ["subreddit LIKE %s" for _ in keyword_list]
+                params.extend(f"%{_escape_like(k)}%" for k in keyword_list)
+
+                placeholders = ', '.join(['%s'] * len(keyword_list))
+                matches.append(f"id IN (SELECT item_id FROM reddit_keywords WHERE keyword IN ({placeholders}))")
+                params.extend(keyword_list)
+
+                for keyword in keyword_list:
+                    terms = sorted(keyword_terms(keyword))
+                    if len(terms) > 1:
+                        placeholders = ', '.join(['%s'] * len(terms))
+                        matches.append(f"id IN (SELECT item_id FROM reddit_keywords WHERE keyword IN "
+                                       f"({placeholders}) GROUP BY item_id HAVING COUNT(*) = %s)")
+                        params.extend(terms)
+                        params.append(len(terms))
+
+                where_clauses.append(f"({' OR '.join(matches)})")
+
+        if exclude_duplicates:
+            where_clauses.append("duplicate_of IS NULL")
+
+        if search and search.strip():
+            # Free-text table search: substring of the full text, not just the stored snippet
+            pattern = f"%{_escape_like(search.strip())}%"
+            where_clauses.append(
+                "(subreddit LIKE %s OR sentiment_label = %s OR EXISTS "
+                "(SELECT 1 FROM reddit_content c WHERE c.id = reddit_data.id AND c.content LIKE %s))"
+            )
+            params.extend([pattern, search.strip().lower(), pattern])
+
+        return " AND ".join(where_clauses), params
+
+    @offloaded
+    def get_engagement_refresh_candidates(self, min_age_hours: int, max_age_hours: int,
+                                          stale_minutes: int, limit: int = 1000) -> List[Dict[str, Any]]:
+        """Returns items inside an age tier whose engagement was last written more than
+        `stale_minutes` ago, oldest refresh first."""
+        query = """
+        SELECT id, item_type
+        FROM reddit_data
+        WHERE created_utc >= UTC_TIMESTAMP() - INTERVAL %s HOUR
+          AND created_utc < UTC_TIMESTAMP() - INTERVAL %s HOUR
+          AND processed_at < NOW() - INTERVAL %s MINUTE
+        ORDER BY processed_at ASC
+        LIMIT %s;
+        """
+        results = []
+        try:
+            with self.get_connection() as conn:
+                if conn:
+                    with conn.cursor(dictionary=True) as cursor:
+                        cursor.execute(query, (max_age_hours, min_age_hours, stale_minutes, limit))
+                        results = cursor.fetchall()
+        except Error as e:
+            logger.error(f"Error selecting engagement refresh candidates: {e}")
+
+        return results
+
+    @offloaded
+    def update_engagement(self, updates: List[Dict[str, Any]], ids: Optional[List[str]] = None):
+        """Writes back `score`/`num_comments` for many items in a single UPDATE.
+
+        `ids` lists every item that was looked up; items Reddit no longer returns
+        (deleted, removed) keep their values but get their `processed_at` bumped so
+        they drop to the back of the refresh queue.
+        """
+        ids = ids or [u['id'] for u in updates]
+        if not ids:
+            return
+
+        params = []
+        score_cases = []
+        comment_cases = []
+        for u in updates:
+            score_cases.append("WHEN %s THEN %s")
+            params.extend([u['id'], u['score']])
+        for u in updates:
+            # Comments have no num_comments of their own
+            if u.get('num_comments') is not None:
+                comment_cases.append("WHEN %s THEN %s")
+                params.extend([u['id'], u['num_comments']])
+
+        score_expr = f"CASE id {' '.join(score_cases)} ELSE score END" if score_cases else "score"
+        comments_expr = (f"CASE id {' '.join(comment_cases)} ELSE num_comments END"
+                         if comment_cases else "num_comments")
+        placeholders = ', '.join(['%s'] * len(ids))
+        params.extend(ids)
+
+        query = f"""
+        UPDATE reddit_data
+        SET score = {score_expr},
+            num_comments = {comments_expr},
+            processed_at = CURRENT_TIMESTAMP
+        WHERE id IN ({placeholders})
+        """
+
+        try:
+            with self.get_connection() as conn:
+                if conn:
+                    with conn.cursor() as cursor:
+                        cursor.execute(query, tuple(params))
+                        conn.commit()
+        except Error as e:
+            logger.error(f"Error during engagement update: {e}")
+
+    DATA_COLUMNS = [
+        'id', 'item_type', 'subreddit', 'created_utc', 'sentiment_label', 'sentiment_score',
+        'score', 'num_comments', 'duplicate_of', 'snippet'
+    ]
+    SORT_COLUMNS = ('created_utc', 'subreddit', 'sentiment_label', 'sentiment_score', 'score')
+
+    def query_sentiment_data(self, subreddit: Optional[str] = None,
+                             subreddits: Optional[List[str]] = None,
+                             keywords: Optional[str] = None,
+                             timeframe_hours: int = 24,
+                             exclude_duplicates: bool = False,
+                             search: Optional[str] = None,
+                             limit: Optional[int] = None,
+                             offset: int = 0,
+                             sort: str = 'created_utc',
+                             descending: bool = True) -> List[Dict[str, Any]]:
+        """`search` matches subreddit, label or any part of the full text (in `reddit_content`).
+        `limit`/`offset` page through the rows ordered by `sort` (one of SORT_COLUMNS)."""
+        sort = sort if sort in self.SORT_COLUMNS else 'created_utc'
+        if self.hot_window and not search and self.hot_window.covers(timeframe_hours, keywords):
+            # Up to HOT_WINDOW_MAX_ITEMS dicts: built on a tpool thread, not on the hub
+            return self._blocking(self.hot_window.query_sentiment_data, subreddit, subreddits, timeframe_hours,
+                                  exclude_duplicates, limit=limit, offset=offset, sort=sort, descending=descending)
+        return self._query_sentiment_data_db(subreddit, subreddits, keywords, timeframe_hours, exclude_duplicates,
+                                             search, limit, offset, sort, descending)
+
+    @offloaded
+    def _query_sentiment_data_db(self, subreddit: Optional[str] = None,
+                                 subreddits: Optional[List[str]] = None,
+                                 keywords: Optional[str] = None,
+                                 timeframe_hours: int = 24,
+                                 exclude_duplicates: bool = False,
+                                 search: Optional[str] = None,
+                                 limit: Optional[int] = None,
+                                 offset: int = 0,
+                                 sort: str = 'created_utc',
+                                 descending: bool = True) -> List[Dict[str, Any]]:
+        where_str, params = self._build_filters(subreddit, subreddits, keywords, timeframe_hours,
+                                                exclude_duplicates, search)
+        direction = "DESC" if descending else "ASC"
+        base_query = f"""
+        SELECT {', '.join(self.DATA_COLUMNS)}
+        FROM reddit_data
+        WHERE {where_str}
+        ORDER BY {sort} {direction}, created_utc DESC, id
+        """
+        if limit is not None:
+            base_query += " LIMIT %s OFFSET %s"
+            params.extend([limit, offset])
 
         results = []
         try:
@@ -170,14 +424,211 @@ class DatabaseManager:
         
         return results
 
-    def get_distinct_subreddits(self) -> List[str]:
-        query = "SELECT DISTINCT subreddit FROM reddit_data ORDER BY subreddit ASC;"
+    def count_sentiment_data(self, subreddit: Optional[str] = None,
+                             subreddits: Optional[List[str]] = None,
+                             keywords: Optional[str] = None,
+                             timeframe_hours: int = 24,
+                             exclude_duplicates: bool = False,
+                             search: Optional[str] = None) -> int:
+        """Number of rows `query_sentiment_data` would return without a limit."""
+        if self.hot_window and not search and self.hot_window.covers(timeframe_hours, keywords):
+            return self.hot_window.count_sentiment_data(subreddit, subreddits, timeframe_hours, exclude_duplicates)
+        return self._count_sentiment_data_db(subreddit, subreddits, keywords, timeframe_hours, exclude_duplicates,
+                                             search)
+
+    @offloaded
+    def _count_sentiment_data_db(self, subreddit: Optional[str] = None,
+                                 subreddits: Optional[List[str]] = None,
+                                 keywords: Optional[str] = None,
+                                 timeframe_hours: int = 24,
+                                 exclude_duplicates: bool = False,
+                                 search: Optional[str] = None) -> int:
+        where_str, params = self._build_filters(subreddit, subreddits, keywords, timeframe_hours,
+                                                exclude_duplicates, search)
+        total = 0
+        try:
+            with self.get_connection() as conn:
+                if conn:
+                    with conn.cursor() as cursor:
+                        cursor.execute(f"SELECT COUNT(*) FROM reddit_data WHERE {where_str}", tuple(params))
+                        total = cursor.fetchone()[0]
+        except Error as e:
+            logger.error(f"Error counting sentiment data: {e}")
+
+        return total
+
+    def sample_sentiment_data(self, max_points: int,
+                              subreddit: Optional[str] = None,
+                              subreddits: Optional[List[str]] = None,
+                              keywords: Optional[str] = None,
+                              timeframe_hours: int = 24,
+                              exclude_duplicates: bool = False) -> Tuple[List[Dict[str, Any]], int]:
+        """Stratified sample of about `max_points` rows, drawn where the rows live.
+
+        Each (subreddit, sentiment_label) stratum keeps a share of the budget
+        proportional to its size (at least one row); every returned row carries a
+        `weight`, the number of matching rows it stands for. Returns (rows, total).
+        """
+        if self.hot_window and self.hot_window.covers(timeframe_hours, keywords):
+            return self._blocking(self.hot_window.sample_sentiment_data, max_points, subreddit, subreddits,
+                                  timeframe_hours, exclude_duplicates)
+        return self._sample_sentiment_data_db(max_points, subreddit, subreddits, keywords, timeframe_hours,
+                                              exclude_duplicates)
+
+    @offloaded
+    def _sample_sentiment_data_db(self, max_points: int,
+                                  subreddit: Optional[str] = None,
+                                  subreddits: Optional[List[str]] = None,
+                                  keywords: Optional[str] = None,
+                                  timeframe_hours: int = 24,
+                                  exclude_duplicates: bool = False) -> Tuple[List[Dict[str, Any]], int]:
+        where_str, params = self._build_filters(subreddit, subreddits, keywords, timeframe_hours,
+                                                exclude_duplicates)
+        columns = ', '.join(self.DATA_COLUMNS)
+        # CRC32(id) is a stable pseudo-random order, so refreshes do not reshuffle the chart
+        query = f"""
+        SELECT {columns}, stratum_size, total_rows FROM (
+            SELECT {columns},
+                COUNT(*) OVER (PARTITION BY subreddit, sentiment_label) AS stratum_size,
+                COUNT(*) OVER () AS total_rows,
+                ROW_NUMBER() OVER (PARTITION BY subreddit, sentiment_label ORDER BY CRC32(id)) AS stratum_rank
+            FROM reddit_data
+            WHERE {where_str}
+        ) ranked
+        WHERE total_rows <= %s OR stratum_rank <= GREATEST(1, FLOOR(%s * stratum_size / total_rows))
+        ORDER BY created_utc DESC
+        """
+        params.extend([max_points, max_points])
+
+        results = []
+        try:
+            with self.get_connection() as conn:
+                if conn:
+                    with conn.cursor(dictionary=True) as cursor:
+                        cursor.execute(query, tuple(params))
+                        results = cursor.fetchall()
+        except Error as e:
+            logger.error(f"Error sampling sentiment data: {e}")
+
+        total = results[0]['total_rows'] if results else 0
+        for row in results:
+            size = row.pop('stratum_size')
+            row.pop('total_rows')
+            kept = size if total <= max_points else min(size, max(1, max_points * size // total))
+            row['weight'] = size / kept
+        return results, total
+
+    EXPORT_COLUMNS = [
+        'id', 'item_type', 'subreddit', 'author', 'created_utc', 'sentiment_label',
+        'sentiment_score', 'sentiment_policy', 'score', 'num_comments', 'duplicate_of', 'content', 'url'
+    ]
+
+    def iter_sentiment_data(self, subreddit: Optional[str] = None,
+                            subreddits: Optional[List[str]] = None,
+                            keywords: Optional[str] = None,
+                            timeframe_hours: int = 24,
+                            exclude_duplicates: bool = False,
+                            batch_size: int = 1000,
+                            columns: Optional[List[str]] = None) -> Iterator[List[Dict[str, Any]]]:
+        """Yields matching rows in `fetchmany` batches from a server-side (unbuffered) cursor.
+
+        `columns` defaults to EXPORT_COLUMNS; `reddit_content` is only joined when
+        `content` or `url` is among them.
+
+        Uses its own connection rather than one from the pool: exports can run for
+        minutes, and closing the connection is the cheap way to abandon a half-read
+        result set when the client goes away.
+        """
+        where_str, params = self._build_filters(subreddit, subreddits, keywords, timeframe_hours,
+                                                exclude_duplicates)
+        columns = columns or self.EXPORT_COLUMNS
+        join = "LEFT JOIN reddit_content USING (id)" if {'content', 'url'} & set(columns) else ""
+        query = f"""
+        SELECT {', '.join(columns)}
+        FROM reddit_data {join}
+        WHERE {where_str}
+        ORDER BY created_utc DESC, id DESC
+        """
+
+        conn = None
+        try:
+            conn = self._blocking(
+                mysql.connector.connect,
+                host=config.DB_HOST,
+                port=config.DB_PORT,
+                user=config.DB_USER,
+                password=config.DB_PASSWORD,
+                database=config.DB_NAME
+            )
+            cursor = conn.cursor(dictionary=True, buffered=False)
+            self._blocking(cursor.execute, query, tuple(params))
+            while True:
+                rows = self._blocking(cursor.fetchmany, batch_size)
+                if not rows:
+                    break
+                yield rows
+        except Error as e:
+            logger.error(f"Error streaming sentiment data: {e}")
+            raise
+        finally:
+            if conn and conn.is_connected():
+                conn.close()
+
+    @offloaded
+    def get_items(self, ids: List[str]) -> List[Dict[str, Any]]:
+        """Returns full rows, including `content` and `url` from reddit_content, for the given ids."""
+        if not ids:
+            return []
+
+        placeholders = ', '.join(['%s'] * len(ids))
+        query = f"""
+        SELECT {', '.join(self.EXPORT_COLUMNS)}
+        FROM reddit_data LEFT JOIN reddit_content USING (id)
+        WHERE id IN ({placeholders})
+        """
+
+        results = []
+        try:
+            with self.get_connection() as conn:
+                if conn:
+                    with conn.cursor(dictionary=True) as cursor:
+                        cursor.execute(query, tuple(ids))
+                        results = cursor.fetchall()
+        except Error as e:
+            logger.error(f"Error querying item details: {e}")
+
+        return results
+
+    @offloaded
+    def get_distinct_subreddits(self, prefix: Optional[str] = None, sort: str = 'name',
+                                limit: Optional[int] = None) -> List[str]:
+        """Reads subreddit names from the `subreddits` dimension table.
+
+        `prefix` filters by name prefix (served by the primary key index);
+        `sort='activity'` orders by number of stored items instead of by name.
+        """
+        query = "SELECT name FROM subreddits"
+        params: List[Any] = []
+
+        if prefix:
+            query += " WHERE name LIKE %s"
+            params.append(f"{_escape_like(prefix.lower())}%")
+
+        if sort == 'activity':
+            query += " ORDER BY item_count DESC, name ASC"
+        else:
+            query += " ORDER BY name ASC"
+
+        if limit:
+            query += " LIMIT %s"
+            params.append(limit)
+
         results = []
         try:
             with self.get_connection() as conn:
                 if conn:
                     with conn.cursor() as cursor:
-                        cursor.execute(query)
+                        cursor.execute(query, tuple(params))
                         rows = cursor.fetchall()
                         results = [row[0] for row in rows]
         except Error as e:
@@ -188,34 +639,24 @@ class DatabaseManager:
     def get_kpi_stats(self, subreddit: Optional[str] = None,
                       subreddits: Optional[List[str]] = None,
                       keywords: Optional[str] = None,
-                      timeframe_hours: int = 24) -> Dict[str, Any]:
+                      timeframe_hours: int = 24,
+                      exclude_duplicates: bool = False) -> Dict[str, Any]:
+        if self.hot_window and self.hot_window.covers(timeframe_hours, keywords):
+            return self._blocking(self.hot_window.get_kpi_stats, subreddit, subreddits, timeframe_hours,
+                                  exclude_duplicates)
+        return self._get_kpi_stats_db(subreddit, subreddits, keywords, timeframe_hours, exclude_duplicates)
+
+    @offloaded
+    def _get_kpi_stats_db(self, subreddit: Optional[str] = None,
+                          subreddits: Optional[List[str]] = None,
+                          keywords: Optional[str] = None,
+                          timeframe_hours: int = 24,
+                          exclude_duplicates: bool = False) -> Dict[str, Any]:
         stats = {}
         
         # Build the dynamic WHERE clause
-        where_clauses = ["created_utc >= NOW() - INTERVAL %s HOUR"]
-        params = [timeframe_hours]
-
-        if subreddit:
-            where_clauses.append("subreddit = %s")
-            params.append(subreddit)
-        
-        if subreddits and len(subreddits) > 0:
-            placeholders = ', '.join(['%s'] * len(subreddits))
-            where_clauses.append(f"subreddit IN ({placeholders})")
-            params.extend(subreddits)
-
-        if keywords:
-            keyword_list = [k.strip() for k in keywords.split(',') if k.strip()]
-            if keyword_list:
-                keyword_conditions = []
-                for k in keyword_list:
-                    keyword_conditions.append("(content LIKE %s OR subreddit LIKE %s)")
-                    params.extend([f"%{k}%", f"%{k}%"])
-                
-                if keyword_conditions:
-                    where_clauses.append("(" + " OR ".join(keyword_conditions) + ")")
-        
-        where_str = " AND ".join(where_clauses)
+        where_str, params = self._build_filters(subreddit, subreddits, keywords, timeframe_hours,
+                                                exclude_duplicates)
         
         # Define base queries with the dynamic WHERE clause
         q_total = f"SELECT COUNT(*) as count FROM reddit_data WHERE {where_str}"
@@ -267,4 +708,198 @@ class DatabaseManager:
             
         return stats
 
+    @offloaded
+    def get_groups(self) -> Dict[str, List[str]]:
+        results: Dict[str, List[str]] = {}
+        try:
+            with self.get_connection() as conn:
+                if conn:
+                    with conn.cursor() as cursor:
+                        cursor.execute("SELECT group_name, subreddit FROM subreddit_groups ORDER BY group_name, subreddit")
+                        for group_name, subreddit in cursor.fetchall():
+                            results.setdefault(group_name, []).append(subreddit)
+        except Error as e:
+            logger.error(f"Error reading subreddit groups: {e}")
+
+        return results
+
+    @offloaded
+    def save_group(self, name: str, subreddits: List[str]) -> bool:
+        """Replaces the members of group `name` (creating it if needed)."""
+        saved = False
+        try:
+            with self.get_connection() as conn:
+                if conn:
+                    with conn.cursor() as cursor:
+                        cursor.execute("DELETE FROM subreddit_groups WHERE group_name = %s", (name,))
+                        cursor.executemany(
+                            "INSERT IGNORE INTO subreddit_groups (group_name, subreddit) VALUES (%s, %s)",
+                            [(name, sub.lower()) for sub in subreddits]
+                        )
+                        conn.commit()
+                        saved = True
+        except Error as e:
+            logger.error(f"Error saving subreddit group '{name}': {e}")
+
+        return saved
+
+    @offloaded
+    def delete_group(self, name: str) -> bool:
+        deleted = False
+        try:
+            with self.get_connection() as conn:
+                if conn:
+                    with conn.cursor() as cursor:
+                        cursor.execute("DELETE FROM subreddit_groups WHERE group_name = %s", (name,))
+                        deleted = cursor.rowcount > 0
+                        conn.commit()
+        except Error as e:
+            logger.error(f"Error deleting subreddit group '{name}': {e}")
+
+        return deleted
+
+    @offloaded
+    def get_group_stats(self, groups: Optional[List[str]] = None, timeframe_hours: int = 24,
+                        exclude_duplicates: bool = False) -> List[Dict[str, Any]]:
+        """Volume, sentiment and engagement for every group in one grouped query.
+
+        The join starts from the small `subreddit_groups` table, so groups without
+        items in the timeframe are returned with zeros.
+        """
+        join_clauses = ["d.subreddit = g.subreddit", "d.created_utc >= UTC_TIMESTAMP() - INTERVAL %s HOUR"]
+        params: List[Any] = [timeframe_hours]
+        if exclude_duplicates:
+            join_clauses.append("d.duplicate_of IS NULL")
+
+        query = f"""
+        SELECT
+            g.group_name,
+            COUNT(d.id) AS total_posts,
+            COALESCE(AVG(d.sentiment_score), 0) AS avg_sentiment,
+            COALESCE(AVG(d.sentiment_label = 'positive'), 0) AS positive_share,
+            COALESCE(AVG(d.sentiment_label = 'negative'), 0) AS negative_share,
+            COALESCE(AVG(d.score), 0) AS avg_score,
+            COALESCE(AVG(d.num_comments), 0) AS avg_comments
+        FROM subreddit_groups g
+        LEFT JOIN reddit_data d ON {' AND '.join(join_clauses)}
+        """
+        if groups:
+            placeholders = ', '.join(['%s'] * len(groups))
+            query += f" WHERE g.group_name IN ({placeholders})"
+            params.extend(groups)
+        query += " GROUP BY g.group_name ORDER BY g.group_name"
+
+        results = []
+        try:
+            with self.get_connection() as conn:
+                if conn:
+                    with conn.cursor(dictionary=True) as cursor:
+                        cursor.execute(query, tuple(params))
+                        results = [
+                            {key: float(value) if key not in ('group_name', 'total_posts') else value
+                             for key, value in row.items()}
+                            for row in cursor.fetchall()
+                        ]
+        except Error as e:
+            logger.error(f"Error calculating group stats: {e}")
+
+        return results
+
+    @offloaded
+    def insert_alerts(self, alerts: List[SentimentAlert]):
+        if not alerts:
+            return
+
+        query = """
+        INSERT INTO sentiment_alerts (subreddit, kind, z_score, value, baseline, items, window_start)
+        VALUES (%s, %s, %s, %s, %s, %s, %s)
+        """
+        params = [(a.subreddit, a.kind, a.z_score, a.value, a.baseline, a.items, a.window_start) for a in alerts]
+        try:
+            with self.get_connection() as conn:
+                if conn:
+                    with conn.cursor() as cursor:
+                        cursor.executemany(query, params)
+                        conn.commit()
+        except Error as e:
+            logger.error(f"Error inserting sentiment alerts: {e}")
+
+    @offloaded
+    def get_alerts(self, subreddit: Optional[str] = None, hours: Optional[int] = None,
+                   limit: int = 100) -> List[Dict[str, Any]]:
+        """Returns stored alerts, newest first."""
+        query = "SELECT id, subreddit, kind, z_score, value, baseline, items, window_start, created_at FROM sentiment_alerts"
+        where_clauses = []
+        params: List[Any] = []
+        if subreddit:
+            where_clauses.append("subreddit = %s")
+            params.append(subreddit.lower())
+        if hours:
+            where_clauses.append("created_at >= NOW() - INTERVAL %s HOUR")
+            params.append(hours)
+        if where_clauses:
+            query += " WHERE " + " AND ".join(where_clauses)
+        query += " ORDER BY created_at DESC, id DESC LIMIT %s"
+        params.append(limit)
+
+        results = []
+        try:
+            with self.get_connection() as conn:
+                if conn:
+                    with conn.cursor(dictionary=True) as cursor:
+                        cursor.execute(query, tuple(params))
+                        results = cursor.fetchall()
+        except Error as e:
+            logger.error(f"Error querying sentiment alerts: {e}")
+
+        return results
+
+    @offloaded
+    def upsert_sketches(self, rows: List[tuple]):
+        """rows: (kind, subreddit, bucket_start, source, payload); a row is owned by one writer."""
+        if not rows:
+            return
+
+        query = """
+        INSERT INTO analytics_sketches (kind, subreddit, bucket_start, source, payload)
+        VALUES (%s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE payload = VALUES(payload)
+        """
+        try:
+            with self.get_connection() as conn:
+                if conn:
+                    with conn.cursor() as cursor:
+                        cursor.executemany(query, rows)
+                        conn.commit()
+        except Error as e:
+            logger.error(f"Error writing analytics sketches: {e}")
+
+    @offloaded
+    def get_sketches(self, kinds: List[str], subreddits: Optional[List[str]] = None,
+                     hours: int = 24) -> Dict[str, List[bytes]]:
+        """Returns {kind: [payload, ...]} for every sketch whose hour bucket falls in the last `hours`."""
+        kind_placeholders = ', '.join(['%s'] * len(kinds))
+        query = f"""
+        SELECT kind, payload FROM analytics_sketches
+        WHERE kind IN ({kind_placeholders}) AND bucket_start >= UTC_TIMESTAMP() - INTERVAL %s HOUR
+        """
+        params: List[Any] = list(kinds) + [hours]
+        if subreddits:
+            placeholders = ', '.join(['%s'] * len(subreddits))
+            query += f" AND subreddit IN ({placeholders})"
+            params.extend(s.lower() for s in subreddits)
+
+        results: Dict[str, List[bytes]] = {kind: [] for kind in kinds}
+        try:
+            with self.get_connection() as conn:
+                if conn:
+                    with conn.cursor() as cursor:
+                        cursor.execute(query, tuple(params))
+                        for kind, payload in cursor.fetchall():
+                            results[kind].append(bytes(payload))
+        except Error as e:
+            logger.error(f"Error reading analytics sketches: {e}")
+
+        return results
+
 db_manager = DatabaseManager()
\ No newline at end of file
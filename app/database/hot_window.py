@@ -0,0 +1,339 @@
+"""
+Hot Window
+
+An in-process, column-oriented copy of the most recent `reddit_data` rows,
+which serves `query_sentiment_data` and `get_kpi_stats` without touching
+MySQL when the requested timeframe is covered.
+
+- Bootstrapped once from MySQL (newest first, capped at `max_items` rows).
+- Kept current from the `new_data_batch` events the collectors publish on the
+  Socket.IO Redis channel. Items are upserted by id.
+- Rows older than `max_hours` are evicted by compacting the arrays.
+
+Filtering is done with numpy masks over the columns. Keyword filters and
+text search need `reddit_keywords`/`reddit_content` and always go to MySQL. `score`/`num_comments` refreshed by
+the engagement refresher are not published, so those two columns can lag
+until the item is re-collected. Like `reddit_data`, only the `snippet` of the
+text is kept; full content is fetched per item from `reddit_content`.
+
+Queries hold the lock only to select positions and copy those columns; result
+dicts are built afterwards, so a large read does not stall ingestion. The lock
+is a real OS-thread lock, so queries can run on eventlet's tpool.
+"""
+import json
+import time
+import datetime
+import threading
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from app import config
+from app.models import SNIPPET_LENGTH, utc_datetime, utc_timestamp
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SOCKETIO_CHANNEL = 'flask-socketio'
+LABELS = ['positive', 'negative', 'neutral']
+TEXT_COLUMNS = ('id', 'item_type', 'snippet', 'duplicate_of')
+RECONNECT_SECONDS = 5
+
+
+def _os_lock() -> threading.Lock:
+    try:
+        from eventlet import patcher
+    except ImportError:
+        return threading.Lock()
+    return patcher.original('threading').Lock()
+
+
+def _timestamp(value: Any) -> float:
+    if isinstance(value, str):
+        value = datetime.datetime.fromisoformat(value)
+    return utc_timestamp(value) if value else 0.0
+
+
+class HotWindow:
+    def __init__(self, max_hours: int = config.HOT_WINDOW_HOURS,
+                 max_items: int = config.HOT_WINDOW_MAX_ITEMS, initial_capacity: int = 4096):
+        self.max_hours = max_hours
+        self.max_items = max_items
+        self.ready = False
+        self.covered_from = float('-inf')  # Oldest created_utc the window is complete from
+        self._lock = _os_lock()
+        self._subreddit_codes: Dict[str, int] = {}
+        self._subreddit_names: List[str] = []
+        self._reset(initial_capacity)
+
+    def _reset(self, capacity: int):
+        self.size = 0
+        self.index: Dict[str, int] = {}
+        self.created = np.zeros(capacity, dtype=np.float64)
+        self.sentiment = np.zeros(capacity, dtype=np.float64)
+        self.subreddit = np.zeros(capacity, dtype=np.int32)
+        self.label = np.zeros(capacity, dtype=np.int8)
+        self.score = np.zeros(capacity, dtype=np.int64)
+        self.num_comments = np.zeros(capacity, dtype=np.int64)
+        self.text = {name: np.empty(capacity, dtype=object) for name in TEXT_COLUMNS}
+
+    def _columns(self) -> List[np.ndarray]:
+        return [self.created, self.sentiment, self.subreddit, self.label, self.score, self.num_comments,
+                *self.text.values()]
+
+    def _grow(self, needed: int):
+        capacity = len(self.created)
+        if needed <= capacity:
+            return
+        new_capacity = max(needed, capacity * 2)
+        self.created, self.sentiment, self.subreddit, self.label, self.score, self.num_comments = [
+            np.resize(column, new_capacity) for column in
+            (self.created, self.sentiment, self.subreddit, self.label, self.score, self.num_comments)
+        ]
+        for name, column in self.text.items():
+            grown = np.empty(new_capacity, dtype=object)
+            grown[:capacity] = column
+            self.text[name] = grown
+
+    def _code(self, subreddit: str) -> int:
+        code = self._subreddit_codes.get(subreddit.lower())
+        if code is None:
+            code = self._subreddit_codes[subreddit.lower()] = len(self._subreddit_names)
+            self._subreddit_names.append(subreddit)
+        return code
+
+    def ingest(self, rows: Iterable[Dict[str, Any]]):
+        """Upserts rows shaped like `query_sentiment_data` results or `RedditItem.to_dict()`."""
+        with self._lock:
+            for row in rows:
+                position = self.index.get(row['id'])
+                if position is None:
+                    self._grow(self.size + 1)
+                    position = self.size
+                    self.index[row['id']] = position
+                    self.size += 1
+                self.created[position] = _timestamp(row.get('created_utc'))
+                self.sentiment[position] = row.get('sentiment_score') or 0.0
+                self.subreddit[position] = self._code(row['subreddit'])
+                self.label[position] = LABELS.index(row.get('sentiment_label') or 'neutral')
+                self.score[position] = row.get('score') or 0
+                self.num_comments[position] = row.get('num_comments') or 0
+                for name in TEXT_COLUMNS:
+                    self.text[name][position] = row.get(name)
+                if row.get('snippet') is None:  # Rows shaped like exports carry full content instead
+                    self.text['snippet'][position] = (row.get('content') or "")[:SNIPPET_LENGTH]
+            self._evict()
+
+    def _evict(self):
+        n = self.size
+        keep = self.created[:n] >= time.time() - self.max_hours * 3600
+        if n > self.max_items:
+            # Over the row cap: keep only the newest rows; the window now starts later
+            cutoff = np.partition(self.created[:n], n - self.max_items)[n - self.max_items]
+            keep &= self.created[:n] >= cutoff
+            self.covered_from = max(self.covered_from, cutoff)
+        dropped = n - int(keep.sum())
+        if not dropped or (dropped < n // 4 and n <= self.max_items):
+            return  # Expired rows are masked out by queries until enough pile up
+
+        positions = np.nonzero(keep)[0]
+        for column in self._columns():
+            column[:len(positions)] = column[positions]
+        self.size = len(positions)
+        self.index = {item_id: i for i, item_id in enumerate(self.text['id'][:self.size])}
+
+    def bootstrap(self, db_manager: Any, batch_size: int = 5000):
+        """Loads the last `max_hours` of rows from MySQL, newest first."""
+        started = time.time()
+        loaded = 0
+        oldest = started - self.max_hours * 3600
+        for rows in db_manager.iter_sentiment_data(timeframe_hours=self.max_hours, batch_size=batch_size,
+                                                   columns=db_manager.DATA_COLUMNS):
+            rows = rows[:self.max_items - loaded]
+            self.ingest(rows)
+            loaded += len(rows)
+            if loaded >= self.max_items:
+                oldest = _timestamp(rows[-1]['created_utc'])
+                break
+        with self._lock:
+            self.covered_from = max(self.covered_from, oldest)
+            self.ready = True
+        logger.info(f"Hot window bootstrapped with {loaded} rows in {time.time() - started:.1f}s.")
+
+    def covers(self, timeframe_hours: int, keywords: Optional[str] = None) -> bool:
+        return (self.ready and not keywords and timeframe_hours <= self.max_hours
+                and time.time() - timeframe_hours * 3600 >= self.covered_from)
+
+    def _mask(self, subreddit: Optional[str], subreddits: Optional[List[str]],
+              timeframe_hours: int, exclude_duplicates: bool) -> np.ndarray:
+        n = self.size
+        mask = self.created[:n] >= time.time() - timeframe_hours * 3600
+        if subreddit:
+            code = self._subreddit_codes.get(subreddit.lower())
+            mask &= self.subreddit[:n] == (code if code is not None else -1)
+        if subreddits:
+            codes = [self._subreddit_codes[s.lower()] for s in subreddits if s.lower() in self._subreddit_codes]
+            mask &= np.isin(self.subreddit[:n], codes)
+        if exclude_duplicates:
+            mask &= np.array([d is None for d in self.text['duplicate_of'][:n]], dtype=bool)
+        return mask
+
+    def _copy(self, positions: np.ndarray) -> Dict[str, Any]:
+        """Copies the columns a result row needs at `positions`; call with the lock held."""
+        return {
+            "created": self.created[positions], "sentiment": self.sentiment[positions],
+            "subreddit": self.subreddit[positions], "label": self.label[positions],
+            "score": self.score[positions], "num_comments": self.num_comments[positions],
+            "id": self.text['id'][positions], "item_type": self.text['item_type'][positions],
+            "duplicate_of": self.text['duplicate_of'][positions], "snippet": self.text['snippet'][positions],
+            # Append-only, so the codes in this copy stay valid after the lock is released
+            "names": self._subreddit_names,
+        }
+
+    @staticmethod
+    def _rows(copy: Dict[str, Any]) -> List[Dict[str, Any]]:
+        names = copy["names"]
+        return [
+            {
+                "id": item_id,
+                "item_type": item_type,
+                "subreddit": names[code],
+                "created_utc": utc_datetime(created),
+                "sentiment_label": LABELS[label],
+                "sentiment_score": sentiment,
+                "score": score,
+                "num_comments": num_comments,
+                "duplicate_of": duplicate_of,
+                "snippet": snippet
+            }
+            for item_id, item_type, code, created, label, sentiment, score, num_comments, duplicate_of, snippet
+            in zip(copy["id"], copy["item_type"], copy["subreddit"].tolist(), copy["created"].tolist(),
+                   copy["label"].tolist(), copy["sentiment"].tolist(), copy["score"].tolist(),
+                   copy["num_comments"].tolist(), copy["duplicate_of"], copy["snippet"])
+        ]
+
+    def _sort_key(self, positions: np.ndarray, sort: str) -> np.ndarray:
+        if sort == 'subreddit':
+            return np.array([self._subreddit_names[c].lower() for c in self.subreddit[positions]], dtype=object)
+        if sort == 'sentiment_label':
+            return np.array(LABELS, dtype=object)[self.label[positions]]
+        column = {'sentiment_score': self.sentiment, 'score': self.score}.get(sort, self.created)
+        return column[positions]
+
+    def query_sentiment_data(self, subreddit: Optional[str] = None, subreddits: Optional[List[str]] = None,
+                             timeframe_hours: int = 24, exclude_duplicates: bool = False,
+                             limit: Optional[int] = None, offset: int = 0,
+                             sort: str = 'created_utc', descending: bool = True) -> List[Dict[str, Any]]:
+        with self._lock:
+            positions = np.nonzero(self._mask(subreddit, subreddits, timeframe_hours, exclude_duplicates))[0]
+            # Newest first breaks ties, as in the SQL query
+            positions = positions[np.argsort(-self.created[positions], kind='stable')]
+            if sort != 'created_utc' or not descending:
+                key = self._sort_key(positions, sort)
+                if descending:
+                    # Stable sort of the reversed keys, reversed back, keeps ties newest first
+                    order = (len(key) - 1 - np.argsort(key[::-1], kind='stable'))[::-1]
+                else:
+                    order = np.argsort(key, kind='stable')
+                positions = positions[order]
+            end = None if limit is None else offset + limit
+            copy = self._copy(positions[offset:end])
+        return self._rows(copy)
+
+    def count_sentiment_data(self, subreddit: Optional[str] = None, subreddits: Optional[List[str]] = None,
+                             timeframe_hours: int = 24, exclude_duplicates: bool = False) -> int:
+        with self._lock:
+            return int(self._mask(subreddit, subreddits, timeframe_hours, exclude_duplicates).sum())
+
+    def sample_sentiment_data(self, max_points: int, subreddit: Optional[str] = None,
+                              subreddits: Optional[List[str]] = None, timeframe_hours: int = 24,
+                              exclude_duplicates: bool = False, seed: int = 0) -> Tuple[List[Dict[str, Any]], int]:
+        """Stratified sample by (subreddit, label), same allocation as the SQL version; only the
+        kept rows are turned into dicts. Returns (rows newest first, each with a `weight`; total)."""
+        with self._lock:
+            positions = np.nonzero(self._mask(subreddit, subreddits, timeframe_hours, exclude_duplicates))[0]
+            total = len(positions)
+            if total <= max_points:
+                kept, weights = positions, np.ones(total)
+            else:
+                strata = self.subreddit[positions].astype(np.int64) * len(LABELS) + self.label[positions]
+                _, inverse, sizes = np.unique(strata, return_inverse=True, return_counts=True)
+                quotas = np.minimum(sizes, np.maximum(1, max_points * sizes // total))
+                # Random rank within each stratum: shuffle, then group stably by stratum
+                order = np.random.default_rng(seed).permutation(total)
+                order = order[np.argsort(inverse[order], kind='stable')]
+                starts = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+                ranks = np.empty(total, dtype=np.int64)
+                ranks[order] = np.arange(total) - starts[inverse[order]]
+                keep = ranks < quotas[inverse]
+                kept, weights = positions[keep], (sizes / quotas)[inverse[keep]]
+            order = np.argsort(-self.created[kept], kind='stable')
+            copy = self._copy(kept[order])
+        rows = self._rows(copy)
+        for row, weight in zip(rows, weights[order].tolist()):
+            row['weight'] = weight
+        return rows, total
+
+    def get_kpi_stats(self, subreddit: Optional[str] = None, subreddits: Optional[List[str]] = None,
+                      timeframe_hours: int = 24, exclude_duplicates: bool = False) -> Dict[str, Any]:
+        with self._lock:
+            mask = self._mask(subreddit, subreddits, timeframe_hours, exclude_duplicates)
+            codes = self.subreddit[:self.size][mask]
+            scores = self.sentiment[:self.size][mask]
+
+        stats: Dict[str, Any] = {"total_posts": int(len(scores)),
+                                 "avg_sentiment": float(scores.mean()) if len(scores) else 0}
+        if not len(scores):
+            empty = {"subreddit": "N/A", "avg_score": 0}
+            stats.update(most_positive_sub=empty, most_negative_sub=dict(empty))
+            return stats
+
+        counts = np.bincount(codes)
+        present = np.nonzero(counts)[0]
+        averages = np.bincount(codes, weights=scores)[present] / counts[present]
+        best, worst = present[np.argmax(averages)], present[np.argmin(averages)]
+        stats["most_positive_sub"] = {"subreddit": self._subreddit_names[best], "avg_score": float(averages.max())}
+        stats["most_negative_sub"] = {"subreddit": self._subreddit_names[worst], "avg_score": float(averages.min())}
+        return stats
+
+    def run(self, db_manager: Any, redis_client: Any):
+        """Subscribes to collector events, then bootstraps; re-bootstraps after a lost subscription."""
+        while True:
+            pubsub = None
+            try:
+                pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(SOCKETIO_CHANNEL)
+                # Subscribe first so nothing published during the bootstrap is missed
+                self.bootstrap(db_manager)
+                for message in pubsub.listen():
+                    self._handle(message.get('data'))
+            except Exception as e:
+                logger.error(f"Hot window subscription lost, falling back to MySQL: {e}")
+            finally:
+                with self._lock:
+                    self.ready = False
+                if pubsub is not None:
+                    try:
+                        pubsub.close()
+                    except Exception:
+                        pass
+            time.sleep(RECONNECT_SECONDS)
+
+    def _handle(self, raw: Any):
+        try:
+            message = json.loads(raw)
+        except (TypeError, ValueError):
+            return  # Not a JSON emit (e.g. another manager's internal message)
+        if not isinstance(message, dict) or message.get('method') != 'emit' or message.get('event') != 'new_data_batch':
+            return
+        data = message.get('data')
+        # Newer python-socketio wraps the emit arguments in a list
+        if isinstance(data, list) and len(data) == 1 and isinstance(data[0], list):
+            data = data[0]
+        if isinstance(data, list):
+            self.ingest(row for row in data if isinstance(row, dict) and row.get('id'))
+
+    def start(self, db_manager: Any, redis_client: Any) -> threading.Thread:
+        thread = threading.Thread(target=self.run, args=(db_manager, redis_client),
+                                  name='hot-window', daemon=True)
+        thread.start()
+        return thread
@@ -0,0 +1,353 @@
+"""
+Schema Migrations
+
+Numbered, forward-only schema changes. Applied versions are recorded in
+`schema_migrations`. Only `scripts/migrate.py` (and `initialize_db.py`) runs
+them; app processes just compare `current_version` with `LATEST_VERSION` at
+startup.
+
+Every migration checks `information_schema` before changing anything. A
+database created from `schema.sql`, or patched by the old startup checks, can
+therefore be migrated from any starting point.
+
+The runner holds a MySQL named lock for the whole run, so two deploys cannot
+migrate at once. DDL tries `ALGORITHM=INSTANT`, then `INPLACE, LOCK=NONE`, and
+only then a table copy. A short `lock_wait_timeout` makes an ALTER that queues
+behind a long-running query give up and retry, rather than blocking every
+query that arrives after it.
+
+Data backfills walk the primary key in batches of `BACKFILL_BATCH_SIZE` rows
+and commit each batch, so no statement holds locks on a large table for long.
+They are idempotent, so an interrupted run can simply be repeated.
+"""
+import time
+import logging
+from typing import Any, Callable, Iterator, List, NamedTuple, Optional, Tuple
+from mysql.connector import Error, errorcode
+from app.models import SNIPPET_LENGTH, keyword_terms
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+LOCK_NAME = 'reddit_schema_migrations'
+ALTER_RETRIES = 3
+BACKFILL_BATCH_SIZE = 1000  # Rows per committed batch in data backfills
+
+DEFAULT_GROUPS = {
+    "Tech": ["technology", "programming", "hardware", "software", "gadgets"],
+    "News": ["news", "worldnews", "politics", "science"],
+    "Crypto": ["bitcoin", "cryptocurrency", "ethereum", "dogecoin"],
+    "Finance": ["finance", "investing", "wallstreetbets", "stocks"],
+    "Entertainment": ["movies", "music", "gaming", "books", "television"]
+}
+
+
+class Migration(NamedTuple):
+    version: int
+    description: str
+    up: Callable[[Any], None]
+
+
+class MigrationError(Exception):
+    pass
+
+
+def _table_exists(cursor, table: str) -> bool:
+    cursor.execute("SELECT 1 FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+                   (table,))
+    return cursor.fetchone() is not None
+
+
+def _column_exists(cursor, table: str, column: str) -> bool:
+    cursor.execute("SELECT 1 FROM information_schema.COLUMNS "
+                   "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = %s", (table, column))
+    return cursor.fetchone() is not None
+
+
+def _index_exists(cursor, table: str, index: str) -> bool:
+    cursor.execute("SELECT 1 FROM information_schema.STATISTICS "
+                   "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = %s LIMIT 1", (table, index))
+    return cursor.fetchone() is not None
+
+
+def _alter(cursor, table: str, changes: str):
+    """ALTER TABLE with the cheapest algorithm MySQL accepts for `changes`."""
+    unsupported = (errorcode.ER_ALTER_OPERATION_NOT_SUPPORTED, errorcode.ER_ALTER_OPERATION_NOT_SUPPORTED_REASON)
+    for algorithm in (", ALGORITHM=INSTANT", ", ALGORITHM=INPLACE, LOCK=NONE", ""):
+        for attempt in range(1, ALTER_RETRIES + 1):
+            try:
+                cursor.execute(f"ALTER TABLE {table} {changes}{algorithm}")
+                return
+            except Error as e:
+                if e.errno in unsupported or (e.errno == errorcode.ER_PARSE_ERROR and 'INSTANT' in algorithm):
+                    break  # Try the next algorithm (INSTANT needs MySQL 8.0.12+)
+                if e.errno == errorcode.ER_LOCK_WAIT_TIMEOUT and attempt < ALTER_RETRIES:
+                    logger.warning(f"ALTER TABLE {table} timed out waiting for a metadata lock, retrying...")
+                    time.sleep(attempt)
+                    continue
+                raise
+
+
+def _key_ranges(cursor, table: str) -> Iterator[Tuple[str, str]]:
+    """Yields (after, upto] primary-key ranges of up to BACKFILL_BATCH_SIZE rows of `table`."""
+    last_id = ''
+    while True:
+        cursor.execute(f"SELECT id FROM {table} WHERE id > %s ORDER BY id LIMIT %s", (last_id, BACKFILL_BATCH_SIZE))
+        ids = cursor.fetchall()
+        if not ids:
+            return
+        yield last_id, ids[-1][0]
+        last_id = ids[-1][0]
+
+
+def _baseline(cursor):
+    """Brings any earlier database to the schema the old startup checks produced."""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS reddit_data (
+            id VARCHAR(20) PRIMARY KEY,
+            item_type ENUM('post', 'comment') NOT NULL,
+            subreddit VARCHAR(100) NOT NULL,
+            author VARCHAR(100),
+            snippet VARCHAR(200) DEFAULT NULL,
+            created_utc DATETIME NOT NULL,
+            sentiment_label ENUM('positive', 'negative', 'neutral') NOT NULL,
+            sentiment_score FLOAT NOT NULL,
+            sentiment_policy VARCHAR(64) DEFAULT NULL,
+            score INT DEFAULT 0,
+            num_comments INT DEFAULT 0,
+            duplicate_of VARCHAR(20) DEFAULT NULL,
+            processed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            INDEX idx_sentiment_label (sentiment_label)
+        );
+    """)
+
+    for column, definition in (('score', 'INT DEFAULT 0'),
+                               ('num_comments', 'INT DEFAULT 0'),
+                               ('sentiment_policy', 'VARCHAR(64) DEFAULT NULL'),
+                               ('duplicate_of', 'VARCHAR(20) DEFAULT NULL'),
+                               ('snippet', f'VARCHAR({SNIPPET_LENGTH}) DEFAULT NULL')):
+        if not _column_exists(cursor, 'reddit_data', column):
+            logger.info(f"Adding column 'reddit_data.{column}'...")
+            _alter(cursor, 'reddit_data', f"ADD COLUMN {column} {definition}")
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS reddit_content (
+            id VARCHAR(20) PRIMARY KEY,
+            content TEXT NOT NULL,
+            url VARCHAR(1024)
+        );
+    """)
+    if _column_exists(cursor, 'reddit_data', 'content'):
+        # Copied in primary-key batches, one short transaction each; migration 4
+        # drops the inline columns once every row is verified to have been copied
+        logger.info("Copying 'content'/'url' from reddit_data to reddit_content...")
+        batches = 0
+        for after, upto in _key_ranges(cursor, 'reddit_data'):
+            cursor.execute("INSERT IGNORE INTO reddit_content (id, content, url) "
+                           "SELECT id, content, url FROM reddit_data WHERE id > %s AND id <= %s", (after, upto))
+            cursor.execute(f"UPDATE reddit_data SET snippet = LEFT(content, {SNIPPET_LENGTH}) "
+                           "WHERE id > %s AND id <= %s AND snippet IS NULL", (after, upto))
+            cursor.execute("COMMIT;")
+            batches += 1
+        logger.info(f"Copied content in {batches} batches of up to {BACKFILL_BATCH_SIZE} rows.")
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS reddit_keywords (
+            keyword VARCHAR(100) NOT NULL,
+            item_id VARCHAR(20) NOT NULL,
+            PRIMARY KEY (keyword, item_id),
+            INDEX idx_item_id (item_id)
+        );
+    """)
+
+    if not _table_exists(cursor, 'subreddits'):
+        logger.info("Creating and backfilling 'subreddits'...")
+        cursor.execute("""
+            CREATE TABLE subreddits (
+                name VARCHAR(100) PRIMARY KEY,
+                item_count INT NOT NULL DEFAULT 0,
+                avg_sentiment DOUBLE NOT NULL DEFAULT 0,
+                first_seen DATETIME,
+                last_seen DATETIME,
+                INDEX idx_item_count (item_count)
+            );
+        """)
+        cursor.execute("""
+            INSERT IGNORE INTO subreddits (name, item_count, avg_sentiment, first_seen, last_seen)
+            SELECT subreddit, COUNT(*), AVG(sentiment_score), MIN(created_utc), MAX(created_utc)
+            FROM reddit_data
+            GROUP BY subreddit;
+        """)
+        cursor.execute("COMMIT;")
+
+    if not _table_exists(cursor, 'subreddit_groups'):
+        cursor.execute("""
+            CREATE TABLE subreddit_groups (
+                group_name VARCHAR(64) NOT NULL,
+                subreddit VARCHAR(100) NOT NULL,
+                PRIMARY KEY (group_name, subreddit),
+                INDEX idx_group_subreddit (subreddit)
+            );
+        """)
+        cursor.executemany("INSERT IGNORE INTO subreddit_groups (group_name, subreddit) VALUES (%s, %s)",
+                           [(name, sub) for name, subs in DEFAULT_GROUPS.items() for sub in subs])
+        cursor.execute("COMMIT;")
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS sentiment_alerts (
+            id BIGINT AUTO_INCREMENT PRIMARY KEY,
+            subreddit VARCHAR(100) NOT NULL,
+            kind VARCHAR(16) NOT NULL,
+            z_score DOUBLE NOT NULL,
+            value DOUBLE NOT NULL,
+            baseline DOUBLE NOT NULL,
+            items INT NOT NULL,
+            window_start DATETIME NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            INDEX idx_alert_created (created_at),
+            INDEX idx_alert_subreddit (subreddit, created_at)
+        );
+    """)
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS analytics_sketches (
+            kind VARCHAR(32) NOT NULL,
+            subreddit VARCHAR(100) NOT NULL,
+            bucket_start DATETIME NOT NULL,
+            source VARCHAR(64) NOT NULL,
+            payload MEDIUMBLOB NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            PRIMARY KEY (kind, subreddit, bucket_start, source),
+            INDEX idx_sketch_bucket (kind, bucket_start)
+        );
+    """)
+
+
+def _composite_indexes(cursor):
+    """
+    (subreddit, created_utc) serves the per-subreddit timeframe filters and the
+    group stats join; (created_utc, id) serves the timeframe scans and the
+    export's ORDER BY created_utc DESC, id DESC. The single-column indexes are
+    prefixes of these and are dropped.
+    """
+    for index, columns in (('idx_subreddit_created', 'subreddit, created_utc'),
+                           ('idx_created_id', 'created_utc, id')):
+        if not _index_exists(cursor, 'reddit_data', index):
+            logger.info(f"Adding index '{index}' on reddit_data ({columns})...")
+            _alter(cursor, 'reddit_data', f"ADD INDEX {index} ({columns})")
+    for index in ('idx_subreddit', 'idx_created_utc'):
+        if _index_exists(cursor, 'reddit_data', index):
+            _alter(cursor, 'reddit_data', f"DROP INDEX {index}")
+
+
+def _keyword_index(cursor):
+    """
+    Indexes every word of the stored text in reddit_keywords, which until now
+    only held the poller's matches, so keyword filters no longer fall back to
+    scanning `reddit_content`. Walks the primary key in batches and commits
+    each one; INSERT IGNORE makes a rerun after an interruption safe.
+    """
+    last_id = ''
+    indexed = 0
+    while True:
+        cursor.execute("SELECT id, content FROM reddit_content WHERE id > %s ORDER BY id LIMIT %s",
+                       (last_id, BACKFILL_BATCH_SIZE))
+        rows = cursor.fetchall()
+        if not rows:
+            break
+        terms = [(term, item_id) for item_id, content in rows for term in keyword_terms(content)]
+        if terms:
+            cursor.executemany("INSERT IGNORE INTO reddit_keywords (keyword, item_id) VALUES (%s, %s)", terms)
+        cursor.execute("COMMIT;")
+        last_id = rows[-1][0]
+        indexed += len(rows)
+    logger.info(f"Indexed the words of {indexed} items in reddit_keywords.")
+
+
+def _drop_inline_content(cursor):
+    """
+    Drops reddit_data.content/url once every row's text is in reddit_content.
+    Rows written inline after migration 1 (e.g. by processes still on the old
+    code) are copied first, in batches; the drop only runs when none is left.
+    """
+    columns = [c for c in ('content', 'url') if _column_exists(cursor, 'reddit_data', c)]
+    if not columns:
+        return
+    previous = None
+    while True:
+        cursor.execute("SELECT d.id FROM reddit_data d LEFT JOIN reddit_content c ON c.id = d.id "
+                       "WHERE c.id IS NULL ORDER BY d.id LIMIT %s", (BACKFILL_BATCH_SIZE,))
+        ids = [row[0] for row in cursor.fetchall()]
+        if not ids:
+            break
+        if ids == previous:
+            raise MigrationError(f"{len(ids)} reddit_data rows could not be copied to reddit_content; "
+                                 f"not dropping {', '.join(columns)}")
+        placeholders = ', '.join(['%s'] * len(ids))
+        cursor.execute("INSERT IGNORE INTO reddit_content (id, content, url) "
+                       f"SELECT id, content, url FROM reddit_data WHERE id IN ({placeholders})", tuple(ids))
+        cursor.execute(f"UPDATE reddit_data SET snippet = LEFT(content, {SNIPPET_LENGTH}) "
+                       f"WHERE id IN ({placeholders}) AND snippet IS NULL", tuple(ids))
+        cursor.execute("COMMIT;")
+        previous = ids
+    logger.info(f"Dropping reddit_data.{'/'.join(columns)}...")
+    _alter(cursor, 'reddit_data', ", ".join(f"DROP COLUMN {c}" for c in columns))
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "Baseline: tables and columns from the former startup schema checks", _baseline),
+    Migration(2, "Composite indexes (subreddit, created_utc) and (created_utc, id) on reddit_data", _composite_indexes),
+    Migration(3, "Backfill the reddit_keywords word index from reddit_content", _keyword_index),
+    Migration(4, "Drop reddit_data.content/url after verifying the copy in reddit_content", _drop_inline_content),
+]
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+def current_version(cursor) -> int:
+    """Highest applied version, or 0 for a database that was never migrated."""
+    try:
+        cursor.execute("SELECT MAX(version) FROM schema_migrations")
+    except Error as e:
+        if e.errno == errorcode.ER_NO_SUCH_TABLE:
+            return 0
+        raise
+    row = cursor.fetchone()
+    return int(row[0] or 0) if row else 0
+
+
+def pending(cursor, target: Optional[int] = None) -> List[Migration]:
+    version = current_version(cursor)
+    return [m for m in MIGRATIONS if version < m.version <= (target or LATEST_VERSION)]
+
+
+def migrate(conn, target: Optional[int] = None, lock_timeout: int = 60,
+            lock_wait_timeout: int = 10) -> List[int]:
+    """Applies pending migrations up to `target` (default: latest). Returns the versions applied."""
+    applied = []
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT GET_LOCK(%s, %s)", (LOCK_NAME, lock_timeout))
+        if not cursor.fetchone()[0]:
+            raise MigrationError(f"Could not acquire migration lock '{LOCK_NAME}' within {lock_timeout}s")
+        try:
+            cursor.execute("SET SESSION lock_wait_timeout = %s", (lock_wait_timeout,))
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS schema_migrations (
+                    version INT PRIMARY KEY,
+                    description VARCHAR(255) NOT NULL,
+                    applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                );
+            """)
+            # Read under the lock: another runner may have finished while we waited
+            for migration in pending(cursor, target):
+                logger.info(f"Applying migration {migration.version}: {migration.description}")
+                started = time.time()
+                migration.up(cursor)
+                cursor.execute("INSERT INTO schema_migrations (version, description) VALUES (%s, %s)",
+                               (migration.version, migration.description))
+                conn.commit()
+                applied.append(migration.version)
+                logger.info(f"Migration {migration.version} applied in {time.time() - started:.1f}s.")
+        finally:
+            cursor.execute("SELECT RELEASE_LOCK(%s)", (LOCK_NAME,))
+            cursor.fetchone()
+    return applied
@@ -0,0 +1,255 @@
+"""
+Job Queue
+
+Runs user-initiated fetches outside of the HTTP request. A job is identified
+by a `key` (e.g. "subreddit:python"); while a job for a key is queued or
+running, enqueueing the same key returns the existing job instead of starting
+a second one.
+
+Two backends are provided:
+- LocalJobBackend keeps jobs in process memory and runs them on a small
+  worker pool. Good for a single API process.
+- RedisJobBackend keeps job state and the pending queue in Redis, so several
+  API processes share coalescing and any of them may run a job.
+"""
+import json
+import time
+import uuid
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, asdict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+STATUS_QUEUED = 'queued'
+STATUS_RUNNING = 'running'
+STATUS_SUCCEEDED = 'succeeded'
+STATUS_FAILED = 'failed'
+FINISHED_STATUSES = (STATUS_SUCCEEDED, STATUS_FAILED)
+CLAIM_ATTEMPTS = 3
+
+
+@dataclass
+class Job:
+    id: str
+    kind: str
+    key: str
+    params: Dict[str, Any] = field(default_factory=dict)
+    status: str = STATUS_QUEUED
+    progress: float = 0.0
+    message: str = ""
+    result: Optional[Dict[str, Any]] = None
+    created_at: float = field(default_factory=time.time)
+    updated_at: float = field(default_factory=time.time)
+
+    def to_dict(self):
+        return asdict(self)
+
+
+class LocalJobBackend:
+    def __init__(self, max_workers: int = 4, job_ttl: int = 3600):
+        self.job_ttl = job_ttl
+        self._jobs: Dict[str, Job] = {}
+        self._active_keys: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    def claim(self, job: Job) -> Tuple[Job, bool]:
+        """Stores `job` unless one with the same key is still active.
+        Returns the job that will run, and whether it is the new one."""
+        with self._lock:
+            self._prune()
+            active_id = self._active_keys.get(job.key)
+            if active_id and active_id in self._jobs:
+                return self._jobs[active_id], False
+            self._jobs[job.id] = job
+            self._active_keys[job.key] = job.id
+            return job, True
+
+    def dispatch(self, job: Job, runner: Callable[[Job], None]):
+        self._executor.submit(runner, job)
+
+    def save(self, job: Job):
+        job.updated_at = time.time()
+        with self._lock:
+            self._jobs[job.id] = job
+            if job.status in FINISHED_STATUSES and self._active_keys.get(job.key) == job.id:
+                del self._active_keys[job.key]
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _prune(self):
+        cutoff = time.time() - self.job_ttl
+        expired = [j.id for j in self._jobs.values() if j.status in FINISHED_STATUSES and j.updated_at < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+
+class RedisJobBackend:
+    PENDING_LIST = 'jobs:pending'
+
+    def __init__(self, redis_client, max_workers: int = 4, job_ttl: int = 3600, lock_ttl: int = 900):
+        self.redis = redis_client
+        self.max_workers = max_workers
+        self.job_ttl = job_ttl
+        self.lock_ttl = lock_ttl
+        self._runner: Optional[Callable[[Job], None]] = None
+        self._consumers_started = False
+        self._start_lock = threading.Lock()
+
+    def _job_key(self, job_id: str) -> str:
+        return f"job:{job_id}"
+
+    def _lock_key(self, key: str) -> str:
+        return f"jobkey:{key}"
+
+    def claim(self, job: Job) -> Tuple[Job, bool]:
+        # The record goes in before the lock, so a lock seen by another process always
+        # names a job it can read. SET NX is the coalescing point shared by every API process.
+        lock_key = self._lock_key(job.key)
+        self.save(job)
+        for _ in range(CLAIM_ATTEMPTS):
+            if self.redis.set(lock_key, job.id, nx=True, ex=self.lock_ttl):
+                return job, True
+
+            active_id = self.redis.get(lock_key)
+            if isinstance(active_id, bytes):
+                active_id = active_id.decode()
+            if not active_id:
+                continue  # The active job finished in between; try to take the key again
+            self.redis.delete(self._job_key(job.id))
+            existing = self.get(active_id)
+            if existing:
+                return existing, False
+            # A lock without a readable record is treated as in flight, never taken over;
+            # it expires with `lock_ttl` if its owner died
+            return Job(id=active_id, kind=job.kind, key=job.key, params=job.params, message="In progress"), False
+
+        self.redis.delete(self._job_key(job.id))
+        raise RuntimeError(f"Could not claim job key '{job.key}'")
+
+    def dispatch(self, job: Job, runner: Callable[[Job], None]):
+        self._runner = runner
+        self._start_consumers()
+        self.redis.rpush(self.PENDING_LIST, job.id)
+
+    def save(self, job: Job):
+        job.updated_at = time.time()
+        self.redis.set(self._job_key(job.id), json.dumps(job.to_dict()), ex=self.job_ttl)
+        if job.status in FINISHED_STATUSES:
+            lock_key = self._lock_key(job.key)
+            active_id = self.redis.get(lock_key)
+            if isinstance(active_id, bytes):
+                active_id = active_id.decode()
+            if active_id == job.id:
+                self.redis.delete(lock_key)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        raw = self.redis.get(self._job_key(job_id))
+        if not raw:
+            return None
+        return Job(**json.loads(raw))
+
+    def start(self, runner: Callable[[Job], None]):
+        """Lets this process consume jobs queued by any API process."""
+        self._runner = runner
+        self._start_consumers()
+
+    def _start_consumers(self):
+        with self._start_lock:
+            if self._consumers_started:
+                return
+            for _ in range(self.max_workers):
+                threading.Thread(target=self._consume, daemon=True).start()
+            self._consumers_started = True
+
+    def _consume(self):
+        while True:
+            try:
+                popped = self.redis.blpop(self.PENDING_LIST, timeout=5)
+                if not popped:
+                    continue
+                job_id = popped[1].decode() if isinstance(popped[1], bytes) else popped[1]
+                job = self.get(job_id)
+                if job and job.status == STATUS_QUEUED:
+                    self._runner(job)
+            except Exception as e:
+                logger.error(f"Job consumer error: {e}")
+                time.sleep(5)
+
+
+class JobQueue:
+    def __init__(self, backend, notify: Optional[Callable[[Dict[str, Any]], None]] = None):
+        self.backend = backend
+        self.notify = notify
+        self.handlers: Dict[str, Callable[..., Dict[str, Any]]] = {}
+
+    def register(self, kind: str, handler: Callable[..., Dict[str, Any]]):
+        """`handler(progress=..., **params)` must return a dict with a 'status' key."""
+        self.handlers[kind] = handler
+
+    def start(self):
+        if hasattr(self.backend, 'start'):
+            self.backend.start(self._run)
+
+    def enqueue(self, kind: str, params: Dict[str, Any], key: Optional[str] = None) -> Tuple[Job, bool]:
+        if kind not in self.handlers:
+            raise ValueError(f"Unknown job kind '{kind}'")
+        job = Job(id=uuid.uuid4().hex, kind=kind, key=key or f"{kind}:{uuid.uuid4().hex}", params=params)
+        job, created = self.backend.claim(job)
+        if created:
+            self._publish(job)
+            self.backend.dispatch(job, self._run)
+        return job, created
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.backend.get(job_id)
+
+    def _publish(self, job: Job):
+        if self.notify:
+            try:
+                self.notify(job.to_dict())
+            except Exception as e:
+                logger.error(f"Error publishing job {job.id} progress: {e}")
+
+    def _run(self, job: Job):
+        job.status = STATUS_RUNNING
+        job.message = "Running"
+        self.backend.save(job)
+        self._publish(job)
+
+        def report(done: int, total: int, message: str = ""):
+            job.progress = round(min(done / total, 1.0), 3) if total else 0.0
+            if message:
+                job.message = message
+            self.backend.save(job)
+            self._publish(job)
+
+        try:
+            result = self.handlers[job.kind](progress=report, **job.params)
+            job.result = result
+            job.status = STATUS_FAILED if result.get('status') == 'error' else STATUS_SUCCEEDED
+            job.message = result.get('message', '')
+            if job.status == STATUS_SUCCEEDED:
+                job.progress = 1.0
+        except Exception as e:
+            logger.error(f"Job {job.id} ({job.kind}) failed: {e}")
+            job.status = STATUS_FAILED
+            job.message = str(e)
+
+        self.backend.save(job)
+        self._publish(job)
+
+
+def create_backend(name: str, redis_url: str, max_workers: int = 4):
+    if name == 'redis':
+        import redis
+        return RedisJobBackend(redis.Redis.from_url(redis_url), max_workers=max_workers)
+    if name == 'local':
+        return LocalJobBackend(max_workers=max_workers)
+    raise ValueError(f"Unknown JOB_BACKEND '{name}' (expected 'local' or 'redis')")
@@ -1,6 +1,26 @@
-from dataclasses import dataclass
-from typing import Optional
-from datetime import datetime
+import re
+from dataclasses import dataclass, field
+from typing import Optional, List, Set
+from datetime import datetime, timezone
+
+# Characters of `content` kept inline in reddit_data; the full text lives in reddit_content
+SNIPPET_LENGTH = 200
+
+# Every word of an item is indexed in reddit_keywords, so keyword filters are indexed lookups
+KEYWORD_PATTERN = re.compile(r"\w+")
+KEYWORD_LENGTH = 100
+
+def keyword_terms(text: Optional[str]) -> Set[str]:
+    """Lowercased words of `text` as stored in reddit_keywords."""
+    return {word for word in KEYWORD_PATTERN.findall((text or "").lower()) if len(word) <= KEYWORD_LENGTH}
+
+def utc_datetime(timestamp: float) -> datetime:
+    """Epoch seconds as the naive UTC datetime stored in `created_utc`."""
+    return datetime.fromtimestamp(timestamp, timezone.utc).replace(tzinfo=None)
+
+def utc_timestamp(value: datetime) -> float:
+    """Epoch seconds of a naive UTC datetime; the inverse of `utc_datetime`."""
+    return value.replace(tzinfo=timezone.utc).timestamp()
 
 @dataclass
 class RedditItem:
@@ -13,8 +33,15 @@ class RedditItem:
     created_utc: datetime
     sentiment_label: Optional[str] = None
     sentiment_score: Optional[float] = None
+    sentiment_policy: Optional[str] = None
     score: int = 0
     num_comments: int = 0
+    keywords: List[str] = field(default_factory=list)
+    duplicate_of: Optional[str] = None
+
+    @property
+    def snippet(self) -> str:
+        return (self.content or "")[:SNIPPET_LENGTH]
 
     def to_dict(self):
         return {
@@ -23,10 +50,35 @@ class RedditItem:
             "subreddit": self.subreddit,
             "author": self.author,
             "content": self.content,
+            "snippet": self.snippet,
             "url": self.url,
             "created_utc": self.created_utc.isoformat() if self.created_utc else None,
             "sentiment_label": self.sentiment_label,
             "sentiment_score": self.sentiment_score,
+            "sentiment_policy": self.sentiment_policy,
             "score": self.score,
-            "num_comments": self.num_comments
+            "num_comments": self.num_comments,
+            "keywords": self.keywords,
+            "duplicate_of": self.duplicate_of
+        }
+
+@dataclass
+class SentimentAlert:
+    subreddit: str
+    kind: str  # 'sentiment' or 'volume'
+    z_score: float
+    value: float
+    baseline: float
+    items: int
+    window_start: datetime
+
+    def to_dict(self):
+        return {
+            "subreddit": self.subreddit,
+            "kind": self.kind,
+            "z_score": self.z_score,
+            "value": self.value,
+            "baseline": self.baseline,
+            "items": self.items,
+            "window_start": self.window_start.isoformat() if self.window_start else None
         }
@@ -1,12 +1,18 @@
 import re
 from nltk.sentiment.vader import SentimentIntensityAnalyzer as NLTKSentimentIntensityAnalyzer
-from typing import Dict
+from typing import Dict, List, Optional, Sequence, Tuple
 import logging
+from app import config
+from app.nlp.backends import SentimentBackend, OnnxTransformerBackend, DynamicBatcher
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-class SentimentAnalyzer:
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])\s+|\n+')
+
+class VaderBackend(SentimentBackend):
+    name = 'vader'
+
     def __init__(self):
         try:
             self.analyzer = NLTKSentimentIntensityAnalyzer()
@@ -14,6 +20,50 @@ class SentimentAnalyzer:
             logger.error("VADER lexicon not found. Please run: python -m nltk.downloader vader_lexicon")
             raise
 
+    def polarity(self, texts: List[str]) -> List[float]:
+        return [self.analyzer.polarity_scores(text)['compound'] for text in texts]
+
+def create_backend(name: str = config.SENTIMENT_BACKEND) -> SentimentBackend:
+    if name == 'vader':
+        return VaderBackend()
+    if name == 'onnx':
+        backend = OnnxTransformerBackend(
+            config.SENTIMENT_MODEL_PATH,
+            config.SENTIMENT_TOKENIZER_PATH,
+            labels=config.SENTIMENT_MODEL_LABELS.split(',')
+        )
+        return DynamicBatcher(backend, max_batch=config.SENTIMENT_BATCH_SIZE,
+                              max_wait_ms=config.SENTIMENT_BATCH_WAIT_MS)
+    raise ValueError(f"Unknown SENTIMENT_BACKEND '{name}' (expected 'vader' or 'onnx')")
+
+class SentimentAnalyzer:
+    def __init__(self, policy: str = config.SENTIMENT_POLICY,
+                 max_tokens: int = config.SENTIMENT_MAX_TOKENS,
+                 chunk_tokens: int = config.SENTIMENT_CHUNK_TOKENS,
+                 title_weight: float = config.SENTIMENT_TITLE_WEIGHT,
+                 backend: Optional[SentimentBackend] = None):
+        """
+        policy:
+          'full'    - score the whole text in one pass (cost grows with length).
+          'chunked' - split into sentences, keep at most `max_tokens` words (head and
+                      tail halves when longer), score chunks of ~`chunk_tokens` words
+                      and average them weighted by length.
+        """
+        if policy not in ('full', 'chunked'):
+            raise ValueError("SENTIMENT_POLICY must be 'full' or 'chunked'")
+        self.policy = policy
+        self.max_tokens = max_tokens
+        self.chunk_tokens = chunk_tokens
+        self.title_weight = title_weight
+        self.backend = backend or create_backend()
+
+    @property
+    def policy_name(self) -> str:
+        """Short tag stored with every score so results can be traced to how they were computed."""
+        name = 'full' if self.policy == 'full' else f"chunked:t{self.max_tokens}:c{self.chunk_tokens}"
+        # VADER tags stay unprefixed so they match scores stored before backends existed
+        return name if self.backend.name == 'vader' else f"{self.backend.name}:{name}"
+
     def clean_text(self, text: str) -> str:
         text = re.sub(r'http\S+|www\S+|https\S+', '', text, flags=re.MULTILINE)
         text = re.sub(r'\/u\/\w+', '', text, flags=re.MULTILINE)
@@ -29,21 +79,114 @@ class SentimentAnalyzer:
         else:
             return 'neutral'
 
+    def _budget_sentences(self, sentences: List[List[str]]) -> List[List[str]]:
+        """Keeps the first and last `max_tokens / 2` words' worth of sentences;
+        openings and conclusions carry most of a long post's sentiment."""
+        total = sum(len(s) for s in sentences)
+        if total <= self.max_tokens:
+            return sentences
+
+        half = self.max_tokens // 2
+        head, used = [], 0
+        for words in sentences:
+            if used >= half:
+                break
+            head.append(words[:half - used])
+            used += len(head[-1])
+
+        tail, used = [], 0
+        for words in reversed(sentences[len(head):]):
+            if used >= self.max_tokens - half:
+                break
+            tail.insert(0, words[-(self.max_tokens - half - used):])
+            used += len(tail[0])
+
+        return head + tail
+
+    def _chunks(self, text: str) -> List[Tuple[str, int]]:
+        sentences = []
+        for sentence in SENTENCE_BOUNDARY.split(text):
+            words = self.clean_text(sentence).split()
+            if words:
+                sentences.append(words)
+
+        chunks, current = [], []
+        for words in self._budget_sentences(sentences):
+            current.extend(words)
+            if len(current) >= self.chunk_tokens:
+                chunks.append((" ".join(current), len(current)))
+                current = []
+        if current:
+            chunks.append((" ".join(current), len(current)))
+        return chunks
+
+    def _segments(self, text: str) -> List[Tuple[str, int]]:
+        """(text, words) pieces the backend scores for `text` under the configured policy."""
+        if self.policy == 'full':
+            cleaned_text = self.clean_text(text)
+            return [(cleaned_text, len(cleaned_text.split()))]
+        return self._chunks(text)
+
+    def _combine(self, segments: List[Tuple[str, int]], scores: List[float]) -> Tuple[float, int]:
+        """Returns (compound score, words scored) from the scores of `segments`."""
+        if not segments:
+            return 0.0, 0
+        if self.policy == 'full':
+            return scores[0], segments[0][1]
+        total = sum(length for _, length in segments)
+        weighted = sum(score * length for score, (_, length) in zip(scores, segments))
+        return weighted / total, total
+
+    def analyze_batch(self, entries: Sequence[Tuple[Optional[str], str]]) -> List[Dict[str, float | str]]:
+        """Scores many texts with one backend call, so a batching backend runs one pass.
+
+        Each entry is (title, body) for a post, scored like `analyze_post`, or
+        (None, text) for anything else, scored like `analyze_sentiment`.
+        """
+        parts: List[List[List[Tuple[str, int]]]] = []
+        for title, body in entries:
+            if title is None:
+                texts = [body] if body else []
+            elif self.policy == 'full':
+                texts = [f"{title} {body}"]
+            else:
+                texts = [title or "", body or ""]
+            parts.append([self._segments(text) for text in texts])
+
+        scores = self.backend.polarity([chunk for entry in parts for segments in entry for chunk, _ in segments])
+
+        results, offset = [], 0
+        for (title, _), entry in zip(entries, parts):
+            combined = []
+            for segments in entry:
+                combined.append(self._combine(segments, scores[offset:offset + len(segments)]))
+                offset += len(segments)
+
+            if title is None or self.policy == 'full':
+                compound_score = combined[0][0] if combined else 0.0
+                policy = self.policy_name
+            else:
+                (title_score, title_words), (body_score, body_words) = combined
+                if not body_words:
+                    compound_score = title_score
+                elif not title_words:
+                    compound_score = body_score
+                else:
+                    compound_score = self.title_weight * title_score + (1 - self.title_weight) * body_score
+                policy = f"{self.policy_name}:title{self.title_weight:g}"
+
+            results.append({
+                "label": self.classify_sentiment(compound_score),
+                "score": compound_score,
+                "policy": policy
+            })
+        return results
+
     def analyze_sentiment(self, text: str) -> Dict[str, float | str]:
-        if not text:
-            return {
-                "label": "neutral",
-                "score": 0.0
-            }
-            
-        cleaned_text = self.clean_text(text)
-        scores = self.analyzer.polarity_scores(cleaned_text)
-        compound_score = scores['compound']
-        label = self.classify_sentiment(compound_score)
-        
-        return {
-            "label": label,
-            "score": compound_score
-        }
-
-analyzer = SentimentAnalyzer()
\ No newline at end of file
+        return self.analyze_batch([(None, text)])[0]
+
+    def analyze_post(self, title: str, body: str) -> Dict[str, float | str]:
+        """Scores a post's title on its own and blends it with the (bounded) body score."""
+        return self.analyze_batch([(title, body)])[0]
+
+analyzer = SentimentAnalyzer()
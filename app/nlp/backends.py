@@ -0,0 +1,161 @@
+"""
+Sentiment Backends
+
+A backend turns a list of texts into compound polarity scores in [-1, 1],
+the same range VADER's `compound` uses, so `SentimentAnalyzer.classify_sentiment`
+thresholds apply unchanged whichever backend produced the score.
+
+VADER (the default) lives in `app.nlp.analyzer`. This module holds the
+optional CPU transformer backend and the dynamic batcher that sits in front
+of it.
+"""
+import time
+import queue
+import threading
+import logging
+from abc import ABC, abstractmethod
+from typing import List, Optional, Sequence
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class SentimentBackend(ABC):
+    name = 'base'
+
+    @abstractmethod
+    def polarity(self, texts: List[str]) -> List[float]:
+        """Returns one compound score in [-1, 1] per text, in order."""
+
+
+class OnnxTransformerBackend(SentimentBackend):
+    """Sequence-classification transformer exported to ONNX, run on CPU.
+
+    Needs the optional `onnxruntime`, `tokenizers` and `numpy` packages plus a
+    model.onnx / tokenizer.json pair (e.g. a RoBERTa sentiment model exported
+    with `optimum-cli export onnx`). The score is P(positive) - P(negative).
+    """
+    name = 'onnx'
+
+    def __init__(self, model_path: str, tokenizer_path: str,
+                 labels: Sequence[str] = ('negative', 'neutral', 'positive'),
+                 max_length: int = 256, threads: int = 0):
+        import numpy as np
+        import onnxruntime
+        from tokenizers import Tokenizer
+
+        self.np = np
+        options = onnxruntime.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = onnxruntime.InferenceSession(model_path, options, providers=['CPUExecutionProvider'])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+        self.tokenizer = Tokenizer.from_file(tokenizer_path)
+        self.tokenizer.enable_truncation(max_length=max_length)
+        self.tokenizer.enable_padding()
+
+        labels = [label.strip().lower() for label in labels]
+        self.positive_index = labels.index('positive')
+        self.negative_index = labels.index('negative')
+
+    def polarity(self, texts: List[str]) -> List[float]:
+        if not texts:
+            return []
+        np = self.np
+        encodings = self.tokenizer.encode_batch(texts)
+        feed = {
+            'input_ids': np.array([e.ids for e in encodings], dtype=np.int64),
+            'attention_mask': np.array([e.attention_mask for e in encodings], dtype=np.int64),
+            'token_type_ids': np.array([e.type_ids for e in encodings], dtype=np.int64),
+        }
+        logits = self.session.run(None, {k: v for k, v in feed.items() if k in self.input_names})[0]
+
+        logits = logits - logits.max(axis=1, keepdims=True)
+        probs = np.exp(logits)
+        probs /= probs.sum(axis=1, keepdims=True)
+        return (probs[:, self.positive_index] - probs[:, self.negative_index]).astype(float).tolist()
+
+
+class _Request:
+    __slots__ = ('texts', 'done', 'result', 'error')
+
+    def __init__(self, texts: List[str]):
+        self.texts = texts
+        self.done = threading.Event()
+        self.result: Optional[List[float]] = None
+        self.error: Optional[BaseException] = None
+
+
+class DynamicBatcher(SentimentBackend):
+    """Coalesces concurrent `polarity` calls into forward passes of the wrapped backend.
+
+    A single inference worker takes the first waiting request, then keeps collecting
+    for up to `max_wait_ms` or until `max_batch` texts are queued, runs the backend
+    in passes of at most `max_batch` texts and hands each caller back its slice of
+    the results. The collector already sends a whole flush batch per call, so
+    coalescing mostly helps when several streams flush at once.
+    """
+
+    def __init__(self, backend: SentimentBackend, max_batch: int = 32, max_wait_ms: float = 10.0):
+        self.backend = backend
+        self.name = backend.name
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue: "queue.Queue[_Request]" = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name='sentiment-inference', daemon=True)
+        self._worker.start()
+
+    def polarity(self, texts: List[str]) -> List[float]:
+        if not texts:
+            return []
+        request = _Request(list(texts))
+        self._queue.put(request)
+        request.done.wait()
+        if request.error:
+            raise request.error
+        return request.result
+
+    def _collect(self) -> List[_Request]:
+        batch = [self._queue.get()]
+        size = len(batch[0].texts)
+        deadline = time.monotonic() + self.max_wait
+        while size < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(request)
+            size += len(request.texts)
+        return batch
+
+    def _forward(self, texts: List[str]) -> List[float]:
+        # Under eventlet the worker is a greenthread; push the CPU-bound pass onto a
+        # real OS thread so the hub keeps serving sockets while the model runs.
+        from eventlet import patcher, tpool
+        if patcher.is_monkey_patched('thread'):
+            return tpool.execute(self.backend.polarity, texts)
+        return self.backend.polarity(texts)
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            texts = [text for request in batch for text in request.texts]
+            try:
+                scores = []
+                for start in range(0, len(texts), self.max_batch):
+                    scores.extend(self._forward(texts[start:start + self.max_batch]))
+                offset = 0
+                for request in batch:
+                    request.result = scores[offset:offset + len(request.texts)]
+                    offset += len(request.texts)
+            except Exception as e:
+                logger.error(f"Sentiment inference failed for a batch of {len(texts)} texts: {e}")
+                for request in batch:
+                    request.error = e
+            finally:
+                for request in batch:
+                    request.done.set()
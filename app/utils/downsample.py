@@ -0,0 +1,112 @@
+"""
+Point Downsampling
+
+Shrinks /api/data responses for charts while keeping their shape:
+
+- `lttb`: Largest-Triangle-Three-Buckets over (created_utc, sentiment_score),
+  for time series. Keeps the points that define peaks and troughs.
+- `stratified_sample`: reservoir sampling within each (subreddit, label)
+  stratum, with slots allocated proportionally to stratum size, for scatter
+  plots. Keeps small groups visible and the overall mix unchanged.
+
+Both return the kept rows with a `weight` field: the number of original
+points each returned point stands for.
+"""
+import random
+from typing import Any, Dict, List, Optional, Sequence
+
+
+def _timestamp(value: Any) -> float:
+    return value.timestamp() if hasattr(value, 'timestamp') else float(value or 0)
+
+
+def lttb(rows: List[Dict[str, Any]], max_points: int,
+         x_key: str = 'created_utc', y_key: str = 'sentiment_score') -> List[Dict[str, Any]]:
+    if max_points <= 0:
+        return []
+    ordered = sorted(rows, key=lambda r: _timestamp(r.get(x_key)))
+    n = len(ordered)
+    if n <= max_points:
+        return [dict(row, weight=1) for row in ordered]
+    if max_points < 3:
+        step = n / max_points
+        return [dict(ordered[int(i * step)], weight=step) for i in range(max_points)]
+
+    xs = [_timestamp(r.get(x_key)) for r in ordered]
+    ys = [float(r.get(y_key) or 0.0) for r in ordered]
+
+    # First and last points are always kept; the rest is split into max_points - 2 buckets
+    bucket_size = (n - 2) / (max_points - 2)
+    result = [dict(ordered[0], weight=1)]
+    a = 0
+    for i in range(max_points - 2):
+        start = int(i * bucket_size) + 1
+        end = int((i + 1) * bucket_size) + 1
+
+        next_start = end
+        next_end = min(int((i + 2) * bucket_size) + 1, n)
+        span = max(next_end - next_start, 1)
+        avg_x = sum(xs[next_start:next_end]) / span if next_end > next_start else xs[-1]
+        avg_y = sum(ys[next_start:next_end]) / span if next_end > next_start else ys[-1]
+
+        best, best_area = start, -1.0
+        for j in range(start, end):
+            area = abs((xs[a] - avg_x) * (ys[j] - ys[a]) - (xs[a] - xs[j]) * (avg_y - ys[a]))
+            if area > best_area:
+                best, best_area = j, area
+
+        result.append(dict(ordered[best], weight=end - start))
+        a = best
+
+    result.append(dict(ordered[-1], weight=1))
+    return result
+
+
+def stratified_sample(rows: List[Dict[str, Any]], max_points: int,
+                      strata: Sequence[str] = ('subreddit', 'sentiment_label'),
+                      seed: Optional[int] = None) -> List[Dict[str, Any]]:
+    if max_points <= 0:
+        return []
+    if len(rows) <= max_points:
+        return [dict(row, weight=1) for row in rows]
+
+    groups: Dict[tuple, List[Dict[str, Any]]] = {}
+    for row in rows:
+        groups.setdefault(tuple(row.get(k) for k in strata), []).append(row)
+
+    # Proportional allocation (largest remainder), with at least one point per
+    # stratum while the budget allows so rare groups do not vanish
+    total = len(rows)
+    quotas = {key: max_points * len(members) / total for key, members in groups.items()}
+    alloc = {key: int(q) for key, q in quotas.items()}
+    if len(groups) <= max_points:
+        for key in alloc:
+            alloc[key] = max(alloc[key], 1)
+    while sum(alloc.values()) > max_points:
+        # The one-point minimum overshot the budget; take it back from the biggest strata
+        alloc[max(alloc, key=alloc.get)] -= 1
+    leftover = max_points - sum(alloc.values())
+    for key in sorted(quotas, key=lambda k: quotas[k] - int(quotas[k]), reverse=True):
+        if leftover <= 0:
+            break
+        if alloc[key] < len(groups[key]):
+            alloc[key] += 1
+            leftover -= 1
+
+    rng = random.Random(seed)
+    sampled = []
+    for key, members in groups.items():
+        k = min(alloc[key], len(members))
+        if k <= 0:
+            continue
+        reservoir = members[:k]
+        for i in range(k, len(members)):
+            j = rng.randint(0, i)
+            if j < k:
+                reservoir[j] = members[i]
+        weight = len(members) / k
+        sampled.extend(dict(row, weight=weight) for row in reservoir)
+
+    # Keep the response in the same newest-first order as an unsampled one
+    sampled.sort(key=lambda r: _timestamp(r.get('created_utc')), reverse=True)
+    return sampled
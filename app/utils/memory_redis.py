@@ -0,0 +1,133 @@
+"""
+In-Memory Redis Stand-In
+
+A tiny, single-process substitute for the handful of redis-py commands the
+collector coordination and job queue use. It exists so that multi-worker
+behaviour can be exercised locally and in tests without a Redis server;
+several coordinators sharing one instance behave like processes sharing one
+Redis. Values are returned as `str` (like a client with decode_responses=True).
+"""
+import time
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+class InMemoryRedis:
+    def __init__(self, clock: Callable[[], float] = time.time):
+        self.clock = clock
+        self._data: Dict[str, Any] = {}
+        self._expires: Dict[str, float] = {}
+        self._lock = threading.RLock()
+
+    def _expire_if_needed(self, name: str):
+        expires_at = self._expires.get(name)
+        if expires_at is not None and self.clock() >= expires_at:
+            self._data.pop(name, None)
+            self._expires.pop(name, None)
+
+    def _alive(self, name: str) -> bool:
+        self._expire_if_needed(name)
+        return name in self._data
+
+    # --- Strings ---
+    def set(self, name: str, value: Any, ex: Optional[int] = None, px: Optional[int] = None,
+            nx: bool = False) -> Optional[bool]:
+        with self._lock:
+            if nx and self._alive(name):
+                return None
+            self._data[name] = str(value)
+            self._expires.pop(name, None)
+            if ex is not None:
+                self._expires[name] = self.clock() + ex
+            elif px is not None:
+                self._expires[name] = self.clock() + px / 1000.0
+            return True
+
+    def get(self, name: str) -> Optional[str]:
+        with self._lock:
+            return self._data.get(name) if self._alive(name) else None
+
+    def delete(self, *names: str) -> int:
+        with self._lock:
+            removed = 0
+            for name in names:
+                if self._alive(name):
+                    removed += 1
+                self._data.pop(name, None)
+                self._expires.pop(name, None)
+            return removed
+
+    def pexpire(self, name: str, milliseconds: int) -> bool:
+        with self._lock:
+            if not self._alive(name):
+                return False
+            self._expires[name] = self.clock() + milliseconds / 1000.0
+            return True
+
+    # --- Sorted sets ---
+    def zadd(self, name: str, mapping: Dict[str, float]) -> int:
+        with self._lock:
+            self._expire_if_needed(name)
+            zset = self._data.setdefault(name, {})
+            added = sum(1 for member in mapping if member not in zset)
+            zset.update({member: float(score) for member, score in mapping.items()})
+            return added
+
+    def zrem(self, name: str, *members: str) -> int:
+        with self._lock:
+            zset = self._data.get(name, {}) if self._alive(name) else {}
+            return sum(1 for member in members if zset.pop(member, None) is not None)
+
+    def zrangebyscore(self, name: str, min: float, max: float) -> List[str]:
+        with self._lock:
+            zset = self._data.get(name, {}) if self._alive(name) else {}
+            low, high = float(min), float(max)
+            return [m for m, s in sorted(zset.items(), key=lambda kv: (kv[1], kv[0])) if low <= s <= high]
+
+    def zremrangebyscore(self, name: str, min: float, max: float) -> int:
+        with self._lock:
+            doomed = self.zrangebyscore(name, min, max)
+            return self.zrem(name, *doomed) if doomed else 0
+
+    # --- Lists ---
+    def rpush(self, name: str, *values: Any) -> int:
+        with self._lock:
+            self._expire_if_needed(name)
+            items = self._data.setdefault(name, [])
+            items.extend(str(v) for v in values)
+            return len(items)
+
+    def lpush(self, name: str, *values: Any) -> int:
+        with self._lock:
+            self._expire_if_needed(name)
+            items = self._data.setdefault(name, [])
+            for v in values:
+                items.insert(0, str(v))
+            return len(items)
+
+    def lrange(self, name: str, start: int, end: int) -> List[str]:
+        with self._lock:
+            items = self._data.get(name, []) if self._alive(name) else []
+            return items[start:] if end == -1 else items[start:end + 1]
+
+    def ltrim(self, name: str, start: int, end: int) -> bool:
+        with self._lock:
+            if self._alive(name):
+                self._data[name] = self.lrange(name, start, end)
+            return True
+
+    def blpop(self, name: str, timeout: int = 0) -> Optional[Tuple[str, str]]:
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._lock:
+                items = self._data.get(name) if self._alive(name) else None
+                if items:
+                    return name, items.pop(0)
+            if timeout and time.monotonic() >= deadline:
+                return None
+            time.sleep(0.05)
+
+    # --- Pub/Sub ---
+    def publish(self, channel: str, message: Any) -> int:
+        # Nobody subscribes to the stand-in; accepted and dropped like a channel with no listeners
+        return 0
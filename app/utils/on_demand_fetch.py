@@ -5,10 +5,10 @@ This module handles short-lived, user-initiated data fetching.
 It is separate from the long-running collector.
 """
 import praw
-import datetime
 from typing import List, Dict, Any
 
 from app import config
+from app.models import utc_datetime
 from app.nlp import analyzer
 from app.database import db_manager
 
@@ -39,7 +39,7 @@ def _format_post_for_db(post: praw.models.Submission) -> Dict[str, Any]:
     data['item_type'] = 'post'
     data['subreddit'] = str(post.subreddit).lower()
     data['author'] = str(post.author) if post.author else "[deleted]"
-    data['created_utc'] = datetime.datetime.fromtimestamp(post.created_utc)
+    data['created_utc'] = utc_datetime(post.created_utc)
     
     # Perform sentiment analysis
     sentiment = analyzer.analyze_sentiment(data['content'])
@@ -10,13 +10,24 @@ const apiClient = axios.create({
 
 export default {
   // --- Data Getter Endpoints ---
-  getData: (subreddit = null, timeframe = null, keywords = null, subreddits = null) => {
+  // maxPoints: server-side downsampling; downsample: 'scatter' (stratified) or 'timeseries' (LTTB).
+  // Downsampled rows carry a `weight` = number of original rows they stand for.
+  // options.q: server-side search over subreddit, label and the full text (rows only carry a snippet).
+  // options.limit/offset/sort: one page of rows ordered by `sort` ('-' prefix = descending);
+  // the X-Total-Count response header holds the number of matching rows.
+  getData: (subreddit = null, timeframe = null, keywords = null, subreddits = null, maxPoints = null, downsample = null, options = {}) => {
     let url = '/data';
     const params = new URLSearchParams();
     if (subreddit) params.append('subreddit', subreddit);
     if (timeframe) params.append('timeframe', timeframe);
     if (keywords) params.append('keywords', keywords);
     if (subreddits && subreddits.length > 0) params.append('subreddits', subreddits.join(','));
+    if (maxPoints) params.append('max_points', maxPoints);
+    if (downsample) params.append('downsample', downsample);
+    if (options.q) params.append('q', options.q);
+    if (options.limit) params.append('limit', options.limit);
+    if (options.offset) params.append('offset', options.offset);
+    if (options.sort) params.append('sort', options.sort);
 
     const queryString = params.toString();
     if (queryString) {
@@ -25,14 +36,59 @@ export default {
     return apiClient.get(url);
   },
 
-  getSubreddits: () => {
-    return apiClient.get('/subreddits');
+  // prefix: autocomplete filter; sort: 'name' (default) or 'activity'
+  getSubreddits: (prefix = null, sort = null, limit = null) => {
+    const params = new URLSearchParams();
+    if (prefix) params.append('q', prefix);
+    if (sort) params.append('sort', sort);
+    if (limit) params.append('limit', limit);
+
+    const queryString = params.toString();
+    return apiClient.get(queryString ? `/subreddits?${queryString}` : '/subreddits');
+  },
+
+  // Full content and url; /data rows only carry a `snippet`
+  getItem: (id) => {
+    return apiClient.get(`/items/${encodeURIComponent(id)}`);
+  },
+
+  getItems: (ids) => {
+    const params = new URLSearchParams();
+    params.append('ids', ids.join(','));
+    return apiClient.get(`/items?${params.toString()}`);
   },
 
   getGroups: () => {
     return apiClient.get('/groups');
   },
 
+  // Volume, sentiment shares and engagement for every stored group in one request
+  getGroupStats: (timeframe = null, groups = null) => {
+    const params = new URLSearchParams();
+    if (timeframe) params.append('timeframe', timeframe);
+    if (groups && groups.length > 0) params.append('groups', groups.join(','));
+    const queryString = params.toString();
+    return apiClient.get(queryString ? `/groups/stats?${queryString}` : '/groups/stats');
+  },
+
+  // Most frequent terms over the last `hours`, each with the mean sentiment of the items using it
+  getTrending: (subreddit = null, hours = 24, limit = 20) => {
+    const params = new URLSearchParams();
+    if (subreddit) params.append('subreddit', subreddit);
+    params.append('hours', hours);
+    params.append('limit', limit);
+    return apiClient.get(`/trending?${params.toString()}`);
+  },
+
+  // Recent sentiment/volume anomaly alerts (live ones arrive as 'sentiment_alert' socket events)
+  getAlerts: (subreddit = null, hours = null, limit = 100) => {
+    const params = new URLSearchParams();
+    if (subreddit) params.append('subreddit', subreddit);
+    if (hours) params.append('hours', hours);
+    params.append('limit', limit);
+    return apiClient.get(`/alerts?${params.toString()}`);
+  },
+
   getStats: (subreddit = null, timeframe = null, keywords = null, subreddits = null) => {
     let url = '/stats';
     const params = new URLSearchParams();
@@ -56,4 +112,20 @@ export default {
   fetchRandom: () => {
     return apiClient.post('/fetch/random');
   },
+
+  // --- Background Jobs ---
+  getJob: (jobId) => {
+    return apiClient.get(`/jobs/${jobId}`);
+  },
+
+  // Polls a queued fetch job until it finishes; resolves with the final job
+  waitForJob: async (jobId, onProgress = null, intervalMs = 1000) => {
+    for (;;) {
+      const { data: job } = await apiClient.get(`/jobs/${jobId}`);
+      if (onProgress) onProgress(job);
+      if (job.status === 'succeeded') return job;
+      if (job.status === 'failed') throw new Error(job.message || 'Job failed');
+      await new Promise(resolve => setTimeout(resolve, intervalMs));
+    }
+  },
 };
\ No newline at end of file
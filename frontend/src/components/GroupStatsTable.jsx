@@ -0,0 +1,47 @@
+import React from 'react';
+import { useLanguage } from '../context/LanguageContext';
+import { useTranslation } from '../i18n/translations';
+import './PostTable.css';
+
+const percent = (value) => `${(value * 100).toFixed(1)}%`;
+
+function GroupStatsTable({ stats, loading }) {
+  const { language } = useLanguage();
+  const t = useTranslation(language);
+
+  if (loading) return <div className="panel-loading">{t('loading')}</div>;
+  if (!stats || stats.length === 0) return <div className="no-data">{t('noData')}</div>;
+
+  return (
+    <div className="table-wrapper">
+      <table className="custom-table">
+        <thead>
+          <tr>
+            <th>{t('group')}</th>
+            <th>{t('totalPosts')}</th>
+            <th>{t('avgSentiment')}</th>
+            <th>{t('positiveShare')}</th>
+            <th>{t('negativeShare')}</th>
+            <th>{t('avgScore')}</th>
+            <th>{t('avgComments')}</th>
+          </tr>
+        </thead>
+        <tbody>
+          {stats.map(row => (
+            <tr key={row.group_name}>
+              <td className="subreddit-cell">{row.group_name}</td>
+              <td>{row.total_posts}</td>
+              <td className="score-cell">{row.avg_sentiment.toFixed(3)}</td>
+              <td>{percent(row.positive_share)}</td>
+              <td>{percent(row.negative_share)}</td>
+              <td>{row.avg_score.toFixed(1)}</td>
+              <td>{row.avg_comments.toFixed(1)}</td>
+            </tr>
+          ))}
+        </tbody>
+      </table>
+    </div>
+  );
+}
+
+export default GroupStatsTable;
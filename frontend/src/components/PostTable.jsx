@@ -1,59 +1,50 @@
-import React, { useState, useMemo } from 'react';
+import React, { useState, useEffect } from 'react';
+import api from '../api';
 import { useLanguage } from '../context/LanguageContext';
 import { useTranslation } from '../i18n/translations';
 import './PostTable.css';
 
-function PostTable({ rowData }) {
+// Server-paged table: `rowData` is the current page, already searched (against the
+// full text, not the snippet the rows carry) and sorted by the server.
+function PostTable({
+  rowData, totalCount, currentPage, itemsPerPage, onPageChange,
+  sortField, sortDirection, onSortChange, searchTerm = '', onSearchChange
+}) {
   const { language } = useLanguage();
   const t = useTranslation(language);
 
-  const [currentPage, setCurrentPage] = useState(1);
-  const [sortField, setSortField] = useState('created_utc');
-  const [sortDirection, setSortDirection] = useState('desc');
-  const [searchTerm, setSearchTerm] = useState('');
   const [expandedRows, setExpandedRows] = useState(new Set());
-  const itemsPerPage = 20;
-
-  const filteredData = useMemo(() => {
-    if (!searchTerm) return rowData;
-    const term = searchTerm.toLowerCase();
-    return rowData.filter(item =>
-      item.content?.toLowerCase().includes(term) ||
-      item.subreddit?.toLowerCase().includes(term) ||
-      item.sentiment_label?.toLowerCase().includes(term)
-    );
-  }, [rowData, searchTerm]);
-
-  const sortedData = useMemo(() => {
-    const sorted = [...filteredData].sort((a, b) => {
-      let aVal = a[sortField];
-      let bVal = b[sortField];
-
-      if (sortField === 'created_utc') {
-        aVal = new Date(aVal).getTime();
-        bVal = new Date(bVal).getTime();
-      }
-
-      if (aVal < bVal) return sortDirection === 'asc' ? -1 : 1;
-      if (aVal > bVal) return sortDirection === 'asc' ? 1 : -1;
-      return 0;
-    });
-    return sorted;
-  }, [filteredData, sortField, sortDirection]);
-
-  const paginatedData = useMemo(() => {
-    const startIndex = (currentPage - 1) * itemsPerPage;
-    return sortedData.slice(startIndex, startIndex + itemsPerPage);
-  }, [sortedData, currentPage, itemsPerPage]);
-
-  const totalPages = Math.ceil(sortedData.length / itemsPerPage);
+  // Full content/url by id, fetched for the visible page only
+  const [details, setDetails] = useState({});
+
+  const totalPages = Math.max(1, Math.ceil(totalCount / itemsPerPage));
+
+  useEffect(() => {
+    const missing = rowData
+      .filter(row => row.content === undefined && !(row.id in details))
+      .map(row => row.id);
+    if (missing.length === 0) return;
+
+    let cancelled = false;
+    api.getItems(missing)
+      .then(({ data }) => {
+        if (cancelled) return;
+        setDetails(prev => {
+          const next = { ...prev };
+          missing.forEach(id => { next[id] = null; }); // Not found: don't ask again
+          data.forEach(item => { next[item.id] = { content: item.content, url: item.url }; });
+          return next;
+        });
+      })
+      .catch(err => console.error('Failed to load item details', err));
+    return () => { cancelled = true; };
+  }, [rowData, details]);
 
   const handleSort = (field) => {
     if (sortField === field) {
-      setSortDirection(sortDirection === 'asc' ? 'desc' : 'asc');
+      onSortChange(field, sortDirection === 'asc' ? 'desc' : 'asc');
     } else {
-      setSortField(field);
-      setSortDirection('asc');
+      onSortChange(field, 'asc');
     }
   };
 
@@ -90,13 +81,10 @@ function PostTable({ rowData }) {
           className="table-search"
           placeholder={`${t('search')}...`}
           value={searchTerm}
-          onChange={(e) => {
-            setSearchTerm(e.target.value);
-            setCurrentPage(1);
-          }}
+          onChange={(e) => onSearchChange && onSearchChange(e.target.value)}
         />
         <div className="table-info">
-          {t('showing')} {paginatedData.length} {t('of')} {sortedData.length} {t('items')}
+          {t('showing')} {rowData.length} {t('of')} {totalCount} {t('items')}
         </div>
       </div>
 
@@ -122,10 +110,12 @@ function PostTable({ rowData }) {
             </tr>
           </thead>
           <tbody>
-            {paginatedData.map((row, index) => {
+            {rowData.map((row, index) => {
               const rowKey = `${currentPage}-${index}`;
               const isExpanded = expandedRows.has(rowKey);
-              const contentIsLong = isContentLong(row.content);
+              const content = details[row.id]?.content ?? row.content ?? row.snippet ?? '';
+              const url = details[row.id]?.url ?? row.url;
+              const contentIsLong = isContentLong(content);
 
               return (
                 <tr key={rowKey}>
@@ -143,8 +133,8 @@ function PostTable({ rowData }) {
                   <td className="content-cell">
                     <div className={`content-text ${isExpanded ? 'expanded' : ''}`}>
                       {isExpanded || !contentIsLong
-                        ? row.content
-                        : `${row.content.substring(0, 100)}...`}
+                        ? content
+                        : `${content.substring(0, 100)}...`}
                     </div>
                     {contentIsLong && (
                       <button
@@ -156,9 +146,11 @@ function PostTable({ rowData }) {
                     )}
                   </td>
                   <td className="link-cell">
-                    <a href={row.url} target="_blank" rel="noopener noreferrer" className="view-link">
-                      View →
-                    </a>
+                    {url && (
+                      <a href={url} target="_blank" rel="noopener noreferrer" className="view-link">
+                        View →
+                      </a>
+                    )}
                   </td>
                 </tr>
               );
@@ -170,14 +162,14 @@ function PostTable({ rowData }) {
       {/* Pagination */}
       <div className="table-pagination">
         <button
-          onClick={() => setCurrentPage(1)}
+          onClick={() => onPageChange(1)}
           disabled={currentPage === 1}
           className="pagination-btn"
         >
           ««
         </button>
         <button
-          onClick={() => setCurrentPage(currentPage - 1)}
+          onClick={() => onPageChange(currentPage - 1)}
           disabled={currentPage === 1}
           className="pagination-btn"
         >
@@ -187,14 +179,14 @@ function PostTable({ rowData }) {
           {t('page')} {currentPage} {t('of')} {totalPages}
         </span>
         <button
-          onClick={() => setCurrentPage(currentPage + 1)}
+          onClick={() => onPageChange(currentPage + 1)}
           disabled={currentPage === totalPages}
           className="pagination-btn"
         >
           ›
         </button>
         <button
-          onClick={() => setCurrentPage(totalPages)}
+          onClick={() => onPageChange(totalPages)}
           disabled={currentPage === totalPages}
           className="pagination-btn"
         >
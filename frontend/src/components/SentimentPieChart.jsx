@@ -13,7 +13,8 @@ function SentimentPieChart({ data, onPlotClick }) {
   const { labels, values, colors } = useMemo(() => {
     const counts = { positive: 0, negative: 0, neutral: 0 };
     data.forEach(item => {
-      counts[item.sentiment_label]++;
+      // Downsampled rows stand for `weight` original rows
+      counts[item.sentiment_label] += item.weight ?? 1;
     });
     return {
       labels: [t('positive'), t('negative'), t('neutral')],
@@ -28,8 +28,10 @@ const SentimentScatterPlot = ({ data }) => {
             groups[label].x.push(item.sentiment_score);
             groups[label].y.push(item.score || 0); // Upvotes
             // Truncate content for hover text
-            const hoverText = item.content ? (item.content.substring(0, 50) + '...') : `r/${item.subreddit}`;
-            groups[label].text.push(`${hoverText} (r/${item.subreddit})`);
+            const text = item.content ?? item.snippet;
+            const hoverText = text ? (text.substring(0, 50) + '...') : `r/${item.subreddit}`;
+            const weightText = item.weight && item.weight > 1 ? ` ×${Math.round(item.weight)}` : '';
+            groups[label].text.push(`${hoverText} (r/${item.subreddit})${weightText}`);
         });
 
         return Object.values(groups);
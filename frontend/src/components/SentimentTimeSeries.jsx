@@ -18,17 +18,21 @@ function SentimentTimeSeries({ data, onPlotClick }) {
     data.forEach(item => {
       const hourBucket = new Date(item.created_utc).toISOString().substring(0, 13) + ":00:00";
       if (!grouped[hourBucket]) {
-        grouped[hourBucket] = { scores: [], count: 0 };
+        grouped[hourBucket] = { weightedSum: 0, count: 0 };
       }
-      grouped[hourBucket].scores.push(item.sentiment_score);
-      grouped[hourBucket].count++;
+      // Rows come from the stratified sample: each stands for `weight` rows drawn at random
+      // from its (subreddit, label) group, so the weighted hourly mean is unbiased. LTTB rows
+      // must not be used here; they are picked for being extreme.
+      const weight = item.weight ?? 1;
+      grouped[hourBucket].weightedSum += item.sentiment_score * weight;
+      grouped[hourBucket].count += weight;
     });
 
     const sortedHours = Object.keys(grouped).sort();
 
     return {
       xData: sortedHours,
-      yData: sortedHours.map(hour => grouped[hour].scores.reduce((a, b) => a + b, 0) / grouped[hour].count),
+      yData: sortedHours.map(hour => grouped[hour].weightedSum / grouped[hour].count),
       counts: sortedHours.map(hour => grouped[hour].count)
     };
   }, [data]);
@@ -73,8 +73,17 @@ function StatsBar({ subreddit, keywords, subreddits, refreshTrigger }) {
       <motion.div className="card stat-card glass-panel" variants={cardVariant}>
         <h3>{t('avgSentiment')}</h3>
         <p className="stat-value">{formatSentiment(stats.avg_sentiment, t)}</p>
-        <span className="stat-label">Average Sentiment</span>
+        <span className="stat-label">
+          {stats.sentiment_median != null ? `Median ${stats.sentiment_median.toFixed(2)} · P90 ${stats.sentiment_p90.toFixed(2)}` : 'Average Sentiment'}
+        </span>
       </motion.div>
+      {stats.unique_authors != null && (
+        <motion.div className="card stat-card glass-panel" variants={cardVariant}>
+          <h3>{t('uniqueAuthors')}</h3>
+          <p className="stat-value">~{stats.unique_authors}</p>
+          <span className="stat-label">Distinct Authors (approx.)</span>
+        </motion.div>
+      )}
       <motion.div className="card stat-card glass-panel" variants={cardVariant}>
         <h3>{t('mostCommon')} {t('positive')}</h3>
         <p className="stat-value" style={{ color: 'var(--success-color)' }}>
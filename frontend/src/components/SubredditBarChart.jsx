@@ -14,7 +14,8 @@ function SubredditBarChart({ data }) {
   const { topSubreddits, topCounts } = useMemo(() => {
     const counts = {};
     data.forEach(item => {
-      counts[item.subreddit] = (counts[item.subreddit] || 0) + 1;
+      // Downsampled rows stand for `weight` original rows
+      counts[item.subreddit] = (counts[item.subreddit] || 0) + (item.weight ?? 1);
     });
 
     const sortedSubreddits = Object.entries(counts)
@@ -23,7 +24,7 @@ function SubredditBarChart({ data }) {
 
     return {
       topSubreddits: sortedSubreddits.map(item => `r/${item[0]}`).reverse(),
-      topCounts: sortedSubreddits.map(item => item[1]).reverse(),
+      topCounts: sortedSubreddits.map(item => Math.round(item[1])).reverse(),
     };
   }, [data]);
 
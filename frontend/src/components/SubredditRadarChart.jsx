@@ -20,9 +20,11 @@ const SubredditRadarChart = ({ data }) => {
                     count: 0
                 };
             }
-            subStats[item.subreddit].sentimentSum += item.sentiment_score;
-            subStats[item.subreddit].scoreSum += item.score;
-            subStats[item.subreddit].count += 1;
+            // Downsampled rows stand for `weight` original rows
+            const weight = item.weight ?? 1;
+            subStats[item.subreddit].sentimentSum += item.sentiment_score * weight;
+            subStats[item.subreddit].scoreSum += item.score * weight;
+            subStats[item.subreddit].count += weight;
         });
 
         const subreddits = Object.keys(subStats);
@@ -24,6 +24,7 @@ export const translations = {
 
         // Stats
         totalPosts: 'Total Posts',
+        uniqueAuthors: 'Unique Authors',
         avgSentiment: 'Avg. Sentiment',
         mostCommon: 'Most Common',
 
@@ -95,6 +96,12 @@ export const translations = {
         hours24: 'Last 24 Hours',
         days7: 'Last 7 Days',
         days30: 'Last 30 Days',
+        compareGroups: 'Compare Groups',
+        group: 'Group',
+        positiveShare: 'Positive',
+        negativeShare: 'Negative',
+        avgScore: 'Avg. Score',
+        avgComments: 'Avg. Comments',
 
         // Common Chart Labels
         time: 'Time',
@@ -132,6 +139,7 @@ export const translations = {
 
         // Stats
         totalPosts: 'Viso Įrašų',
+        uniqueAuthors: 'Unikalūs Autoriai',
         avgSentiment: 'Vid. Nuotaika',
         mostCommon: 'Dažniausias',
 
@@ -203,6 +211,12 @@ export const translations = {
         hours24: 'Paskutinės 24 Valandos',
         days7: 'Paskutinės 7 Dienos',
         days30: 'Paskutinės 30 Dienų',
+        compareGroups: 'Palyginti Grupes',
+        group: 'Grupė',
+        positiveShare: 'Teigiami',
+        negativeShare: 'Neigiami',
+        avgScore: 'Vid. Įvertinimas',
+        avgComments: 'Vid. Komentarų',
 
         // Common Chart Labels
         time: 'Laikas',
@@ -1,6 +1,7 @@
 import React, { useState, useEffect } from 'react';
 import apiClient from '../api';
 import ComparisonPanel from '../components/ComparisonPanel';
+import GroupStatsTable from '../components/GroupStatsTable';
 import { useLanguage } from '../context/LanguageContext';
 import { useTranslation } from '../i18n/translations';
 import { motion } from 'framer-motion';
@@ -29,6 +30,11 @@ function ComparisonPage() {
     const [dataB, setDataB] = useState([]);
     const [loadingB, setLoadingB] = useState(false);
 
+    // Group comparison: every group's metrics from a single /groups/stats call
+    const [groupTime, setGroupTime] = useState('24');
+    const [groupStats, setGroupStats] = useState([]);
+    const [loadingGroups, setLoadingGroups] = useState(false);
+
     useEffect(() => {
         apiClient.getSubreddits()
             .then(res => setSubreddits(res.data))
@@ -59,6 +65,14 @@ function ComparisonPage() {
             .finally(() => setLoadingB(false));
     }, [subB, timeB]);
 
+    useEffect(() => {
+        setLoadingGroups(true);
+        apiClient.getGroupStats(groupTime)
+            .then(res => setGroupStats(res.data))
+            .catch(err => console.error("Error fetching group stats:", err))
+            .finally(() => setLoadingGroups(false));
+    }, [groupTime]);
+
     return (
         <motion.div
             className="comparison-page"
@@ -106,6 +120,22 @@ function ComparisonPage() {
                     </div>
                 </div>
             </div>
+
+            <div className="comparison-container glass-panel group-comparison">
+                <div className="controls">
+                    <h2>{t('compareGroups')}</h2>
+                    <select
+                        value={groupTime}
+                        onChange={(e) => setGroupTime(e.target.value)}
+                        className="panel-select"
+                    >
+                        <option value="24">{t('hours24')}</option>
+                        <option value="168">{t('days7')}</option>
+                        <option value="720">{t('days30')}</option>
+                    </select>
+                </div>
+                <GroupStatsTable stats={groupStats} loading={loadingGroups} />
+            </div>
         </motion.div>
     );
 }
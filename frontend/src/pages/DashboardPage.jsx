@@ -19,6 +19,10 @@ import { useTranslation } from '../i18n/translations';
 
 import './DashboardPage.css';
 
+// Cap on rows sent to the charts. The scatter sample is stratified by (subreddit, label)
+// and drawn server-side; each row's `weight` makes counts and means come out unbiased.
+const MAX_PLOT_POINTS = 5000;
+
 const containerVariant = {
   hidden: { opacity: 1 },
   visible: {
@@ -38,7 +42,7 @@ function DashboardPage() {
   const { language } = useLanguage();
   const t = useTranslation(language);
 
-  const [allData, setAllData] = useState([]);
+  const [scatterData, setScatterData] = useState([]);
   const [loading, setLoading] = useState(true);
   const [availableSubreddits, setAvailableSubreddits] = useState([]);
   const [availableGroups, setAvailableGroups] = useState({});
@@ -59,6 +63,7 @@ function DashboardPage() {
     if (!fetchInput) return;
     setIsFetching(true);
     apiClient.fetchSubreddit(fetchInput)
+      .then(response => apiClient.waitForJob(response.data.job_id))
       .then(() => {
         setFetchInput('');
         setRefreshTrigger(prev => prev + 1);
@@ -94,12 +99,12 @@ function DashboardPage() {
     setError(null);
 
     Promise.all([
-      apiClient.getData(selectedSubreddit, null, debouncedKeywords, subredditsToFetch),
       apiClient.getSubreddits(),
-      apiClient.getGroups()
+      apiClient.getGroups(),
+      apiClient.getData(selectedSubreddit, null, debouncedKeywords, subredditsToFetch, MAX_PLOT_POINTS, 'scatter')
     ])
-      .then(([dataResponse, subsResponse, groupsResponse]) => {
-        setAllData(dataResponse.data);
+      .then(([subsResponse, groupsResponse, scatterResponse]) => {
+        setScatterData(scatterResponse.data);
         setAvailableSubreddits(subsResponse.data);
         setAvailableGroups(groupsResponse.data);
         setLoading(false);
@@ -111,13 +116,11 @@ function DashboardPage() {
       });
   }, [selectedSubreddit, selectedGroup, debouncedKeywords, subredditsToFetch, refreshTrigger]); // Re-fetch when filters change
 
-  const dataForPlots = useMemo(() => {
-    let data = allData;
-    if (minScore) {
-      data = data.filter(item => item.score >= parseInt(minScore));
-    }
-    return data;
-  }, [allData, minScore]);
+  // Every chart gets server-downsampled rows; the aggregate charts weight them
+  const scatterForPlot = useMemo(() => {
+    if (!minScore) return scatterData;
+    return scatterData.filter(item => item.score >= parseInt(minScore));
+  }, [scatterData, minScore]);
 
   const clearAllFilters = () => {
     setSelectedSubreddit('');
@@ -244,7 +247,7 @@ function DashboardPage() {
           isOpen={!isTopChartsCollapsed}
           onToggle={() => setIsTopChartsCollapsed(!isTopChartsCollapsed)}
         >
-          <SentimentPieChart data={dataForPlots} />
+          <SentimentPieChart data={scatterForPlot} />
         </CollapsibleCard>
 
         <CollapsibleCard
@@ -253,21 +256,21 @@ function DashboardPage() {
           isOpen={!isTopChartsCollapsed}
           onToggle={() => setIsTopChartsCollapsed(!isTopChartsCollapsed)}
         >
-          <SentimentTimeSeries data={dataForPlots} />
+          <SentimentTimeSeries data={scatterForPlot} />
         </CollapsibleCard>
 
         {/* Row 2: Scatter & Radar (Now Sharing Row) */}
         <CollapsibleCard title="Sentiment vs Score" className="chart-card">
-          <SentimentScatterPlot data={dataForPlots} />
+          <SentimentScatterPlot data={scatterForPlot} />
         </CollapsibleCard>
 
         <CollapsibleCard title="Subreddit Comparison" className="chart-card">
-          <SubredditRadarChart data={dataForPlots} />
+          <SubredditRadarChart data={scatterForPlot} />
         </CollapsibleCard>
 
         {/* Row 3: Legacy Bar Chart */}
         <CollapsibleCard title="Sentiment by Subreddit" className="chart-card span-full">
-          <SubredditBarChart data={dataForPlots} />
+          <SubredditBarChart data={scatterForPlot} />
         </CollapsibleCard>
       </div>
 
@@ -8,37 +8,71 @@ import ErrorState from '../components/ErrorState';
 import { useLanguage } from '../context/LanguageContext';
 import { useTranslation } from '../i18n/translations';
 
+const PAGE_SIZE = 20;
 
 function TablePage() {
   const { language } = useLanguage();
   const t = useTranslation(language);
 
   const [rowData, setRowData] = useState([]);
+  const [totalCount, setTotalCount] = useState(0);
   const [loading, setLoading] = useState(true);
 
   const [error, setError] = useState(null);
 
+  // Paging, sorting and search all run on the server; only one page of rows is loaded
+  const [currentPage, setCurrentPage] = useState(1);
+  const [sort, setSort] = useState({ field: 'created_utc', direction: 'desc' });
+
+  // Search runs on the server, against the full text; rows only carry a snippet
+  const [searchTerm, setSearchTerm] = useState('');
+  const [debouncedSearch, setDebouncedSearch] = useState('');
+
   useEffect(() => {
+    const timer = setTimeout(() => {
+      setDebouncedSearch(searchTerm.trim());
+      setCurrentPage(1);
+    }, 400);
+    return () => clearTimeout(timer);
+  }, [searchTerm]);
+
+  useEffect(() => {
+    let cancelled = false;
     setLoading(true);
     setError(null);
 
-    apiClient.getData()
+    apiClient.getData(null, null, null, null, null, null, {
+      q: debouncedSearch,
+      limit: PAGE_SIZE,
+      offset: (currentPage - 1) * PAGE_SIZE,
+      sort: `${sort.direction === 'desc' ? '-' : ''}${sort.field}`
+    })
       .then(response => {
+        if (cancelled) return;
         setRowData(response.data);
+        setTotalCount(parseInt(response.headers['x-total-count'] ?? response.data.length, 10));
         setLoading(false);
       })
       .catch(error => {
+        if (cancelled) return;
         console.error("Error fetching data:", error);
         setError(error.message);
         setLoading(false);
       });
-  }, []);
+    return () => { cancelled = true; };
+  }, [debouncedSearch, currentPage, sort]);
+
+  const handleSortChange = (field, direction) => {
+    setSort({ field, direction });
+    setCurrentPage(1);
+  };
 
-  if (loading) return <LoadingSpinner />;
+  // Keep the table (and its search box) mounted while a page or search is in flight
+  if (loading && totalCount === 0 && !debouncedSearch) return <LoadingSpinner />;
 
   if (error) return <ErrorState message={error} />;
 
-  if (rowData.length === 0) {
+  if (totalCount === 0 && !debouncedSearch) {
     return (
       <div>
         <h1>{t('fullDataTable')}</h1>
@@ -50,9 +84,20 @@ function TablePage() {
   return (
     <div>
       <h1>{t('fullDataTable')}</h1>
-      <p>{t('showingAllItems')} {rowData.length} {t('fromLast7Days')}</p>
+      <p>{t('showingAllItems')} {totalCount} {t('fromLast7Days')}</p>
       <div className="card">
-        <PostTable rowData={rowData} />
+        <PostTable
+          rowData={rowData}
+          totalCount={totalCount}
+          currentPage={currentPage}
+          itemsPerPage={PAGE_SIZE}
+          onPageChange={setCurrentPage}
+          sortField={sort.field}
+          sortDirection={sort.direction}
+          onSortChange={handleSortChange}
+          searchTerm={searchTerm}
+          onSearchChange={setSearchTerm}
+        />
       </div>
     </div>
   );
@@ -0,0 +1,27 @@
+"""
+Gunicorn Configuration (production API)
+
+    gunicorn -c gunicorn.conf.py run_api:app
+
+Uses the eventlet worker so Socket.IO and long requests are served by
+greenlets; database calls run on a tpool of DB_POOL_SIZE OS threads per
+worker (see DatabaseManager), so the hub is never blocked by MySQL.
+
+With more than one worker, Socket.IO clients must connect with the websocket
+transport only (SOCKETIO_TRANSPORTS=websocket, the default here), or sit
+behind a load balancer with sticky sessions: long-polling requests of one
+session have to reach the same worker. Events cross workers through the
+Redis message queue.
+"""
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.getenv('WEB_CONCURRENCY', 4))
+worker_class = 'eventlet'
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', 1000))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 120))
+graceful_timeout = 30
+keepalive = 5
+
+if workers > 1:
+    os.environ.setdefault('SOCKETIO_TRANSPORTS', 'websocket')
@@ -7,7 +7,13 @@ eventlet.monkey_patch()
 
 import argparse
 import sys
+import json
+import redis
+from app import config
 from app.data_collection.collector import RedditCollector
+from app.data_collection.coordinator import WorkCoordinator, CollectorWorker
+from app.data_collection.replay import record_stream, ReplayRunner, SinkDatabaseManager, NullEmitter
+from app.utils.memory_redis import InMemoryRedis
 from app.database.db_manager import db_manager
 from app.nlp.analyzer import analyzer
 
@@ -65,13 +71,129 @@ def main():
         default=50,
         help="Number of items to batch per poll cycle (default: 50)."
     )
+    poll_parser.add_argument(
+        '--shard_size',
+        type=int,
+        default=5,
+        help="Keywords per search query; shards are polled concurrently (default: 5)."
+    )
+
+    refresh_parser = subparsers.add_parser('refresh', help="Refresh score/num_comments of recent items.")
+    refresh_parser.add_argument(
+        '-i', '--interval',
+        type=int,
+        default=300,
+        help="Time (in seconds) between refresh cycles (default: 300s)."
+    )
+    refresh_parser.add_argument(
+        '-l', '--limit',
+        type=int,
+        default=1000,
+        help="Max items to refresh per age tier per cycle (default: 1000)."
+    )
+
+    worker_parser = subparsers.add_parser('worker', help="Share a task list with other workers via Redis leases.")
+    worker_parser.add_argument(
+        '-t', '--tasks',
+        nargs='+',
+        required=True,
+        help="Task specs, e.g. 'stream:python:comment' 'poll:tesla,ai@all' 'refresh'."
+    )
+    worker_parser.add_argument(
+        '--redis',
+        type=str,
+        default=None,
+        help="Redis URL for coordination (default: REDIS_URL); 'memory://' runs a local in-memory stand-in."
+    )
+    worker_parser.add_argument(
+        '--lease_ttl',
+        type=int,
+        default=30,
+        help="Seconds a task lease survives without renewal (default: 30s)."
+    )
     
+    record_parser = subparsers.add_parser('record', help="Record raw stream items to a gzip NDJSON file for replay.")
+    record_parser.add_argument(
+        '-s', '--subreddit',
+        type=str,
+        required=True,
+        help="The name of the subreddit to record."
+    )
+    record_parser.add_argument(
+        '-t', '--type',
+        type=str,
+        choices=['comment', 'post'],
+        default='comment',
+        help="The type of item to record: 'comment' (default) or 'post'."
+    )
+    record_parser.add_argument(
+        '-o', '--output',
+        type=str,
+        required=True,
+        help="Recording file to write (e.g. 'recordings/python.ndjson.gz')."
+    )
+    record_parser.add_argument(
+        '-n', '--limit',
+        type=int,
+        default=None,
+        help="Stop after this many items."
+    )
+    record_parser.add_argument(
+        '-d', '--duration',
+        type=float,
+        default=None,
+        help="Stop after this many seconds."
+    )
+
+    replay_parser = subparsers.add_parser('replay', help="Feed a recording through the pipeline and report throughput/latency.")
+    replay_parser.add_argument(
+        '-i', '--input',
+        type=str,
+        required=True,
+        help="Recording file produced by 'record'."
+    )
+    replay_parser.add_argument(
+        '--speed',
+        type=float,
+        default=1.0,
+        help="Replay speed: 1 = recorded pace (default), N = N times faster, 0 = as fast as possible."
+    )
+    replay_parser.add_argument(
+        '-b', '--batch_size',
+        type=int,
+        default=50,
+        help="Number of items to batch before inserting into DB (default: 50)."
+    )
+    replay_parser.add_argument(
+        '--unique_ids',
+        action='store_true',
+        help="Suffix item ids per run so repeated replays insert new rows."
+    )
+    replay_parser.add_argument(
+        '--shift_time',
+        action='store_true',
+        help="Shift created_utc so the recording ends at the current time."
+    )
+    replay_parser.add_argument(
+        '--write_db',
+        action='store_true',
+        help="Write replayed items to the configured database and emit Socket.IO events "
+             "(default: discard them so dashboards and stored data stay untouched)."
+    )
+
     args = parser.parse_args()
 
     try:
         print("Initializing Collector Service...")
         # Dependency Injection
-        collector = RedditCollector(db_manager, analyzer)
+        if args.command == 'replay':
+            # Replays never talk to Reddit, so no credentials or network are needed
+            if args.write_db:
+                collector = RedditCollector(db_manager, analyzer, connect=False)
+            else:
+                collector = RedditCollector(SinkDatabaseManager(), analyzer, emitter=NullEmitter(), connect=False)
+        else:
+            collector = RedditCollector(db_manager, analyzer)
         print("Collector Service initialized.")
 
         if args.command == 'stream':
@@ -88,8 +210,40 @@ def main():
                 keywords=args.keywords,
                 subreddits=args.subreddits,
                 poll_interval=args.interval,
-                batch_size=args.batch_size
+                batch_size=args.batch_size,
+                shard_size=args.shard_size
             )
+
+        elif args.command == 'refresh':
+            print(f"Starting 'refresh' mode...")
+            collector.refresh_engagement(
+                interval=args.interval,
+                limit_per_tier=args.limit
+            )
+
+
+        elif args.command == 'worker':
+            redis_url = args.redis or config.REDIS_URL
+            if redis_url.startswith('memory://'):
+                redis_client = InMemoryRedis()
+            else:
+                redis_client = redis.Redis.from_url(redis_url, decode_responses=True)
+            coordinator = WorkCoordinator(redis_client, lease_ttl=args.lease_ttl)
+            print(f"Starting 'worker' mode as {coordinator.worker_id}...")
+            CollectorWorker(collector, coordinator, args.tasks).run()
+
+        elif args.command == 'record':
+            print(f"Recording r/{args.subreddit} {args.type}s to {args.output}...")
+            count = record_stream(collector, args.subreddit, args.type, args.output,
+                                  limit=args.limit, duration=args.duration)
+            print(f"Recorded {count} items.")
+
+        elif args.command == 'replay':
+            target = "the database" if args.write_db else "a discarding sink"
+            print(f"Replaying {args.input} at speed {args.speed or 'max'} into {target}...")
+            runner = ReplayRunner(collector, speed=args.speed, batch_size=args.batch_size,
+                                  unique_ids=args.unique_ids, shift_time=args.shift_time)
+            print(json.dumps(runner.run(args.input), indent=2))
             
     except KeyboardInterrupt:
         print("\nCollector stopped by user. Exiting.")
@@ -7,6 +7,7 @@ from mysql.connector import Error
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from app import config
+from app.database import migrations
 
 def create_database_and_tables():
 
@@ -38,8 +39,12 @@ def create_database_and_tables():
                     print(f"Failed to execute statement: {statement.strip()}\nError: {e}")
 
         print("Database tables and indexes created successfully.")
+
+        # Records the schema version; migrations skip anything schema.sql already created
+        applied = migrations.migrate(conn)
+        print(f"Schema migrations recorded: {applied}")
         
-    except Error as e:
+    except (Error, migrations.MigrationError) as e:
         print(f"Error connecting to MySQL or setting up database: {e}")
     finally:
         if 'conn' in locals() and conn.is_connected():
@@ -0,0 +1,57 @@
+import sys
+import os
+import argparse
+import mysql.connector
+from mysql.connector import Error
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import config
+from app.database import migrations
+
+def connect():
+    return mysql.connector.connect(
+        host=config.DB_HOST,
+        port=config.DB_PORT,
+        user=config.DB_USER,
+        password=config.DB_PASSWORD,
+        database=config.DB_NAME
+    )
+
+def show_status(conn):
+    with conn.cursor() as cursor:
+        version = migrations.current_version(cursor)
+        print(f"Schema version: {version} (latest: {migrations.LATEST_VERSION})")
+        for migration in migrations.pending(cursor):
+            print(f"  pending {migration.version}: {migration.description}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply versioned schema migrations")
+    parser.add_argument('--status', action='store_true', help="Show the current version and pending migrations")
+    parser.add_argument('--to', type=int, default=None, help="Migrate up to this version (default: latest)")
+    parser.add_argument('--lock-timeout', type=int, default=60,
+                        help="Seconds to wait for another running migration to finish")
+    parser.add_argument('--lock-wait-timeout', type=int, default=10,
+                        help="Seconds a DDL statement may wait for a table's metadata lock before retrying")
+    args = parser.parse_args()
+
+    conn = None
+    try:
+        conn = connect()
+        if args.status:
+            show_status(conn)
+            return 0
+
+        applied = migrations.migrate(conn, target=args.to, lock_timeout=args.lock_timeout,
+                                     lock_wait_timeout=args.lock_wait_timeout)
+        print(f"Applied migrations: {applied}" if applied else "Schema is up to date.")
+        return 0
+    except (Error, migrations.MigrationError) as e:
+        print(f"Migration failed: {e}")
+        return 1
+    finally:
+        if conn and conn.is_connected():
+            conn.close()
+
+if __name__ == "__main__":
+    sys.exit(main())
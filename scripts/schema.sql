@@ -1,3 +1,5 @@
+-- Current schema for new databases. Changes to existing ones go through
+-- app/database/migrations.py (python scripts/migrate.py).
 CREATE DATABASE IF NOT EXISTS reddit_sentiment_db;
 
 USE reddit_sentiment_db;
@@ -7,16 +9,81 @@ CREATE TABLE IF NOT EXISTS reddit_data (
     item_type ENUM('post', 'comment') NOT NULL,
     subreddit VARCHAR(100) NOT NULL,
     author VARCHAR(100),
-    content TEXT NOT NULL,
-    url VARCHAR(1024),
+    snippet VARCHAR(200) DEFAULT NULL,
     created_utc DATETIME NOT NULL,
     sentiment_label ENUM('positive', 'negative', 'neutral') NOT NULL,
     sentiment_score FLOAT NOT NULL,
+    sentiment_policy VARCHAR(64) DEFAULT NULL,
     score INT DEFAULT 0,
     num_comments INT DEFAULT 0,
+    duplicate_of VARCHAR(20) DEFAULT NULL,
     processed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
-CREATE INDEX idx_subreddit ON reddit_data (subreddit);
-CREATE INDEX idx_created_utc ON reddit_data (created_utc);
-CREATE INDEX idx_sentiment_label ON reddit_data (sentiment_label);
\ No newline at end of file
+CREATE INDEX idx_subreddit_created ON reddit_data (subreddit, created_utc);
+CREATE INDEX idx_created_id ON reddit_data (created_utc, id);
+CREATE INDEX idx_sentiment_label ON reddit_data (sentiment_label);
+
+-- Full text, fetched per item; kept out of reddit_data so analytic scans stay narrow
+CREATE TABLE IF NOT EXISTS reddit_content (
+    id VARCHAR(20) PRIMARY KEY,
+    content TEXT NOT NULL,
+    url VARCHAR(1024)
+);
+
+-- Every word of each item's text, plus the keywords the poller matched
+CREATE TABLE IF NOT EXISTS reddit_keywords (
+    keyword VARCHAR(100) NOT NULL,
+    item_id VARCHAR(20) NOT NULL,
+    PRIMARY KEY (keyword, item_id),
+    INDEX idx_item_id (item_id)
+);
+
+CREATE TABLE IF NOT EXISTS subreddits (
+    name VARCHAR(100) PRIMARY KEY,
+    item_count INT NOT NULL DEFAULT 0,
+    avg_sentiment DOUBLE NOT NULL DEFAULT 0,
+    first_seen DATETIME,
+    last_seen DATETIME,
+    INDEX idx_item_count (item_count)
+);
+
+CREATE TABLE IF NOT EXISTS sentiment_alerts (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    subreddit VARCHAR(100) NOT NULL,
+    kind VARCHAR(16) NOT NULL,
+    z_score DOUBLE NOT NULL,
+    value DOUBLE NOT NULL,
+    baseline DOUBLE NOT NULL,
+    items INT NOT NULL,
+    window_start DATETIME NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_alert_created (created_at),
+    INDEX idx_alert_subreddit (subreddit, created_at)
+);
+
+CREATE TABLE IF NOT EXISTS analytics_sketches (
+    kind VARCHAR(32) NOT NULL,
+    subreddit VARCHAR(100) NOT NULL,
+    bucket_start DATETIME NOT NULL,
+    source VARCHAR(64) NOT NULL,
+    payload MEDIUMBLOB NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (kind, subreddit, bucket_start, source),
+    INDEX idx_sketch_bucket (kind, bucket_start)
+);
+
+CREATE TABLE IF NOT EXISTS subreddit_groups (
+    group_name VARCHAR(64) NOT NULL,
+    subreddit VARCHAR(100) NOT NULL,
+    PRIMARY KEY (group_name, subreddit),
+    INDEX idx_group_subreddit (subreddit)
+);
+
+INSERT IGNORE INTO subreddit_groups (group_name, subreddit) VALUES
+    ('Tech', 'technology'), ('Tech', 'programming'), ('Tech', 'hardware'), ('Tech', 'software'), ('Tech', 'gadgets'),
+    ('News', 'news'), ('News', 'worldnews'), ('News', 'politics'), ('News', 'science'),
+    ('Crypto', 'bitcoin'), ('Crypto', 'cryptocurrency'), ('Crypto', 'ethereum'), ('Crypto', 'dogecoin'),
+    ('Finance', 'finance'), ('Finance', 'investing'), ('Finance', 'wallstreetbets'), ('Finance', 'stocks'),
+    ('Entertainment', 'movies'), ('Entertainment', 'music'), ('Entertainment', 'gaming'),
+    ('Entertainment', 'books'), ('Entertainment', 'television');
@@ -0,0 +1,73 @@
+import random
+import unittest
+from app.models import RedditItem, utc_datetime
+from app.analytics.anomaly import AnomalyDetector
+
+def _items(subreddit, scores, created):
+    created_utc = utc_datetime(created)
+    return [RedditItem(id=f"{subreddit}{i}", item_type='comment', subreddit=subreddit, author='a',
+                       content='', url='', created_utc=created_utc, sentiment_score=score)
+            for i, score in enumerate(scores)]
+
+class TestAnomalyDetector(unittest.TestCase):
+    def setUp(self):
+        self.now = 1_704_067_200.0
+        self.detector = AnomalyDetector(alpha=0.05, volume_alpha=0.1, z_threshold=4.0, bucket_seconds=60,
+                                        warmup_buckets=5, min_items=5, cooldown_seconds=600,
+                                        allowed_lateness=0, clock=lambda: self.now)
+        rng = random.Random(7)
+        # Ten quiet minutes: ~20 mildly positive items per bucket
+        for _ in range(10):
+            alerts = self.detector.observe(_items('python', [rng.uniform(0.0, 0.4) for _ in range(20)], self.now))
+            self.assertEqual(alerts, [])
+            self.now += 60
+
+    def test_sentiment_swing_alerts(self):
+        self.detector.observe(_items('python', [-0.8] * 20, self.now))
+        self.now += 60
+        alerts = self.detector.observe([])
+        self.assertEqual([a.kind for a in alerts], ['sentiment'])
+        self.assertLess(alerts[0].z_score, -4.0)
+        self.assertEqual(alerts[0].items, 20)
+        # window_start is the bucket the items' created_utc fell in, both naive UTC
+        self.assertEqual(alerts[0].window_start, utc_datetime(self.now - 60))
+
+        # Cooldown suppresses a repeat for the same subreddit and kind
+        self.detector.observe(_items('python', [-0.8] * 20, self.now))
+        self.now += 60
+        self.assertEqual(self.detector.observe([]), [])
+
+    def test_volume_burst_alerts(self):
+        self.detector.observe(_items('python', [0.2] * 200, self.now))
+        self.now += 60
+        alerts = self.detector.observe([])
+        self.assertIn('volume', [a.kind for a in alerts])
+
+    def test_buckets_by_created_time(self):
+        # A backlog of old items flushed in one go must not look like a burst now
+        self.now += 600
+        backlog = [item for minute in range(10)
+                   for item in _items('python', [0.2] * 20, self.now - 600 + minute * 60)]
+        self.assertEqual(self.detector.observe(backlog), [])
+        self.now += 60
+        self.assertEqual(self.detector.observe([]), [])
+
+    def test_late_items_do_not_reopen_closed_buckets(self):
+        self.now += 60
+        self.detector.observe([])
+        state = self.detector.states['python']
+        bucket_start, volume_mean = state.bucket_start, state.volume_mean
+        self.detector.observe(_items('python', [-0.8] * 200, self.now - 300))
+        self.assertEqual((state.bucket_start, state.count), (bucket_start, 0))
+        self.assertEqual(state.volume_mean, volume_mean)
+        self.assertLess(state.score_mean, 0.0)
+
+    def test_idle_subreddits_expire(self):
+        self.detector.observe(_items('golang', [0.1] * 5, self.now))
+        self.now += 101 * 60
+        self.detector.observe(_items('golang', [0.1] * 5, self.now))
+        self.assertNotIn('python', self.detector.states)
+        self.assertIn('golang', self.detector.states)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,7 @@
 import unittest
 import json
+import gzip
+import datetime
 from unittest.mock import patch, MagicMock
 from app import create_app
 
@@ -26,7 +28,76 @@ class TestAPI(unittest.TestCase):
         data = json.loads(response.data)
         self.assertEqual(len(data), 1)
         self.assertEqual(data[0]['subreddit'], 'python')
+
+        self.client.get('/api/data?q=rate%20hike')
+        self.assertEqual(mock_query_sentiment_data.call_args.kwargs['search'], 'rate hike')
         
+    @patch('app.database.db_manager.DatabaseManager.sample_sentiment_data')
+    @patch('app.database.db_manager.DatabaseManager.query_sentiment_data')
+    def test_get_data_max_points(self, mock_query_sentiment_data, mock_sample_sentiment_data):
+        base = datetime.datetime(2024, 1, 1)
+        mock_query_sentiment_data.return_value = [
+            {'id': str(i), 'subreddit': 'python' if i % 4 else 'news',
+             'sentiment_label': 'positive', 'sentiment_score': (i % 7) / 7,
+             'created_utc': base + datetime.timedelta(minutes=i)}
+            for i in range(1000)
+        ]
+
+        response = self.client.get('/api/data?max_points=50&downsample=timeseries')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['X-Total-Count'], '1000')
+        data = json.loads(response.data)
+        self.assertEqual(len(data), 50)
+        self.assertAlmostEqual(sum(item['weight'] for item in data), 1000)
+
+        # Scatter samples are drawn by the database; the full rows are never fetched
+        mock_query_sentiment_data.reset_mock()
+        mock_sample_sentiment_data.return_value = ([{'id': '1', 'weight': 20.0}], 20)
+        response = self.client.get('/api/data?max_points=50&downsample=scatter&subreddit=python')
+        self.assertEqual(response.headers['X-Total-Count'], '20')
+        self.assertEqual(json.loads(response.data), [{'id': '1', 'weight': 20.0}])
+        mock_query_sentiment_data.assert_not_called()
+        self.assertEqual(mock_sample_sentiment_data.call_args.args, (50,))
+        self.assertEqual(mock_sample_sentiment_data.call_args.kwargs['subreddit'], 'python')
+
+    @patch('app.database.db_manager.DatabaseManager.count_sentiment_data')
+    @patch('app.database.db_manager.DatabaseManager.query_sentiment_data')
+    def test_get_data_page(self, mock_query_sentiment_data, mock_count_sentiment_data):
+        mock_query_sentiment_data.return_value = [{'id': '3'}, {'id': '4'}]
+        mock_count_sentiment_data.return_value = 123
+        response = self.client.get('/api/data?limit=2&offset=2&sort=sentiment_score&q=fed')
+        self.assertEqual(response.headers['X-Total-Count'], '123')
+        kwargs = mock_query_sentiment_data.call_args.kwargs
+        self.assertEqual((kwargs['limit'], kwargs['offset'], kwargs['sort'], kwargs['descending']),
+                         (2, 2, 'sentiment_score', False))
+        self.assertEqual(mock_count_sentiment_data.call_args.kwargs['search'], 'fed')
+
+        self.assertEqual(self.client.get('/api/data?limit=ten').status_code, 400)
+
+    @patch('app.database.db_manager.DatabaseManager.query_sentiment_data')
+    def test_get_data_compressed(self, mock_query_sentiment_data):
+        base = datetime.datetime(2024, 1, 1, 12, 30)
+        mock_query_sentiment_data.return_value = [
+            {'id': str(i), 'subreddit': 'python', 'content': 'the same words again and again',
+             'created_utc': base + datetime.timedelta(seconds=i)}
+            for i in range(5000)
+        ]
+
+        response = self.client.get('/api/data', headers={'Accept-Encoding': 'gzip;q=0.8, identity'})
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response.headers['Vary'])
+        raw = gzip.decompress(response.data)
+        self.assertLess(len(response.data) * 5, len(raw))
+        data = json.loads(raw)
+        self.assertEqual(len(data), 5000)
+        self.assertEqual(data[1]['created_utc'], '2024-01-01T12:30:01')
+
+        # Small bodies and clients without gzip get plain JSON
+        mock_query_sentiment_data.return_value = mock_query_sentiment_data.return_value[:2]
+        response = self.client.get('/api/data', headers={'Accept-Encoding': 'gzip'})
+        self.assertNotIn('Content-Encoding', response.headers)
+        self.assertEqual(len(json.loads(response.data)), 2)
+
     @patch('app.database.db_manager.DatabaseManager.get_kpi_stats')
     def test_get_stats(self, mock_get_kpi_stats):
         mock_get_kpi_stats.return_value = {
@@ -46,7 +117,8 @@ class TestAPI(unittest.TestCase):
             subreddit='test',
             subreddits=None,
             keywords=None,
-            timeframe_hours=48
+            timeframe_hours=48,
+            exclude_duplicates=False
         )
 
     @patch('app.database.db_manager.DatabaseManager.get_distinct_subreddits')
@@ -58,5 +130,76 @@ class TestAPI(unittest.TestCase):
         self.assertIn('python', data)
         self.assertIn('news', data)
 
+        self.client.get('/api/subreddits?q=py&sort=activity&limit=10')
+        mock_get_subreddits.assert_called_with(prefix='py', sort='activity', limit=10)
+
+    @patch('app.database.db_manager.DatabaseManager.get_items')
+    def test_get_items(self, mock_get_items):
+        mock_get_items.return_value = [{'id': 'a1', 'content': 'full text', 'url': 'https://www.reddit.com/r/x'}]
+        response = self.client.get('/api/items/a1')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.data)['content'], 'full text')
+        mock_get_items.assert_called_with(['a1'])
+
+        response = self.client.get('/api/items?ids=a1,b2,a1')
+        self.assertEqual(len(json.loads(response.data)), 1)
+        mock_get_items.assert_called_with(['a1', 'b2'])
+
+        mock_get_items.return_value = []
+        self.assertEqual(self.client.get('/api/items/zz').status_code, 404)
+        self.assertEqual(self.client.get('/api/items').status_code, 400)
+
+    @patch('app.database.db_manager.DatabaseManager._blocking')
+    @patch('app.database.db_manager.DatabaseManager.get_sketches')
+    def test_get_trending_merges_off_the_hub(self, mock_get_sketches, mock_blocking):
+        from app.analytics import trending
+        mock_get_sketches.return_value = {trending.SKETCH_KIND: [b'payload']}
+        mock_blocking.return_value = [{'term': 'rust', 'count': 3, 'avg_sentiment': 0.1}]
+
+        response = self.client.get('/api/trending?subreddit=python&hours=48&limit=5')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.data)[0]['term'], 'rust')
+        mock_blocking.assert_called_once_with(trending.top_terms, [b'payload'], limit=5)
+
+    @patch('app.database.db_manager.DatabaseManager.get_group_stats')
+    def test_get_group_stats(self, mock_get_group_stats):
+        mock_get_group_stats.return_value = [{'group_name': 'Tech', 'total_posts': 3, 'avg_sentiment': 0.2}]
+        response = self.client.get('/api/groups/stats?groups=Tech,News&timeframe=48')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.data)[0]['group_name'], 'Tech')
+        mock_get_group_stats.assert_called_with(groups=['Tech', 'News'], timeframe_hours=48,
+                                                exclude_duplicates=False)
+
+    @patch('app.database.db_manager.DatabaseManager.save_group')
+    def test_save_group(self, mock_save_group):
+        mock_save_group.return_value = True
+        response = self.client.put('/api/groups/Rust', json={'subreddits': ['rust', ' Golang ']})
+        self.assertEqual(response.status_code, 200)
+        mock_save_group.assert_called_with('Rust', ['rust', 'Golang'])
+
+        response = self.client.put('/api/groups/Rust', json={'subreddits': []})
+        self.assertEqual(response.status_code, 400)
+
+        mock_save_group.return_value = False
+        response = self.client.put('/api/groups/Rust', json={'subreddits': ['rust']})
+        self.assertEqual(response.status_code, 500)
+
+    @patch('app.database.db_manager.DatabaseManager.iter_sentiment_data')
+    def test_export_ndjson_gzip(self, mock_iter):
+        mock_iter.return_value = iter([
+            [{'id': '1', 'subreddit': 'python', 'sentiment_score': 0.8}],
+            [{'id': '2', 'subreddit': 'news', 'sentiment_score': -0.2}]
+        ])
+        response = self.client.get('/api/export?format=ndjson&subreddit=python',
+                                   headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        lines = gzip.decompress(response.data).decode().splitlines()
+        self.assertEqual([json.loads(line)['id'] for line in lines], ['1', '2'])
+
+    def test_export_rejects_unknown_format(self):
+        response = self.client.get('/api/export?format=xlsx')
+        self.assertEqual(response.status_code, 400)
+
 if __name__ == '__main__':
     unittest.main()
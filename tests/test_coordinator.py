@@ -0,0 +1,54 @@
+import unittest
+from app.data_collection.coordinator import WorkCoordinator, parse_task
+from app.utils.memory_redis import InMemoryRedis
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+class TestWorkCoordinator(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.redis = InMemoryRedis(clock=self.clock)
+        self.tasks = ['stream:python', 'stream:news', 'poll:tesla,ai', 'refresh']
+
+    def _worker(self, name):
+        return WorkCoordinator(self.redis, worker_id=name, lease_ttl=30, clock=self.clock)
+
+    def test_parse_task(self):
+        self.assertEqual(parse_task('stream:python'), ('stream', {'subreddit_name': 'python', 'item_type': 'comment'}))
+        self.assertEqual(parse_task('poll:tesla,ai@news+tech'),
+                         ('poll', {'keywords': ['tesla', 'ai'], 'subreddits': ['news', 'tech']}))
+        with self.assertRaises(ValueError):
+            parse_task('scrape:everything')
+
+    def test_rebalance_on_join_and_leave(self):
+        a, b = self._worker('a'), self._worker('b')
+        self.assertEqual(len(a.rebalance(self.tasks)), 4)
+
+        # b joins: a sheds down to its fair share, b picks up what was released
+        b.heartbeat()
+        owned_a = a.rebalance(self.tasks)
+        owned_b = b.rebalance(self.tasks)
+        self.assertEqual(len(owned_a), 2)
+        self.assertEqual(len(owned_b), 2)
+        self.assertFalse(set(owned_a) & set(owned_b))
+
+        # a stops heartbeating; once its leases expire b takes everything
+        self.clock.now += 31
+        self.assertEqual(sorted(b.rebalance(self.tasks)), sorted(self.tasks))
+
+    def test_checkpoint_survives_handoff(self):
+        a, b = self._worker('a'), self._worker('b')
+        a.rebalance(self.tasks)
+        a.checkpoint('stream:python').save(['x1', 'x2'])
+        a.leave(self.tasks)
+
+        self.assertIn('stream:python', b.rebalance(self.tasks))
+        self.assertEqual(b.checkpoint('stream:python').load(), ['x1', 'x2'])
+
+if __name__ == '__main__':
+    unittest.main()
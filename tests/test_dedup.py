@@ -0,0 +1,42 @@
+import unittest
+from app.analytics.dedup import NearDuplicateIndex
+
+COPYPASTA = ("Congratulations! You have been selected for our exclusive giveaway. Send a message "
+             "to our support team today to claim your free tokens before the offer expires")
+
+class TestNearDuplicateIndex(unittest.TestCase):
+    def setUp(self):
+        self.now = 0.0
+        self.index = NearDuplicateIndex(threshold=0.7, ttl_seconds=100, max_items=3, min_tokens=8,
+                                        clock=lambda: self.now)
+
+    def test_near_duplicate_reuses_sentiment(self):
+        sentiment = {'label': 'negative', 'score': -0.4, 'policy': 'full'}
+        self.index.add('a1', self.index.signature(COPYPASTA), sentiment)
+
+        variant = COPYPASTA.replace("expires", "expires!!") + " lol"
+        match = self.index.lookup(self.index.signature(variant))
+        self.assertIsNotNone(match)
+        self.assertEqual(match.id, 'a1')
+        self.assertEqual(match.sentiment, sentiment)
+
+        # The item itself is not its own duplicate, and unrelated text does not match
+        self.assertIsNone(self.index.lookup(self.index.signature(COPYPASTA), exclude_id='a1'))
+        other = "The new release of the compiler finally fixes the incremental build cache regression"
+        self.assertIsNone(self.index.lookup(self.index.signature(other)))
+
+    def test_short_texts_are_ignored(self):
+        self.assertIsNone(self.index.signature("thanks, this"))
+
+    def test_eviction(self):
+        self.index.add('a1', self.index.signature(COPYPASTA), {})
+        self.now = 150.0
+        self.assertIsNone(self.index.lookup(self.index.signature(COPYPASTA)))
+        self.assertEqual(self.index.band_index, {})
+
+        for i in range(5):
+            self.index.add(f"b{i}", self.index.signature(f"{COPYPASTA} variant number {i} " * (i + 1)), {})
+        self.assertEqual(list(self.index.entries), ['b2', 'b3', 'b4'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+import json
+import datetime
+import unittest
+from unittest.mock import MagicMock
+from app.database.hot_window import HotWindow
+
+def _row(item_id, subreddit, hours_ago, score, duplicate_of=None):
+    return {
+        'id': item_id, 'item_type': 'post', 'subreddit': subreddit,
+        'created_utc': datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None) - datetime.timedelta(hours=hours_ago),
+        'sentiment_label': 'positive' if score > 0 else 'negative', 'sentiment_score': score,
+        'score': 1, 'num_comments': 0, 'duplicate_of': duplicate_of, 'content': item_id * 300, 'url': ''
+    }
+
+class TestHotWindow(unittest.TestCase):
+    def setUp(self):
+        self.window = HotWindow(max_hours=48, max_items=100, initial_capacity=2)
+        db = MagicMock()
+        db.iter_sentiment_data.return_value = iter([[
+            _row('a', 'python', 1, 0.5),
+            _row('b', 'python', 5, 0.3, duplicate_of='a'),
+            _row('c', 'rust', 2, -0.4),
+            _row('d', 'golang', 30, 0.9),
+        ]])
+        self.window.bootstrap(db)
+        # Only reddit_data columns: the snippet, never the joined full content
+        self.assertIs(db.iter_sentiment_data.call_args.kwargs['columns'], db.DATA_COLUMNS)
+
+    def test_query_filters(self):
+        rows = self.window.query_sentiment_data(timeframe_hours=24)
+        self.assertEqual([r['id'] for r in rows], ['a', 'c', 'b'])  # Newest first
+        self.assertIsInstance(rows[0]['created_utc'], datetime.datetime)
+        self.assertEqual(rows[0]['snippet'], 'a' * 200)
+        self.assertNotIn('content', rows[0])
+
+        self.assertEqual([r['id'] for r in self.window.query_sentiment_data(subreddit='Python')], ['a', 'b'])
+        rows = self.window.query_sentiment_data(subreddits=['rust', 'golang'], timeframe_hours=48)
+        self.assertEqual([r['id'] for r in rows], ['c', 'd'])
+        rows = self.window.query_sentiment_data(exclude_duplicates=True)
+        self.assertEqual([r['id'] for r in rows], ['a', 'c'])
+        self.assertEqual(self.window.query_sentiment_data(subreddit='unknown'), [])
+
+    def test_paging_and_sort(self):
+        rows = self.window.query_sentiment_data(timeframe_hours=48, limit=2, offset=1)
+        self.assertEqual([r['id'] for r in rows], ['c', 'b'])
+        self.assertEqual(self.window.count_sentiment_data(timeframe_hours=48), 4)
+
+        rows = self.window.query_sentiment_data(timeframe_hours=48, sort='sentiment_score', descending=False)
+        self.assertEqual([r['id'] for r in rows], ['c', 'b', 'a', 'd'])
+        rows = self.window.query_sentiment_data(timeframe_hours=48, sort='subreddit', descending=True)
+        self.assertEqual([r['id'] for r in rows], ['c', 'a', 'b', 'd'])  # Ties stay newest first
+
+    def test_sample(self):
+        window = HotWindow(max_hours=48, max_items=10000)
+        window.ingest([_row(f"p{i}", 'python', i / 100, 0.5) for i in range(900)] +
+                      [_row(f"r{i}", 'rust', i / 100, -0.5) for i in range(100)] +
+                      [_row('g0', 'golang', 1, 0.5)])
+        rows, total = window.sample_sentiment_data(100, timeframe_hours=24)
+        self.assertEqual(total, 1001)
+        self.assertLessEqual(len(rows), 101)
+        self.assertAlmostEqual(sum(r['weight'] for r in rows), 1001)
+        by_sub = {}
+        for r in rows:
+            by_sub[r['subreddit']] = by_sub.get(r['subreddit'], 0) + r['weight']
+        self.assertEqual({k: round(v) for k, v in by_sub.items()}, {'python': 900, 'rust': 100, 'golang': 1})
+        created = [r['created_utc'] for r in rows]
+        self.assertEqual(created, sorted(created, reverse=True))
+
+        rows, total = self.window.sample_sentiment_data(100, timeframe_hours=24)
+        self.assertEqual((len(rows), total), (3, 3))
+        self.assertTrue(all(r['weight'] == 1 for r in rows))
+
+    def test_kpi_stats(self):
+        stats = self.window.get_kpi_stats(timeframe_hours=24)
+        self.assertEqual(stats['total_posts'], 3)
+        self.assertAlmostEqual(stats['avg_sentiment'], 0.4 / 3)
+        self.assertEqual(stats['most_positive_sub']['subreddit'], 'python')
+        self.assertAlmostEqual(stats['most_positive_sub']['avg_score'], 0.4)
+        self.assertEqual(stats['most_negative_sub']['subreddit'], 'rust')
+
+        empty = self.window.get_kpi_stats(subreddit='unknown')
+        self.assertEqual(empty['total_posts'], 0)
+        self.assertEqual(empty['most_positive_sub']['subreddit'], 'N/A')
+
+    def test_covers(self):
+        self.assertTrue(self.window.covers(24))
+        self.assertFalse(self.window.covers(24, keywords='python'))
+        self.assertFalse(self.window.covers(72))
+        self.window.ready = False
+        self.assertFalse(self.window.covers(24))
+
+    def test_upsert_and_socketio_events(self):
+        updated = dict(_row('a', 'python', 1, -0.8), created_utc=_row('a', 'python', 1, 0)['created_utc'].isoformat())
+        message = {'method': 'emit', 'event': 'new_data_batch', 'data': [[updated, _row('e', 'rust', 0, 0.1)]],
+                   'namespace': '/'}
+        self.window._handle(json.dumps(message, default=str))
+        self.window._handle(json.dumps({'method': 'emit', 'event': 'job_progress', 'data': [{'id': 'x'}]}))
+
+        self.assertEqual(self.window.size, 5)
+        rows = {r['id']: r for r in self.window.query_sentiment_data(timeframe_hours=24)}
+        self.assertEqual(rows['a']['sentiment_label'], 'negative')
+        self.assertAlmostEqual(rows['a']['sentiment_score'], -0.8)
+        self.assertIn('e', rows)
+
+    def test_eviction(self):
+        window = HotWindow(max_hours=10, max_items=3, initial_capacity=2)
+        window.ingest([_row(f"x{i}", 'python', i, 0.1) for i in range(5)])
+        self.assertEqual(window.size, 3)
+        self.assertEqual(set(window.index), {'x0', 'x1', 'x2'})
+        self.assertEqual([r['id'] for r in window.query_sentiment_data(timeframe_hours=10)], ['x0', 'x1', 'x2'])
+
+        # Dropping rows over the cap narrows what the window can answer
+        window.ready = True
+        self.assertTrue(window.covers(2))
+        self.assertFalse(window.covers(4))
+
+if __name__ == '__main__':
+    unittest.main()
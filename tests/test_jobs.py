@@ -0,0 +1,84 @@
+import threading
+import unittest
+from app.jobs.queue import Job, JobQueue, LocalJobBackend, RedisJobBackend, STATUS_SUCCEEDED, STATUS_FAILED
+from app.utils.memory_redis import InMemoryRedis
+
+class TestJobQueue(unittest.TestCase):
+    def setUp(self):
+        self.release = threading.Event()
+        self.calls = []
+        self.events = []
+        self.queue = JobQueue(LocalJobBackend(max_workers=2), notify=self.events.append)
+
+        def fetch(subreddit_name, progress=None):
+            self.calls.append(subreddit_name)
+            self.release.wait(timeout=5)
+            progress(1, 2)
+            if subreddit_name == 'broken':
+                return {"status": "error", "message": "Subreddit not found"}
+            return {"status": "success", "message": f"Fetched r/{subreddit_name}"}
+
+        self.queue.register('fetch_subreddit', fetch)
+
+    def _wait(self, job_id):
+        for _ in range(100):
+            job = self.queue.get(job_id)
+            if job.status in (STATUS_SUCCEEDED, STATUS_FAILED):
+                return job
+            threading.Event().wait(0.05)
+        self.fail(f"Job {job_id} did not finish")
+
+    def test_coalesces_same_key(self):
+        first, created_first = self.queue.enqueue('fetch_subreddit', {'subreddit_name': 'python'}, key='subreddit:python')
+        second, created_second = self.queue.enqueue('fetch_subreddit', {'subreddit_name': 'python'}, key='subreddit:python')
+        self.assertTrue(created_first)
+        self.assertFalse(created_second)
+        self.assertEqual(first.id, second.id)
+
+        self.release.set()
+        job = self._wait(first.id)
+        self.assertEqual(job.status, STATUS_SUCCEEDED)
+        self.assertEqual(job.progress, 1.0)
+        self.assertEqual(self.calls, ['python'])
+        self.assertTrue(any(e['progress'] == 0.5 for e in self.events))
+
+        # Once finished, the key is free again
+        third, created_third = self.queue.enqueue('fetch_subreddit', {'subreddit_name': 'python'}, key='subreddit:python')
+        self.assertTrue(created_third)
+        self.assertNotEqual(third.id, first.id)
+
+    def test_error_result_marks_job_failed(self):
+        self.release.set()
+        job, _ = self.queue.enqueue('fetch_subreddit', {'subreddit_name': 'broken'}, key='subreddit:broken')
+        job = self._wait(job.id)
+        self.assertEqual(job.status, STATUS_FAILED)
+        self.assertEqual(job.message, "Subreddit not found")
+
+class TestRedisJobBackend(unittest.TestCase):
+    def setUp(self):
+        self.redis = InMemoryRedis()
+        self.backend = RedisJobBackend(self.redis)
+
+    def _job(self, job_id):
+        return Job(id=job_id, kind='fetch_subreddit', key='subreddit:python', params={'subreddit_name': 'python'})
+
+    def test_lock_always_points_at_a_record(self):
+        first, created = self.backend.claim(self._job('first'))
+        self.assertTrue(created)
+        self.assertIsNotNone(self.backend.get(self.redis.get('jobkey:subreddit:python')))
+
+        second, created = self.backend.claim(self._job('second'))
+        self.assertFalse(created)
+        self.assertEqual(second.id, 'first')
+        self.assertIsNone(self.backend.get('second'))
+
+    def test_lock_without_record_is_in_flight(self):
+        self.redis.set('jobkey:subreddit:python', 'other', ex=60)
+        job, created = self.backend.claim(self._job('mine'))
+        self.assertFalse(created)
+        self.assertEqual(job.id, 'other')
+        self.assertEqual(self.redis.get('jobkey:subreddit:python'), 'other')
+        self.assertIsNone(self.backend.get('mine'))
+
+if __name__ == '__main__':
+    unittest.main()
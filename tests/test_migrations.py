@@ -0,0 +1,142 @@
+import unittest
+from unittest.mock import MagicMock
+from mysql.connector import Error, errorcode
+from app.database import migrations
+
+class FakeCursor:
+    """Answers the runner's queries; `existing` lists the information_schema names that exist."""
+
+    def __init__(self, version=0, lock=1, existing=(), pages=None):
+        self.version = version
+        self.lock = lock
+        self.existing = set(existing)
+        # Query prefix -> successive fetchall() results
+        self.pages = pages or {}
+        self.statements = []
+        self.rows_written = 0
+        self.rows = []
+        self._row = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def execute(self, query, params=()):
+        self.statements.append(" ".join(query.split()))
+        for prefix, pages in self.pages.items():
+            if self.statements[-1].startswith(prefix):
+                self.rows = pages.pop(0) if pages else []
+        if 'GET_LOCK' in query:
+            self._row = (self.lock,)
+        elif 'MAX(version)' in query:
+            if self.version is None:
+                raise Error(errno=errorcode.ER_NO_SUCH_TABLE)
+            self._row = (self.version or None,)
+        elif 'information_schema' in query:
+            self._row = (1,) if params[-1] in self.existing else None
+        else:
+            self._row = (1,)
+
+    def executemany(self, query, params):
+        self.statements.append(" ".join(query.split()))
+        self.rows_written += len(params)
+
+    def fetchall(self):
+        rows, self.rows = self.rows, []
+        return rows
+
+    def fetchone(self):
+        return self._row
+
+class TestMigrations(unittest.TestCase):
+    def _conn(self, cursor):
+        conn = MagicMock()
+        conn.cursor.return_value = cursor
+        return conn
+
+    def test_applies_pending_migrations_under_lock(self):
+        cursor = FakeCursor(version=0, existing={'content', 'idx_subreddit', 'idx_created_utc'},
+                            pages={"SELECT id FROM reddit_data": [[('a',), ('b',)]]})
+        applied = migrations.migrate(self._conn(cursor))
+
+        self.assertEqual(applied, [m.version for m in migrations.MIGRATIONS])
+        self.assertTrue(cursor.statements[0].startswith("SELECT GET_LOCK"))
+        self.assertTrue(cursor.statements[-1].startswith("SELECT RELEASE_LOCK"))
+        recorded = [s for s in cursor.statements if s.startswith("INSERT INTO schema_migrations")]
+        self.assertEqual(len(recorded), len(migrations.MIGRATIONS))
+
+        # DDL asks for online algorithms first
+        self.assertIn("ALTER TABLE reddit_data ADD INDEX idx_subreddit_created (subreddit, created_utc), "
+                      "ALGORITHM=INSTANT", cursor.statements)
+        self.assertTrue(any("INSERT IGNORE INTO reddit_content" in s for s in cursor.statements))
+        self.assertTrue(any("DROP INDEX idx_subreddit," in s for s in cursor.statements))
+
+    def test_skips_existing_objects_and_applied_versions(self):
+        cursor = FakeCursor(version=1, existing={'idx_subreddit_created', 'idx_created_id'})
+        self.assertEqual(migrations.migrate(self._conn(cursor)), [2, 3, 4])
+        self.assertFalse(any(s.startswith("ALTER TABLE") for s in cursor.statements))
+
+        cursor = FakeCursor(version=migrations.LATEST_VERSION)
+        self.assertEqual(migrations.migrate(self._conn(cursor)), [])
+
+    def test_falls_back_when_online_ddl_is_unsupported(self):
+        cursor = FakeCursor(version=1)
+        execute = cursor.execute
+
+        def execute_without_instant(query, params=()):
+            if 'ALGORITHM=INSTANT' in query:
+                cursor.statements.append(query)
+                raise Error(errno=errorcode.ER_ALTER_OPERATION_NOT_SUPPORTED_REASON)
+            execute(query, params)
+        cursor.execute = execute_without_instant
+
+        migrations.migrate(self._conn(cursor))
+        self.assertIn("ALTER TABLE reddit_data ADD INDEX idx_created_id (created_utc, id), "
+                      "ALGORITHM=INPLACE, LOCK=NONE", cursor.statements)
+
+    def test_lock_timeout(self):
+        cursor = FakeCursor(lock=0)
+        with self.assertRaises(migrations.MigrationError):
+            migrations.migrate(self._conn(cursor))
+        self.assertFalse(any('schema_migrations' in s for s in cursor.statements))
+
+    def test_keyword_index_backfill_commits_per_batch(self):
+        cursor = FakeCursor(pages={"SELECT id, content FROM reddit_content": [
+            [('a1', 'Rust beats Go'), ('a2', 'rust again')], [('b1', None)]
+        ]})
+        migrations._keyword_index(cursor)
+        selects = [s for s in cursor.statements if s.startswith("SELECT id, content")]
+        self.assertEqual(len(selects), 3)
+        self.assertEqual(cursor.statements.count("COMMIT;"), 2)
+        self.assertEqual(cursor.rows_written, 5)  # rust, beats, go + rust, again
+
+    def test_content_copy_is_batched_and_drop_deferred(self):
+        cursor = FakeCursor(existing={'content'}, pages={"SELECT id FROM reddit_data": [[('a',), ('b',)], [('c',)]]})
+        migrations._baseline(cursor)
+
+        copies = [s for s in cursor.statements if s.startswith("INSERT IGNORE INTO reddit_content")]
+        self.assertEqual(len(copies), 2)
+        self.assertTrue(all("WHERE id > %s AND id <= %s" in s for s in copies))
+        self.assertEqual(cursor.statements.count("COMMIT;"), 4)  # Two batches, subreddits, groups
+        self.assertFalse(any("DROP COLUMN" in s for s in cursor.statements))
+
+    def test_drop_waits_for_every_row_to_be_copied(self):
+        cursor = FakeCursor(existing={'content', 'url'}, pages={"SELECT d.id FROM reddit_data d": [[('late',)]]})
+        migrations._drop_inline_content(cursor)
+        self.assertTrue(any(s.startswith("INSERT IGNORE INTO reddit_content") for s in cursor.statements))
+        self.assertEqual(cursor.statements[-1], "ALTER TABLE reddit_data DROP COLUMN content, DROP COLUMN url, "
+                                                 "ALGORITHM=INSTANT")
+
+        stuck = FakeCursor(existing={'content'}, pages={"SELECT d.id FROM reddit_data d": [[('x',)], [('x',)]]})
+        with self.assertRaises(migrations.MigrationError):
+            migrations._drop_inline_content(stuck)
+        self.assertFalse(any("DROP COLUMN" in s for s in stuck.statements))
+
+    def test_current_version_without_table(self):
+        self.assertEqual(migrations.current_version(FakeCursor(version=None)), 0)
+        self.assertEqual(migrations.current_version(FakeCursor(version=2)), 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,9 +1,15 @@
+import json
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import unittest
 from unittest.mock import MagicMock, patch
 from app.models import RedditItem
 from app.database.db_manager import DatabaseManager
 from app.nlp.analyzer import SentimentAnalyzer
+from app.nlp.backends import SentimentBackend, DynamicBatcher
 from app.data_collection.collector import RedditCollector
+from app.database.hot_window import HotWindow
 from datetime import datetime
 
 class TestRefactoring(unittest.TestCase):
@@ -46,6 +52,57 @@ class TestRefactoring(unittest.TestCase):
         with self.assertRaises(Exception):
             db.get_connection()
 
+    @patch('app.database.db_manager.pooling.MySQLConnectionPool')
+    def test_keyword_filter_uses_word_index(self, mock_pool):
+        db = DatabaseManager()
+        where, params = db._build_filters(keywords='AI, 50%_off', timeframe_hours=12)
+        self.assertIn("reddit_keywords", where)
+        self.assertNotIn("reddit_content", where)
+        self.assertIn("subreddit LIKE %s", where)
+        self.assertIn("HAVING COUNT(*) = %s", where)
+        self.assertEqual(params, [12, '%ai%', '%50\\%\\_off%', 'ai', '50%_off', '50', '_off', 2])
+
+        where, params = db._build_filters(search=' Rate hike ')
+        self.assertIn("c.content LIKE %s", where)
+        self.assertEqual(params[1:], ['%Rate hike%', 'rate hike', '%Rate hike%'])
+
+    @patch('app.database.db_manager.pooling.MySQLConnectionPool')
+    def test_insert_indexes_words_of_every_item(self, mock_pool):
+        db = DatabaseManager()
+        cursor = mock_pool.return_value.get_connection.return_value.cursor.return_value.__enter__.return_value
+        cursor.fetchall.return_value = []
+        streamed = RedditItem(id='s1', item_type='comment', subreddit='python', author='a',
+                              content='Rust, rust and Go', url='', created_utc=datetime(2024, 1, 1),
+                              sentiment_label='neutral', sentiment_score=0.0)
+        polled = RedditItem(id='p1', item_type='post', subreddit='cars', author='a', content='Elon Musk said',
+                            url='', created_utc=datetime(2024, 1, 1), sentiment_label='neutral',
+                            sentiment_score=0.0, keywords=['Elon Musk'])
+        db.insert_batch_data([streamed, polled])
+
+        keyword_calls = [c.args[1] for c in cursor.executemany.call_args_list if 'reddit_keywords' in c.args[0]]
+        self.assertEqual(sorted(keyword_calls[0]), [('and', 's1'), ('elon', 'p1'), ('elon musk', 'p1'),
+                                                    ('go', 's1'), ('musk', 'p1'), ('rust', 's1'), ('said', 'p1')])
+
+    @patch('app.database.db_manager.mysql.connector.connect')
+    @patch('app.database.db_manager._offload_enabled', return_value=True)
+    def test_db_offload_uses_thread_connections(self, mock_offload, mock_connect):
+        threads = []
+        def connect(**kwargs):
+            threads.append(threading.get_ident())
+            return MagicMock(in_transaction=True)
+        mock_connect.side_effect = connect
+
+        db = DatabaseManager()
+        self.assertIsNone(db.pool)
+        db.get_distinct_subreddits()
+        db.get_distinct_subreddits()
+
+        # Schema check on this thread; queries on tpool threads with their own connections
+        self.assertEqual(threads[0], threading.get_ident())
+        self.assertGreater(len(threads), 1)
+        self.assertNotIn(threading.get_ident(), threads[1:])
+        self.assertEqual(len(set(threads[1:])), len(threads) - 1)
+
     def test_analyzer(self):
         # Mocking NLTK analyzer to avoid downloading lexicon in test env if not present
         with patch('app.nlp.analyzer.NLTKSentimentIntensityAnalyzer') as mock_vader:
@@ -65,6 +122,129 @@ class TestRefactoring(unittest.TestCase):
             result = analyzer.analyze_sentiment("Okay.")
             self.assertEqual(result['label'], 'neutral')
 
+    def test_analyzer_chunked_policy(self):
+        with patch('app.nlp.analyzer.NLTKSentimentIntensityAnalyzer') as mock_vader:
+            mock_vader.return_value.polarity_scores.side_effect = (
+                lambda text: {'compound': 0.5 if 'good' in text else -0.5}
+            )
+            analyzer = SentimentAnalyzer(policy='chunked', max_tokens=20, chunk_tokens=5, title_weight=0.5)
+
+            # 1000 sentences are cut to a 20-word budget: 4 chunks of 5 words each
+            body = "This is a good sentence. " * 1000
+            result = analyzer.analyze_sentiment(body)
+            self.assertEqual(mock_vader.return_value.polarity_scores.call_count, 4)
+            self.assertEqual(result['score'], 0.5)
+            self.assertEqual(result['policy'], 'chunked:t20:c5')
+
+            # Title and body are scored separately, then blended
+            result = analyzer.analyze_post("Awful news", "But the outcome was good.")
+            self.assertEqual(result['score'], 0.0)
+            self.assertEqual(result['label'], 'neutral')
+            self.assertEqual(result['policy'], 'chunked:t20:c5:title0.5')
+
+    def test_dynamic_batcher(self):
+        class RecordingBackend(SentimentBackend):
+            name = 'recording'
+
+            def __init__(self):
+                self.batches = []
+
+            def polarity(self, texts):
+                self.batches.append(len(texts))
+                return [float(len(t)) for t in texts]
+
+        backend = RecordingBackend()
+        batcher = DynamicBatcher(backend, max_batch=64, max_wait_ms=200)
+        results = {}
+
+        def call(i):
+            results[i] = batcher.polarity(['x' * i, 'y'])
+
+        threads = [threading.Thread(target=call, args=(i,)) for i in range(1, 9)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        # Every caller gets its own slice back, from far fewer forward passes than calls
+        self.assertEqual(results, {i: [float(i), 1.0] for i in range(1, 9)})
+        self.assertEqual(sum(backend.batches), 16)
+        self.assertLess(len(backend.batches), 8)
+
+        analyzer = SentimentAnalyzer(policy='chunked', backend=batcher)
+        self.assertEqual(analyzer.policy_name, 'recording:chunked:t512:c64')
+
+    def test_analyze_batch_single_backend_call(self):
+        class RecordingBackend(SentimentBackend):
+            name = 'recording'
+
+            def __init__(self):
+                self.batches = []
+
+            def polarity(self, texts):
+                self.batches.append(list(texts))
+                return [0.5 if 'good' in t else -0.5 for t in texts]
+
+        backend = RecordingBackend()
+        analyzer = SentimentAnalyzer(policy='chunked', max_tokens=20, chunk_tokens=5, title_weight=0.5,
+                                     backend=backend)
+        results = analyzer.analyze_batch([("Awful news", "But the outcome was good."),
+                                          (None, "good good good"), (None, "")])
+
+        self.assertEqual(len(backend.batches), 1)
+        self.assertEqual([r['score'] for r in results], [0.0, 0.5, 0.0])
+        self.assertEqual(results[0]['policy'], 'recording:chunked:t20:c5:title0.5')
+        self.assertEqual(results[1], analyzer.analyze_sentiment("good good good"))
+
+    @patch('app.data_collection.collector.praw.Reddit')
+    def test_format_batch_scores_once(self, mock_reddit):
+        mock_analyzer = MagicMock(spec=SentimentAnalyzer)
+        mock_analyzer.analyze_batch.side_effect = (
+            lambda entries: [{'label': 'positive', 'score': 0.5, 'policy': 'full'} for _ in entries]
+        )
+        text = "the quick brown fox jumps over the lazy dog near the river bank today"
+        comments = [MagicMock(id=f"c{i}", body=text if i < 2 else f"comment {i}", permalink=f"/c{i}",
+                              subreddit='python', author='a', created_utc=1700000000, score=0)
+                    for i in range(4)]
+
+        collector = RedditCollector(MagicMock(spec=DatabaseManager), mock_analyzer)
+        formatted = collector._format_batch([(c, 'comment') for c in comments])
+
+        mock_analyzer.analyze_batch.assert_called_once()
+        # The copy of c0 in the same batch is not sent to the backend
+        self.assertEqual(len(mock_analyzer.analyze_batch.call_args.args[0]), 3)
+        self.assertEqual([item.id for item in formatted], ['c0', 'c1', 'c2', 'c3'])
+        # and points at the first one, reusing its score
+        self.assertEqual([item.duplicate_of for item in formatted], [None, 'c0', None, None])
+
+    @patch('app.data_collection.collector.praw.Reddit')
+    def test_fetched_posts_reach_hot_window(self, mock_reddit):
+        window = HotWindow(max_hours=24, max_items=100)
+        window.ready = True
+
+        class RelayEmitter:
+            # Publishes the way Flask-SocketIO does on the Redis channel the window listens to
+            def emit(self, event, data):
+                window._handle(json.dumps({'method': 'emit', 'event': event, 'data': data}))
+
+        mock_analyzer = MagicMock(spec=SentimentAnalyzer)
+        mock_analyzer.clean_text.side_effect = lambda text: text
+        mock_analyzer.analyze_batch.side_effect = (
+            lambda entries: [{'label': 'positive', 'score': 0.5, 'policy': 'full'} for _ in entries]
+        )
+        posts = [MagicMock(id=f"p{i}", title=f"title {i}", selftext='', permalink=f"/p{i}", subreddit='python',
+                           author='a', created_utc=time.time() - 60, score=1, num_comments=0, stickied=False)
+                 for i in range(3)]
+        mock_reddit.return_value.subreddit.return_value.hot.return_value = iter(posts)
+        mock_db = MagicMock(spec=DatabaseManager)
+
+        collector = RedditCollector(mock_db, mock_analyzer, emitter=RelayEmitter())
+        result = collector.fetch_subreddit_posts('python', limit=3)
+
+        self.assertEqual(result['status'], 'success')
+        mock_db.insert_batch_data.assert_called_once()
+        self.assertEqual(window.count_sentiment_data(subreddit='python'), 3)
+
     @patch('app.data_collection.collector.praw.Reddit')
     def test_collector(self, mock_reddit):
         mock_db = MagicMock(spec=DatabaseManager)
@@ -73,5 +253,76 @@ class TestRefactoring(unittest.TestCase):
         collector = RedditCollector(mock_db, mock_analyzer)
         self.assertIsNotNone(collector.reddit)
 
+    @patch('app.data_collection.collector.praw.Reddit')
+    def test_refresh_items(self, mock_reddit):
+        mock_db = MagicMock(spec=DatabaseManager)
+        mock_analyzer = MagicMock(spec=SentimentAnalyzer)
+        post = MagicMock(id='abc', score=42, num_comments=7)
+        comment = MagicMock(spec=['id', 'score'], id='def', score=3)
+        mock_reddit.return_value.info.return_value = [post, comment]
+        mock_reddit.return_value.auth.limits = {}
+
+        collector = RedditCollector(mock_db, mock_analyzer)
+        refreshed = collector._refresh_items([
+            {'id': 'abc', 'item_type': 'post'},
+            {'id': 'def', 'item_type': 'comment'},
+            {'id': 'gone', 'item_type': 'comment'}
+        ])
+
+        self.assertEqual(refreshed, 2)
+        mock_reddit.return_value.info.assert_called_with(fullnames=['t3_abc', 't1_def', 't1_gone'])
+        mock_db.update_engagement.assert_called_once_with(
+            [
+                {'id': 'abc', 'score': 42, 'num_comments': 7},
+                {'id': 'def', 'score': 3, 'num_comments': None}
+            ],
+            ids=['abc', 'def', 'gone']
+        )
+
+    @patch('app.data_collection.collector.praw.Reddit')
+    def test_search_shard_stops_at_seen(self, mock_reddit):
+        mock_db = MagicMock(spec=DatabaseManager)
+        mock_analyzer = MagicMock(spec=SentimentAnalyzer)
+        mock_reddit.return_value.auth.limits = {}
+        new_post = MagicMock(id='new', title='Tesla earnings', selftext='')
+        both = MagicMock(id='both', title='Tesla everywhere', selftext='and AI too')
+        stem = MagicMock(id='stem', title='He said it again', selftext='')
+        old_post = MagicMock(id='old', title='Tesla', selftext='')
+        never_reached = MagicMock(id='older', title='Tesla', selftext='')
+        mock_reddit.return_value.subreddit.return_value.search.return_value = iter(
+            [new_post, both, stem, old_post, never_reached]
+        )
+
+        collector = RedditCollector(mock_db, mock_analyzer)
+        shard_seen = {'old': None}
+        results = collector._search_shard(['Tesla', 'AI'], 'all', shard_seen, 1000)
+
+        self.assertEqual([(post.id, matched) for post, matched in results],
+                         [('new', ['tesla']), ('both', ['tesla', 'ai']), ('stem', [])])
+        self.assertEqual(list(shard_seen), ['old', 'stem', 'both', 'new'])
+
+    @patch('app.data_collection.collector.praw.Reddit')
+    def test_poll_workers_use_own_reddit(self, mock_reddit):
+        instances = []
+        def make_reddit(**kwargs):
+            instance = MagicMock()
+            instance.auth.limits = {}
+            instance.subreddit.return_value.search.return_value = iter([])
+            instances.append(instance)
+            return instance
+        mock_reddit.side_effect = make_reddit
+
+        collector = RedditCollector(MagicMock(spec=DatabaseManager), MagicMock(spec=SentimentAnalyzer))
+        both_running = threading.Barrier(2)
+        def search(shard):
+            both_running.wait(timeout=5)  # Force the two shards onto separate threads
+            return collector._search_shard(shard, 'all', {}, 10)
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            list(pool.map(search, [['a'], ['b']]))
+
+        used = [r for r in instances if r.subreddit.called]
+        self.assertNotIn(collector.reddit, used)
+        self.assertEqual(len(used), 2)
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,94 @@
+import os
+import gzip
+import json
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+from app.database.db_manager import DatabaseManager
+from app.nlp.analyzer import SentimentAnalyzer
+from app.data_collection.collector import RedditCollector
+from app.data_collection.replay import (
+    ReplayRunner, SinkDatabaseManager, NullEmitter, iter_recording, _capture
+)
+
+class TestReplay(unittest.TestCase):
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix='.ndjson.gz')
+        os.close(handle)
+        with gzip.open(self.path, 'wt', encoding='utf-8') as f:
+            for i in range(5):
+                comment = MagicMock(id=f"c{i}", body=f"comment number {i}", permalink=f"/r/python/c{i}",
+                                    subreddit='python', author=None, created_utc=1700000000 + i, score=i)
+                f.write(json.dumps({"t": i * 0.01, "type": "comment", "item": _capture(comment)}) + "\n")
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_capture_roundtrip(self):
+        records = list(iter_recording(self.path))
+        self.assertEqual(len(records), 5)
+        offset, item_type, fields = records[1]
+        self.assertEqual((offset, item_type), (0.01, 'comment'))
+        self.assertEqual(fields['body'], 'comment number 1')
+        self.assertNotIn('author', fields)
+
+    @patch('app.data_collection.collector.external_socketio')
+    @patch('app.data_collection.collector.praw.Reddit')
+    def test_replay_through_pipeline(self, mock_reddit, mock_socketio):
+        mock_db = MagicMock(spec=DatabaseManager)
+        mock_analyzer = MagicMock(spec=SentimentAnalyzer)
+        mock_analyzer.clean_text.side_effect = lambda text: text
+        mock_analyzer.analyze_batch.side_effect = (
+            lambda entries: [{'label': 'positive', 'score': 0.5, 'policy': 'full'} for _ in entries]
+        )
+
+        collector = RedditCollector(mock_db, mock_analyzer)
+        report = ReplayRunner(collector, speed=0, batch_size=2, unique_ids=True).run(self.path)
+
+        self.assertEqual(report['items'], 5)
+        self.assertEqual(mock_db.insert_batch_data.call_count, 3)
+        self.assertEqual(mock_analyzer.analyze_batch.call_count, 3)
+        inserted = [item for call in mock_db.insert_batch_data.call_args_list for item in call.args[0]]
+        self.assertTrue(all(item.id.startswith('c') and '_' in item.id for item in inserted))
+        self.assertEqual(inserted[0].author, '[deleted]')
+        mock_reddit.return_value.subreddit.assert_not_called()
+        self.assertGreaterEqual(report['latency_ms']['max'], report['latency_ms']['p50'])
+
+    @patch('app.data_collection.collector.external_socketio')
+    @patch('app.data_collection.collector.praw.Reddit')
+    def test_replay_into_sink(self, mock_reddit, mock_socketio):
+        mock_analyzer = MagicMock(spec=SentimentAnalyzer)
+        mock_analyzer.clean_text.side_effect = lambda text: text
+        mock_analyzer.analyze_batch.side_effect = (
+            lambda entries: [{'label': 'positive', 'score': 0.5, 'policy': 'full'} for _ in entries]
+        )
+        sink = SinkDatabaseManager()
+
+        collector = RedditCollector(sink, mock_analyzer, emitter=NullEmitter())
+        report = ReplayRunner(collector, speed=0, batch_size=2).run(self.path)
+
+        self.assertEqual(report['items'], 5)
+        self.assertEqual(sink.items, 5)
+        mock_socketio.emit.assert_not_called()
+
+    @patch.multiple('app.config', REDDIT_CLIENT_ID=None, REDDIT_CLIENT_SECRET=None, REDDIT_USER_AGENT=None)
+    @patch('app.data_collection.collector.praw.Reddit')
+    def test_replay_without_reddit_credentials(self, mock_reddit):
+        mock_analyzer = MagicMock(spec=SentimentAnalyzer)
+        mock_analyzer.clean_text.side_effect = lambda text: text
+        mock_analyzer.analyze_batch.side_effect = (
+            lambda entries: [{'label': 'neutral', 'score': 0.0, 'policy': 'full'} for _ in entries]
+        )
+        sink = SinkDatabaseManager()
+
+        collector = RedditCollector(sink, mock_analyzer, emitter=NullEmitter(), connect=False)
+        report = ReplayRunner(collector, speed=0, batch_size=2).run(self.path)
+
+        self.assertEqual(sink.items, 5)
+        self.assertEqual(report['items'], 5)
+        mock_reddit.assert_not_called()
+        with self.assertRaises(ValueError):
+            collector.reddit
+
+if __name__ == '__main__':
+    unittest.main()
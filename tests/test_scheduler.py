@@ -0,0 +1,91 @@
+import time
+import unittest
+from unittest.mock import MagicMock
+from app.data_collection.scheduler import (
+    RateLimitScheduler, MeteredRequestor, PRIORITY_INTERACTIVE, PRIORITY_BACKGROUND, OTHER_TASKS
+)
+
+class TestRateLimitScheduler(unittest.TestCase):
+    def test_interactive_reserve(self):
+        scheduler = RateLimitScheduler(burst=6, interactive_reserve=5)
+        scheduler.rate = 0.0
+        scheduler.default_rate = 0.0
+
+        # Background work may not dip into the tokens kept for interactive requests
+        scheduler.acquire("poll", PRIORITY_BACKGROUND)
+        self.assertEqual(scheduler.snapshot()['tokens'], 5.0)
+        for _ in range(5):
+            scheduler.acquire("fetch:python", PRIORITY_INTERACTIVE)
+        self.assertEqual(scheduler.grants["fetch:python"], 5)
+
+    def test_update_from_headers(self):
+        scheduler = RateLimitScheduler()
+        scheduler.update({'remaining': 60.0, 'used': 940, 'reset_timestamp': time.time() + 60})
+        snapshot = scheduler.snapshot()
+        self.assertAlmostEqual(snapshot['refill_per_second'], 1.0, places=1)
+        self.assertEqual(snapshot['used'], 940)
+
+        scheduler.update({'remaining': 0.0, 'used': 1000, 'reset_timestamp': time.time() + 30})
+        snapshot = scheduler.snapshot()
+        self.assertEqual(snapshot['tokens'], 0.0)
+        self.assertGreater(snapshot['blocked_for_seconds'], 25)
+
+    def test_requestor_meters_every_request(self):
+        scheduler = RateLimitScheduler()
+        session = MagicMock()
+        session.request.return_value = MagicMock(headers={
+            'x-ratelimit-remaining': '550.0', 'x-ratelimit-used': '450', 'x-ratelimit-reset': '300'
+        })
+        requestor = MeteredRequestor(user_agent='sentiment-tests/1.0', session=session, scheduler=scheduler)
+
+        with scheduler.metered("fetch:python", PRIORITY_INTERACTIVE):
+            requestor.request('GET', 'https://oauth.reddit.com/r/python/hot')
+            requestor.request('GET', 'https://oauth.reddit.com/r/python/hot')
+        requestor.request('GET', 'https://oauth.reddit.com/api/v1/me')
+
+        self.assertEqual(scheduler.grants["fetch:python"], 2)
+        self.assertEqual(scheduler.grants["other"], 1)
+        snapshot = scheduler.snapshot()
+        self.assertEqual(snapshot['used'], 450)
+        self.assertAlmostEqual(snapshot['refill_per_second'], 550 / 300, places=1)
+
+    def test_grant_counters_are_capped(self):
+        scheduler = RateLimitScheduler(burst=100, interactive_reserve=0, max_tracked_tasks=3)
+        for i in range(10):
+            scheduler.acquire(f"fetch:sub{i}", PRIORITY_INTERACTIVE)
+        # Three named tasks, the rest folded into one counter
+        self.assertEqual(len(scheduler.grants), 4)
+        self.assertEqual(scheduler.grants[OTHER_TASKS], 7)
+
+    def test_shared_bucket(self):
+        redis_client = MagicMock()
+        scripts = {}
+        def register(source):
+            script = MagicMock(name=source.split()[1])
+            scripts[len(scripts)] = script
+            return script
+        redis_client.register_script.side_effect = register
+        scheduler = RateLimitScheduler(redis_client=redis_client)
+        take, sync, block = scripts[0], scripts[1], scripts[2]
+
+        # The shared bucket asks to wait first, then grants
+        take.side_effect = ['0.01', '0']
+        scheduler.acquire("poll", PRIORITY_BACKGROUND)
+        self.assertEqual(take.call_count, 2)
+        args = take.call_args.kwargs['args']
+        self.assertEqual((args[1], args[4]), (1.0 + scheduler.interactive_reserve, "poll"))
+
+        scheduler.update({'remaining': 10.0, 'used': 990, 'reset_timestamp': time.time() + 60}, "poll")
+        self.assertEqual(sync.call_args.kwargs['args'][1], 10.0)
+
+        redis_client.hgetall.side_effect = lambda key: (
+            {b'tokens': b'3', b'ts': str(time.time()).encode(), b'rate': b'0.5', b'remaining': b'10'}
+            if key.endswith('bucket') else {b'poll': b'7', b'fetch:python': b'2'})
+        snapshot = scheduler.snapshot()
+        self.assertEqual(snapshot['grants'], {'poll': 7, 'fetch:python': 2})
+        self.assertAlmostEqual(snapshot['tokens'], 3.0, places=0)
+        self.assertEqual(snapshot['remaining'], 10.0)
+        block.assert_not_called()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,148 @@
+import random
+import datetime
+import unittest
+from unittest.mock import MagicMock
+from app.models import RedditItem, utc_timestamp
+from app.analytics.sketches import SpaceSaving, HyperLogLog, Histogram
+from app.analytics.trending import TrendingTracker, top_terms
+from app.analytics import stats as kpi_sketches
+
+class TestSpaceSaving(unittest.TestCase):
+    def _zipf_stream(self, seed, n=20000):
+        rng = random.Random(seed)
+        terms = [f"term{i}" for i in range(2000)]
+        weights = [1.0 / (i + 1) for i in range(len(terms))]
+        return rng.choices(terms, weights=weights, k=n)
+
+    def test_heavy_hitters_and_error_bound(self):
+        stream = self._zipf_stream(1)
+        sketch = SpaceSaving(capacity=100)
+        for term in stream:
+            sketch.add(term, sentiment=0.5)
+
+        exact = {}
+        for term in stream:
+            exact[term] = exact.get(term, 0) + 1
+        top = sketch.top(5)
+        self.assertEqual([t['term'] for t in top], [f"term{i}" for i in range(5)])
+        for entry in top:
+            self.assertGreaterEqual(entry['count'], exact[entry['term']])
+            self.assertLessEqual(entry['count'] - entry['error'], exact[entry['term']])
+            self.assertAlmostEqual(entry['mean_sentiment'], 0.5)
+
+    def test_merge_and_roundtrip(self):
+        a, b = SpaceSaving(capacity=100), SpaceSaving(capacity=100)
+        for term in self._zipf_stream(2, 10000):
+            a.add(term)
+        for term in self._zipf_stream(3, 10000):
+            b.add(term)
+
+        merged = top_terms([a.to_bytes(), b.to_bytes()], limit=3, capacity=100)
+        self.assertEqual([t['term'] for t in merged], ['term0', 'term1', 'term2'])
+        self.assertEqual(merged[0]['count'], a.counters['term0'][0] + b.counters['term0'][0])
+
+class TestKpiSketches(unittest.TestCase):
+    def test_hyperloglog_merge(self):
+        a, b = HyperLogLog(), HyperLogLog()
+        for i in range(30000):
+            a.add(f"user{i}")
+        for i in range(20000, 50000):
+            b.add(f"user{i}")
+        restored = HyperLogLog.from_bytes(b.to_bytes())
+        # 50k distinct across both; p=12 gives ~1.6% standard error
+        self.assertAlmostEqual(a.merge(restored).count(), 50000, delta=2500)
+        self.assertEqual(HyperLogLog().count(), 0)
+
+    def test_histogram_quantiles(self):
+        rng = random.Random(5)
+        values = [rng.uniform(-1, 1) for _ in range(20000)]
+        a, b = Histogram(), Histogram()
+        for i, value in enumerate(values):
+            (a if i % 2 else b).add(value)
+        merged = Histogram.from_bytes(a.to_bytes()).merge(b)
+        ordered = sorted(values)
+        for q in (0.1, 0.5, 0.9):
+            self.assertAlmostEqual(merged.quantile(q), ordered[int(q * len(ordered))], delta=0.02)
+        self.assertIsNone(Histogram().quantile(0.5))
+
+    def test_summarize(self):
+        tracker = kpi_sketches.StatsTracker(source='test', clock=lambda: utc_timestamp(datetime.datetime(2024, 1, 1)))
+        tracker.observe([
+            RedditItem(id=str(i), item_type='comment', subreddit='python', author=f"u{i % 3}", url='',
+                       content='', created_utc=datetime.datetime(2024, 1, 1), sentiment_score=i / 10)
+            for i in range(10)
+        ] + [
+            RedditItem(id='r', item_type='comment', subreddit='python', author='reposter', url='',
+                       content='', created_utc=datetime.datetime(2024, 1, 1), sentiment_score=0.9,
+                       duplicate_of='9')
+        ])
+        db = MagicMock()
+        tracker.persist(db)
+        (rows,), _ = db.upsert_sketches.call_args
+        payloads = {}
+        for kind, _, _, _, payload in rows:
+            payloads.setdefault(kind, []).append(payload)
+
+        summary = kpi_sketches.summarize(payloads)
+        self.assertEqual(summary['unique_authors'], 4)
+        self.assertAlmostEqual(summary['sentiment_median'], 0.5, delta=0.05)
+
+        # Reposts by another author are left out of the deduplicated figures
+        summary = kpi_sketches.summarize(payloads, exclude_duplicates=True)
+        self.assertEqual(summary['unique_authors'], 3)
+        self.assertAlmostEqual(summary['sentiment_median'], 0.45, delta=0.05)
+        self.assertEqual(kpi_sketches.kinds(exclude_duplicates=True),
+                         [kpi_sketches.AUTHORS_KIND, kpi_sketches.SENTIMENT_KIND])
+
+    def test_merge_payloads_matches_pairwise_merge(self):
+        rng = random.Random(7)
+        hlls, histograms = [], []
+        for _ in range(20):
+            hll, histogram = HyperLogLog(), Histogram()
+            for _ in range(200):
+                hll.add(f"user{rng.randrange(3000)}")
+                histogram.add(rng.uniform(-1, 1))
+            hlls.append(hll)
+            histograms.append(histogram)
+
+        merged = HyperLogLog.merge_payloads([h.to_bytes() for h in hlls])
+        expected = hlls[0]
+        for hll in hlls[1:]:
+            expected = expected.merge(hll)
+        self.assertEqual(merged.registers, expected.registers)
+
+        merged = Histogram.merge_payloads([h.to_bytes() for h in histograms])
+        self.assertEqual(merged.counts, [sum(c) for c in zip(*(h.counts for h in histograms))])
+        self.assertIsNone(Histogram.merge_payloads([]))
+        with self.assertRaises(ValueError):
+            HyperLogLog.merge_payloads([HyperLogLog().to_bytes(), HyperLogLog(10).to_bytes()])
+
+class TestTrendingTracker(unittest.TestCase):
+    def test_observe_and_persist(self):
+        db = MagicMock()
+        now = datetime.datetime(2024, 1, 1, 12, 30)
+        tracker = TrendingTracker(lambda text: text, source='test', clock=lambda: utc_timestamp(now))
+        items = [
+            RedditItem(id='1', item_type='comment', subreddit='python', author='a', url='',
+                       content='Rust rust and Python', created_utc=now, sentiment_score=0.5),
+            RedditItem(id='2', item_type='comment', subreddit='python', author='b', url='',
+                       content='the rust compiler', created_utc=now, sentiment_score=-0.1),
+        ]
+        tracker.observe(items)
+        tracker.persist(db)
+
+        (rows,), _ = db.upsert_sketches.call_args
+        self.assertEqual(len(rows), 1)
+        kind, subreddit, bucket_start, source, payload = rows[0]
+        self.assertEqual((kind, subreddit), ('terms', 'python'))
+        self.assertEqual(bucket_start, datetime.datetime(2024, 1, 1, 12))
+        self.assertTrue(source.startswith('test:'))
+
+        top = top_terms([payload], limit=1)
+        # Counted once per item, not once per occurrence
+        self.assertEqual(top[0]['term'], 'rust')
+        self.assertEqual(top[0]['count'], 2)
+        self.assertAlmostEqual(top[0]['mean_sentiment'], 0.2)
+
+if __name__ == '__main__':
+    unittest.main()